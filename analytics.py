@@ -0,0 +1,244 @@
+import threading
+import time
+from collections import namedtuple
+from itertools import islice
+
+import numpy as np
+
+from db import get_database
+from models import ProductModel
+
+# Janela de consumo usada para calcular a velocidade (dias)
+DEFAULT_WINDOW_DAYS = 30
+# Prazo de entrega do fornecedor, estoque de segurança e intervalo entre pedidos (dias)
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SAFETY_DAYS = 3
+DEFAULT_REVIEW_DAYS = 14
+
+# Idade máxima dos resultados antes de buscar as novidades do banco (s)
+REFRESH_SECONDS = 60
+# Intervalo de recarga completa (remove produtos excluídos do cache)
+FULL_RELOAD_SECONDS = 3600
+CHUNK_SIZE = 50000
+
+Forecast = namedtuple('Forecast', [
+    'product_id', 'name', 'stock', 'velocity', 'days_of_cover', 'reorder_point', 'reorder_quantity'
+])
+
+
+def _load_chunks(db, query, params, columns, chunk_size=CHUNK_SIZE):
+    """
+    Lê o resultado de uma query em blocos, cada um como um array 2D float64
+
+    Yields:
+        numpy.ndarray: Bloco com até `chunk_size` linhas e `columns` colunas
+    """
+    rows = db.iter_all(query, params, chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield np.array(chunk, dtype=np.float64).reshape(-1, columns)
+
+
+class DemandAnalytics:
+    """
+    Velocidade de consumo, cobertura e sugestão de reposição de todos os produtos
+
+    As baixas de estoque (new_stock < old_stock) da janela ficam em arrays
+    NumPy, assim como o estoque atual indexado pelo ID do produto. Cada
+    atualização lê só as movimentações e os produtos alterados desde a
+    anterior; os cálculos são feitos de uma vez para o catálogo inteiro.
+    """
+
+    def __init__(self, db=None, window_days=DEFAULT_WINDOW_DAYS, lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                 safety_days=DEFAULT_SAFETY_DAYS, review_days=DEFAULT_REVIEW_DAYS):
+        """
+        Args:
+            db (Database): Banco a usar; padrão é a instância compartilhada
+            window_days (int): Dias de histórico usados na velocidade
+            lead_time_days (int): Prazo de entrega do fornecedor
+            safety_days (int): Dias de consumo mantidos como segurança
+            review_days (int): Intervalo entre pedidos de compra
+        """
+        self.db = db or get_database()
+        self.products = ProductModel(self.db)
+        self.window_days = window_days
+        self.lead_time_days = lead_time_days
+        self.safety_days = safety_days
+        self.review_days = review_days
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self._reloaded_at = 0.0
+        self._clear()
+
+    def _clear(self):
+        """Descarta todos os dados em memória"""
+        self._last_history_id = 0
+        self._products_synced_at = None
+        # Baixas da janela: produto, quantidade e dia (juliano)
+        self._event_products = np.zeros(0, dtype=np.int64)
+        self._event_quantities = np.zeros(0, dtype=np.float64)
+        self._event_days = np.zeros(0, dtype=np.float64)
+        # Por ID de produto (posição 0 não é usada)
+        self._stock = np.zeros(1, dtype=np.float64)
+        self._active = np.zeros(1, dtype=bool)
+        self._results = None
+
+    def _grow(self, max_id):
+        """Aumenta os arrays por produto para caber o ID informado"""
+        size = len(self._stock)
+        if max_id < size:
+            return
+        extra = max_id + 1 - size
+        self._stock = np.concatenate([self._stock, np.zeros(extra)])
+        self._active = np.concatenate([self._active, np.zeros(extra, dtype=bool)])
+
+    def refresh(self, force=False):
+        """
+        Busca no banco as novidades desde a última atualização e recalcula
+
+        Args:
+            force (bool): Atualiza mesmo que os resultados ainda sejam recentes
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._results is not None and now - self._loaded_at < REFRESH_SECONDS:
+                return
+            if now - self._reloaded_at > FULL_RELOAD_SECONDS:
+                self._clear()
+                self._reloaded_at = now
+            self._load_products()
+            self._load_history()
+            self._results = self._compute()
+            self._loaded_at = now
+
+    def _load_products(self):
+        """Carrega o estoque dos produtos alterados desde a última leitura"""
+        synced_at = self.db.fetch_one('SELECT CURRENT_TIMESTAMP')[0]
+        # Alterações no mesmo segundo da leitura anterior são relidas (>=)
+        batch = self.products.get_batch(self._products_synced_at)
+        if len(batch):
+            # Os arrays do lote são lidos sem cópia
+            ids = np.frombuffer(batch.ids, dtype=np.int64)
+            self._grow(int(ids.max()))
+            self._stock[ids] = np.frombuffer(batch.stock, dtype=np.int64)
+            self._active[ids] = True
+        self._products_synced_at = synced_at
+
+    def _load_history(self):
+        """Acrescenta as baixas novas e descarta as que saíram da janela"""
+        window_start = self.db.fetch_one(
+            "SELECT julianday('now', ?)", (f'-{self.window_days} days',)
+        )[0]
+        last_id = self.db.fetch_one('SELECT COALESCE(MAX(id), 0) FROM stock_history')[0]
+
+        products = [self._event_products]
+        quantities = [self._event_quantities]
+        days = [self._event_days]
+        query = '''
+            SELECT product_id, old_stock - new_stock, julianday(created_at)
+            FROM stock_history
+            WHERE id > ? AND id <= ? AND created_at >= datetime(?) AND new_stock < old_stock
+        '''
+        for chunk in _load_chunks(self.db, query, (self._last_history_id, last_id, window_start), 3):
+            products.append(chunk[:, 0].astype(np.int64))
+            quantities.append(chunk[:, 1])
+            days.append(chunk[:, 2])
+        self._last_history_id = last_id
+
+        products = np.concatenate(products)
+        quantities = np.concatenate(quantities)
+        days = np.concatenate(days)
+        keep = days >= window_start
+        self._event_products = products[keep]
+        self._event_quantities = quantities[keep]
+        self._event_days = days[keep]
+        if len(self._event_products):
+            self._grow(int(self._event_products.max()))
+
+    def _compute(self):
+        """
+        Calcula os indicadores de todos os produtos de uma vez
+
+        Returns:
+            dict: Arrays por ID de produto: velocity, days_of_cover,
+                reorder_point e reorder_quantity
+        """
+        size = len(self._stock)
+        consumed = np.bincount(self._event_products, weights=self._event_quantities, minlength=size)
+        velocity = consumed / self.window_days
+        stock = self._stock
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_of_cover = np.where(velocity > 0, np.maximum(stock, 0) / velocity, np.inf)
+        # Política (s, S): pede quando o estoque chega ao ponto de pedido,
+        # completando o consumo de prazo + segurança + intervalo entre pedidos
+        reorder_point = velocity * (self.lead_time_days + self.safety_days)
+        order_up_to = reorder_point + velocity * self.review_days
+        reorder_quantity = np.where(
+            (stock <= reorder_point) & (velocity > 0),
+            np.ceil(np.maximum(order_up_to - stock, 0)),
+            0
+        )
+        return {
+            'velocity': velocity,
+            'days_of_cover': days_of_cover,
+            'reorder_point': reorder_point,
+            'reorder_quantity': reorder_quantity,
+        }
+
+    def forecast(self, limit=20, horizon_days=None):
+        """
+        Produtos que vão acabar primeiro, pelo consumo recente
+
+        Args:
+            limit (int): Quantidade máxima de produtos
+            horizon_days (float): Só produtos com cobertura até este número de dias
+
+        Returns:
+            list: Forecast de cada produto, da menor cobertura para a maior
+        """
+        self.refresh()
+        with self._lock:
+            results = self._results
+            active = self._active
+            stock = self._stock
+        cover = results['days_of_cover']
+        candidates = np.flatnonzero(active & np.isfinite(cover))
+        if horizon_days is not None:
+            candidates = candidates[cover[candidates] <= horizon_days]
+        # Menor cobertura primeiro; no empate, quem vende mais rápido
+        order = np.lexsort((-results['velocity'][candidates], cover[candidates]))
+        candidates = candidates[order[:limit]]
+
+        ids = [int(product_id) for product_id in candidates]
+        names = {product.id: product.name for product in self.products.get_by_ids(ids)}
+        return [
+            Forecast(
+                product_id, names.get(product_id, ''), int(stock[product_id]),
+                float(results['velocity'][product_id]), float(cover[product_id]),
+                float(results['reorder_point'][product_id]), int(results['reorder_quantity'][product_id])
+            )
+            for product_id in ids
+        ]
+
+    def summary(self):
+        """
+        Totais do catálogo inteiro
+
+        Returns:
+            dict: products_moving (com consumo na janela), need_reorder
+                (abaixo do ponto de pedido), units_to_order e window_days
+        """
+        self.refresh()
+        with self._lock:
+            results = self._results
+            active = self._active
+        moving = active & (results['velocity'] > 0)
+        reorder = active & (results['reorder_quantity'] > 0)
+        return {
+            'products_moving': int(moving.sum()),
+            'need_reorder': int(reorder.sum()),
+            'units_to_order': int(results['reorder_quantity'][reorder].sum()),
+            'window_days': self.window_days,
+        }
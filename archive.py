@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+import migrations
+from db import get_database
+from models import CHANGE_LOG_KEEP_DAYS, HISTORY_RAW_COLUMNS, ChangeLogModel
+
+# Movimentações mais antigas que isso são arquivadas por padrão
+DEFAULT_KEEP_DAYS = 365
+
+# Linhas movidas por transação (limita o tempo em que o escritor fica bloqueado)
+DEFAULT_BATCH_SIZE = 20000
+
+# Valor de PRAGMA auto_vacuum no modo incremental
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Linhas de um lote (ids entre ? e ?) que já estão copiadas no arquivo
+ARCHIVED_BATCH = 'SELECT id FROM archive.stock_history WHERE id > ? AND id <= ?'
+
+
+def ensure_archive(db):
+    """
+    Anexa (criando se preciso) o banco de arquivo e cria suas tabelas
+
+    archive.stock_history tem as mesmas colunas do histórico do banco
+    principal e os índices das consultas por produto, data e movimentação.
+
+    Args:
+        db (Database): Banco principal
+    """
+    if not db.attach_archive(create=True):
+        raise RuntimeError("Não é possível anexar o arquivo dentro de uma transação")
+    conn = db.conn
+    conn.execute('PRAGMA archive.journal_mode = WAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive.stock_history (
+            id INTEGER PRIMARY KEY,
+            product_id INTEGER,
+            old_stock INTEGER,
+            new_stock INTEGER,
+            change_type TEXT,
+            reason TEXT,
+            created_at TIMESTAMP,
+            movement_id TEXT,
+            location_id INTEGER,
+            quantity INTEGER
+        )
+    ''')
+    migrations.migrate_archive(conn)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS archive.idx_stock_history_product_created
+        ON stock_history (product_id, created_at)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS archive.idx_stock_history_created
+        ON stock_history (created_at)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS archive.idx_stock_history_movement
+        ON stock_history (movement_id) WHERE movement_id IS NOT NULL
+    ''')
+    conn.commit()
+
+
+def archive_history(db=None, before=None, batch_size=DEFAULT_BATCH_SIZE, vacuum=True):
+    """
+    Move o histórico antigo para o banco de arquivo
+
+    São arquivadas as movimentações anteriores a `before`, inclusive as
+    de produtos já excluídos (órfãs). As órfãs mais recentes ficam no
+    banco principal até passarem do corte: as consultas só leem o arquivo
+    para intervalos anteriores a ele.
+
+    Um commit que grava em dois bancos anexados em WAL não é atômico, por
+    isso cada lote usa duas transações, cada uma gravando em um só banco:
+    a primeira copia as linhas para archive.stock_history; a segunda soma
+    em stock_history_daily e apaga de stock_history só as linhas que já
+    estão no arquivo. Se o processo parar entre as duas, as linhas ficam
+    nos dois bancos (nunca em nenhum) e a próxima execução termina o
+    lote: a cópia usa INSERT OR IGNORE e não duplica nada.
+
+    Args:
+        db (Database): Banco principal; padrão é a instância compartilhada
+        before (date): Arquiva o que for anterior a este dia; padrão é
+            hoje menos DEFAULT_KEEP_DAYS
+        batch_size (int): Linhas movidas por transação
+        vacuum (bool): Devolve ao sistema o espaço liberado no final
+
+    Returns:
+        dict: archived (linhas movidas), orphans (das quais órfãs),
+            days (dias resumidos), freed_pages e before
+    """
+    db = db or get_database()
+    if before is None:
+        before = date.today() - timedelta(days=DEFAULT_KEEP_DAYS)
+    # Sempre um dia inteiro: um mesmo dia nunca fica dividido entre os bancos
+    cutoff = before.strftime('%Y-%m-%d')
+    ensure_archive(db)
+
+    # IDs a mover, calculados uma vez (as órfãs exigem percorrer o histórico)
+    db.execute('DROP TABLE IF EXISTS temp.archive_ids')
+    db.execute('CREATE TEMP TABLE archive_ids (id INTEGER PRIMARY KEY, orphan INTEGER NOT NULL)')
+    db.execute('''
+        INSERT INTO temp.archive_ids (id, orphan)
+        SELECT sh.id, p.id IS NULL
+        FROM main.stock_history sh
+        LEFT JOIN products p ON p.id = sh.product_id
+        WHERE sh.created_at < ?
+    ''', (cutoff,))
+    total, orphans = db.fetch_one('SELECT COUNT(*), COALESCE(SUM(orphan), 0) FROM temp.archive_ids')
+
+    days = 0
+    last_id = 0
+    while True:
+        upper = db.fetch_one('''
+            SELECT MAX(id) FROM (
+                SELECT id FROM temp.archive_ids WHERE id > ? ORDER BY id LIMIT ?
+            )
+        ''', (last_id, batch_size))[0]
+        if upper is None:
+            break
+        with db.transaction():
+            db.execute(f'''
+                INSERT OR IGNORE INTO archive.stock_history
+                ({HISTORY_RAW_COLUMNS})
+                SELECT {HISTORY_RAW_COLUMNS}
+                FROM main.stock_history
+                WHERE id IN (SELECT id FROM temp.archive_ids WHERE id > ? AND id <= ?)
+            ''', (last_id, upper))
+        with db.transaction():
+            days += _rollup_batch(db, last_id, upper)
+            moved = db.execute(f'''
+                DELETE FROM main.stock_history WHERE id IN ({ARCHIVED_BATCH})
+            ''', (last_id, upper)).rowcount
+            db.execute('''
+                UPDATE history_archive SET
+                    archived_before = MAX(COALESCE(archived_before, ''), ?),
+                    archived_rows = archived_rows + ?,
+                    last_run = CURRENT_TIMESTAMP
+                WHERE id = 1
+            ''', (cutoff, moved))
+        last_id = upper
+
+    db.execute('DROP TABLE temp.archive_ids')
+    freed = compact(db) if vacuum and total else 0
+    return {
+        'archived': total,
+        'orphans': orphans,
+        'days': days,
+        'freed_pages': freed,
+        'before': cutoff,
+    }
+
+
+def _rollup_batch(db, first_id, last_id):
+    """
+    Soma um lote de movimentações em stock_history_daily
+
+    Só entram as linhas do lote que já foram copiadas para o arquivo,
+    as mesmas que serão apagadas em seguida. Um dia que já tenha resumo
+    (lote anterior) é acumulado: o estoque de abertura é mantido e o de
+    fechamento passa a ser o do novo lote.
+
+    Returns:
+        int: Quantidade de pares (produto, dia) gravados
+    """
+    cursor = db.execute(f'''
+        INSERT INTO stock_history_daily
+        (product_id, day, movements, units_in, units_out, opening_stock, closing_stock)
+        SELECT product_id, day, COUNT(*),
+               SUM(MAX(change, 0)), SUM(MAX(-change, 0)),
+               MIN(opening_stock), MIN(closing_stock)
+        FROM (
+            SELECT product_id, date(created_at) AS day,
+                   COALESCE(new_stock, 0) - COALESCE(old_stock, 0) AS change,
+                   FIRST_VALUE(old_stock) OVER (
+                       PARTITION BY product_id, date(created_at) ORDER BY created_at, id
+                   ) AS opening_stock,
+                   FIRST_VALUE(new_stock) OVER (
+                       PARTITION BY product_id, date(created_at) ORDER BY created_at DESC, id DESC
+                   ) AS closing_stock
+            FROM main.stock_history
+            WHERE id IN ({ARCHIVED_BATCH})
+        )
+        WHERE true
+        GROUP BY product_id, day
+        ON CONFLICT (product_id, day) DO UPDATE SET
+            movements = movements + excluded.movements,
+            units_in = units_in + excluded.units_in,
+            units_out = units_out + excluded.units_out,
+            closing_stock = excluded.closing_stock
+    ''', (first_id, last_id))
+    return cursor.rowcount
+
+
+def compact(db=None):
+    """
+    Devolve ao sistema de arquivos as páginas livres do banco principal
+
+    Bancos criados antes do auto_vacuum incremental são convertidos com
+    um VACUUM completo (uma única vez, pode demorar em bancos grandes);
+    depois disso basta o incremental_vacuum, que só mexe nas páginas livres.
+
+    Returns:
+        int: Quantidade de páginas liberadas
+    """
+    db = db or get_database()
+    conn = db.conn
+    before = conn.execute('PRAGMA page_count').fetchone()[0]
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        conn.execute(f'PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}')
+        conn.execute('VACUUM')
+    else:
+        conn.execute('PRAGMA incremental_vacuum').fetchall()
+    # Sem isso o espaço só volta no próximo checkpoint automático do WAL
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+    return before - conn.execute('PRAGMA page_count').fetchone()[0]
+
+
+def main(argv=None):
+    """Ponto de entrada do arquivamento pela linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Arquiva o histórico de estoque antigo em um banco separado e compacta o banco principal"
+    )
+    parser.add_argument('--dias', type=int, default=DEFAULT_KEEP_DAYS,
+                        help="Mantém no banco principal as movimentações dos últimos N dias")
+    parser.add_argument('--lote', type=int, default=DEFAULT_BATCH_SIZE, help="Linhas movidas por transação")
+    parser.add_argument('--dias-alteracoes', type=int, default=CHANGE_LOG_KEEP_DAYS,
+                        help="Mantém no registro de alterações (change_log) os últimos N dias")
+    parser.add_argument('--sem-vacuum', action='store_true', help="Não compacta o banco principal no final")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    # Antes do arquivamento, para o VACUUM final devolver também este espaço
+    purged = ChangeLogModel().purge(args.dias_alteracoes)
+    report = archive_history(
+        before=date.today() - timedelta(days=args.dias),
+        batch_size=args.lote,
+        vacuum=not args.sem_vacuum
+    )
+    print(
+        f"{report['archived']} movimentações arquivadas ({report['orphans']} de produtos excluídos), "
+        f"{report['days']} resumos diários, {report['freed_pages']} páginas liberadas "
+        f"em {time.perf_counter() - started:.1f}s"
+    )
+    print(f"Histórico anterior a {report['before']} em {get_database().archive_path}")
+    print(f"{purged} alterações antigas removidas do registro de alterações")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
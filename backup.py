@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from db import BUSY_TIMEOUT_MS, get_database
+
+# Pasta padrão das cópias; pode ser trocada pela variável de ambiente ESTOQUE_BACKUP_DIR
+DEFAULT_BACKUP_DIR = 'backups'
+
+# Páginas copiadas por passo e pausa entre passos: cada passo é curto e a
+# pausa deixa o disco livre para as vendas, mesmo em bancos de vários GB
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+
+# Cópias mantidas pela rotação (as mais novas)
+DEFAULT_KEEP = 14
+
+# Tamanho dos blocos lidos ao calcular o SHA-256
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Extensões dos arquivos auxiliares: soma de verificação e cópia em andamento
+CHECKSUM_SUFFIX = '.sha256'
+PARTIAL_SUFFIX = '.parcial'
+
+
+def backup_dir(directory=None):
+    """Pasta das cópias: a informada, ESTOQUE_BACKUP_DIR ou 'backups'"""
+    return directory or os.environ.get('ESTOQUE_BACKUP_DIR', DEFAULT_BACKUP_DIR)
+
+
+def _stem(db_path):
+    """Nome base das cópias de um banco ('dados/estoque.db' -> 'estoque')"""
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def list_backups(db=None, directory=None):
+    """
+    Lista as cópias de um banco, da mais antiga para a mais nova
+
+    Args:
+        db (Database): Banco copiado; padrão é a instância compartilhada
+        directory (str): Pasta das cópias
+
+    Returns:
+        list: Caminhos dos arquivos (o nome tem data e hora, então a ordem
+            alfabética é a cronológica)
+    """
+    db = db or get_database()
+    pattern = re.compile(re.escape(_stem(db.path)) + r'-\d{8}-\d{6}\.db$')
+    paths = glob.glob(os.path.join(backup_dir(directory), f'{glob.escape(_stem(db.path))}-*.db'))
+    return sorted(path for path in paths if pattern.search(os.path.basename(path)))
+
+
+def archive_copy_path(db, path):
+    """
+    Cópia do banco de arquivo feita junto com a cópia `path` do banco principal
+
+    As duas têm a mesma data e hora no nome:
+    'estoque-20250101-120000.db' -> 'estoque-arquivo-20250101-120000.db'.
+    """
+    stamp = os.path.basename(path)[len(_stem(db.path)) + 1:]
+    return os.path.join(os.path.dirname(path), f'{_stem(db.archive_path)}-{stamp}')
+
+
+def file_sha256(path):
+    """SHA-256 do arquivo, lido em blocos (memória constante)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_checksum(path, checksum):
+    """Grava '<sha256>  <arquivo>' ao lado da cópia (mesmo formato do sha256sum)"""
+    temp_path = path + CHECKSUM_SUFFIX + PARTIAL_SUFFIX
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(f'{checksum}  {os.path.basename(path)}\n')
+    os.replace(temp_path, path + CHECKSUM_SUFFIX)
+
+
+def create_backup(db=None, directory=None, pages=PAGES_PER_STEP, sleep=STEP_SLEEP, keep=None,
+                  check='integrity', progress=None):
+    """
+    Copia o banco em uso para um arquivo novo, sem parar o sistema
+
+    Usa a API de backup online do SQLite em passos de `pages` páginas com
+    pausa de `sleep` segundos entre eles. A leitura acontece dentro de uma
+    única transação de leitura em uma conexão própria: em WAL ela não
+    bloqueia os escritores e a cópia é uma fotografia consistente do
+    momento em que começou (alterações feitas durante a cópia ficam para a
+    próxima, em vez de reiniciar a cópia). Enquanto a cópia roda, o
+    checkpoint não avança além dela, então o arquivo -wal pode crescer.
+
+    A cópia é gravada com outro nome e só ganha o nome final depois de
+    verificada, com o SHA-256 em um arquivo .sha256 ao lado.
+
+    Se existir o banco de arquivo (archive.py), ele é copiado em seguida,
+    com a mesma data e hora no nome. A ordem importa: o arquivamento
+    primeiro copia as linhas para o arquivo e só depois as apaga do banco
+    principal, então uma linha movida entre as duas cópias aparece nas
+    duas (o próximo arquivamento a tira do principal), nunca em nenhuma.
+
+    Args:
+        db (Database): Banco a copiar; padrão é a instância compartilhada
+        directory (str): Pasta das cópias (criada se preciso)
+        pages (int): Páginas copiadas por passo
+        sleep (float): Pausa entre os passos, em segundos
+        keep (int): Depois de copiar, mantém só as `keep` cópias mais novas
+        check (str): 'integrity' (completa), 'quick' (mais rápida) ou None
+        progress (callable): Recebe (páginas restantes, total) a cada passo
+
+    Returns:
+        dict: path, size, sha256, archive (cópia do banco de arquivo ou
+            None), seconds e removed (cópias apagadas pela rotação)
+
+    Raises:
+        RuntimeError: A cópia não passou na verificação de integridade
+    """
+    db = db or get_database()
+    directory = backup_dir(directory)
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+
+    path = os.path.join(directory, f'{_stem(db.path)}-{datetime.now():%Y%m%d-%H%M%S}.db')
+    # O nome tem resolução de segundos: duas cópias seguidas não se sobrescrevem
+    while os.path.exists(path) or os.path.exists(archive_copy_path(db, path)):
+        time.sleep(1)
+        path = os.path.join(directory, f'{_stem(db.path)}-{datetime.now():%Y%m%d-%H%M%S}.db')
+
+    checksum = _copy_database(db.path, path, pages, sleep, check, progress)
+    archive_path = None
+    if os.path.exists(db.archive_path):
+        archive_path = archive_copy_path(db, path)
+        try:
+            _copy_database(db.archive_path, archive_path, pages, sleep, check)
+        except BaseException:
+            # Sem o par, a cópia do banco principal não poderia ser restaurada
+            for name in (path, path + CHECKSUM_SUFFIX):
+                os.remove(name)
+            raise
+    removed = rotate_backups(db, directory, keep) if keep else []
+    return {
+        'path': path,
+        'size': os.path.getsize(path),
+        'sha256': checksum,
+        'archive': archive_path,
+        'seconds': time.perf_counter() - started,
+        'removed': removed,
+    }
+
+
+def _copy_database(source_path, path, pages=PAGES_PER_STEP, sleep=STEP_SLEEP, check='integrity',
+                   progress=None):
+    """
+    Copia um banco para `path` pela API de backup online (ver create_backup)
+
+    Returns:
+        str: SHA-256 da cópia, também gravado no arquivo .sha256 ao lado
+    """
+    partial_path = path + PARTIAL_SUFFIX
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    source = sqlite3.connect(f'file:{os.path.abspath(source_path)}?mode=ro', uri=True, isolation_level=None)
+    target = sqlite3.connect(partial_path, isolation_level=None)
+    try:
+        # Fixa a fotografia: todos os passos leem a mesma versão do banco
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(
+            target, pages=pages, sleep=sleep,
+            progress=(lambda status, remaining, total: progress(remaining, total)) if progress else None
+        )
+        source.execute('COMMIT')
+        # A cópia vira um arquivo único (sem -wal), pronta para ser movida
+        target.execute('PRAGMA journal_mode = DELETE')
+        if check:
+            pragma = 'integrity_check' if check == 'integrity' else 'quick_check'
+            result = target.execute(f'PRAGMA {pragma}').fetchone()[0]
+            if result != 'ok':
+                raise RuntimeError(f"Cópia corrompida ({pragma}): {result}")
+    except BaseException:
+        target.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    checksum = file_sha256(partial_path)
+    os.replace(partial_path, path)
+    _write_checksum(path, checksum)
+    return checksum
+
+
+def rotate_backups(db=None, directory=None, keep=DEFAULT_KEEP):
+    """
+    Apaga as cópias mais antigas, mantendo as `keep` mais novas
+
+    A cópia do banco de arquivo feita junto com cada uma sai com ela.
+
+    Returns:
+        list: Caminhos das cópias apagadas (só as do banco principal)
+    """
+    db = db or get_database()
+    backups = list_backups(db, directory)
+    removed = backups[:-keep] if keep > 0 else backups
+    for path in removed:
+        for file_path in (path, archive_copy_path(db, path)):
+            for name in (file_path, file_path + CHECKSUM_SUFFIX):
+                if os.path.exists(name):
+                    os.remove(name)
+    return removed
+
+
+def verify_backup(path, check='integrity'):
+    """
+    Confere uma cópia: SHA-256 contra o arquivo .sha256 e integridade do SQLite
+
+    Args:
+        path (str): Arquivo da cópia
+        check (str): 'integrity' (completa), 'quick' ou None (só o SHA-256)
+
+    Returns:
+        tuple: (True, None) se estiver tudo certo, senão (False, motivo)
+    """
+    if not os.path.exists(path):
+        return False, "arquivo não encontrado"
+    if not os.path.exists(path + CHECKSUM_SUFFIX):
+        return False, "arquivo .sha256 não encontrado"
+    with open(path + CHECKSUM_SUFFIX, encoding='utf-8') as file:
+        expected = file.read().split()[0]
+    if file_sha256(path) != expected:
+        return False, "SHA-256 diferente do registrado"
+    if check:
+        pragma = 'integrity_check' if check == 'integrity' else 'quick_check'
+        conn = sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True)
+        try:
+            result = conn.execute(f'PRAGMA {pragma}').fetchone()[0]
+        finally:
+            conn.close()
+        if result != 'ok':
+            return False, f"{pragma}: {result}"
+    return True, None
+
+
+def restore_backup(path, db=None, directory=None):
+    """
+    Troca o conteúdo do banco pelo de uma cópia verificada
+
+    Antes de restaurar, a cópia é conferida (SHA-256 e integridade) e o
+    banco atual é copiado para a pasta das cópias, para a troca poder ser
+    desfeita. A restauração usa a própria API de backup do SQLite no
+    sentido inverso: o banco de destino fica travado durante a troca e as
+    conexões abertas por outros processos passam a ver o conteúdo novo.
+    Mesmo assim, reinicie menu e API depois: caches e o índice de busca em
+    memória continuam com os dados antigos.
+
+    A cópia do banco de arquivo feita junto (mesma data e hora) é
+    restaurada também. Uma cópia sem ela é recusada se o banco já tiver
+    arquivo: o histórico arquivado depois da cópia ficaria nos dois bancos
+    e o arquivamento registrado no banco restaurado não corresponderia
+    ao conteúdo do arquivo. Nesse caso, mova o arquivo antes de restaurar.
+
+    Args:
+        path (str): Cópia a restaurar
+        db (Database): Banco de destino; padrão é a instância compartilhada
+        directory (str): Pasta onde fica a cópia de segurança do banco atual
+
+    Returns:
+        str: Caminho da cópia do banco como estava antes da restauração
+
+    Raises:
+        ValueError: A cópia (ou a do arquivo) não passou na verificação, ou
+            falta a cópia do arquivo para um banco que tem arquivo
+    """
+    db = db or get_database()
+    archive_path = archive_copy_path(db, path)
+    restores = [(path, db.path)]
+    if os.path.exists(archive_path):
+        restores.append((archive_path, db.archive_path))
+    elif os.path.exists(db.archive_path):
+        raise ValueError(
+            f"A cópia {path} não tem a cópia do banco de arquivo ({archive_path}), "
+            f"mas {db.archive_path} existe; mova-o antes de restaurar"
+        )
+    for copy_path, _ in restores:
+        ok, reason = verify_backup(copy_path)
+        if not ok:
+            raise ValueError(f"Cópia inválida ({reason}): {copy_path}")
+    before = create_backup(db, directory, check='quick')['path']
+
+    for copy_path, target_path in restores:
+        source = sqlite3.connect(f'file:{os.path.abspath(copy_path)}?mode=ro', uri=True)
+        target = sqlite3.connect(target_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+    return before
+
+
+class BackupScheduler:
+    """
+    Cópias periódicas em uma thread de fundo, com rotação
+
+    Usado pelo servidor (--backup-intervalo) e pelo comando 'agendar'.
+    """
+
+    def __init__(self, interval, db=None, directory=None, keep=DEFAULT_KEEP, on_backup=None, lock=None):
+        """
+        Args:
+            interval (float): Intervalo entre cópias, em segundos
+            db (Database): Banco a copiar; padrão é a instância compartilhada
+            directory (str): Pasta das cópias
+            keep (int): Cópias mantidas pela rotação
+            on_backup (callable): Recebe o relatório de cada cópia ou a exceção
+            lock (threading.Lock): Trava compartilhada com outras cópias do processo
+        """
+        self.interval = interval
+        self.db = db or get_database()
+        self.directory = directory
+        self.keep = keep
+        self.on_backup = on_backup
+        self.lock = lock or threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread (a primeira cópia sai depois de um intervalo)"""
+        self._thread = threading.Thread(target=self.run, name='estoque-backup', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Laço das cópias até stop()"""
+        while not self._stop.wait(self.interval):
+            try:
+                with self.lock:
+                    report = create_backup(self.db, self.directory, keep=self.keep)
+            except Exception as e:
+                report = e
+            if self.on_backup:
+                self.on_backup(report)
+
+    def stop(self, timeout=None):
+        """Interrompe a espera e aguarda uma cópia em andamento terminar"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _print_report(report):
+    """Imprime o resultado de uma cópia"""
+    if isinstance(report, Exception):
+        print(f"Erro na cópia: {report}", file=sys.stderr, flush=True)
+        return
+    print(
+        f"{report['path']} ({report['size'] / 1024 / 1024:.1f} MB, {report['seconds']:.1f}s) "
+        f"sha256 {report['sha256'][:16]}…",
+        flush=True
+    )
+    if report['archive']:
+        print(f"  arquivo: {report['archive']}", flush=True)
+    for path in report['removed']:
+        print(f"  removida pela rotação: {path}", flush=True)
+
+
+def main(argv=None):
+    """Ponto de entrada das cópias de segurança pela linha de comando"""
+    parser = argparse.ArgumentParser(description="Cópias de segurança online do banco de estoque")
+    parser.add_argument('--pasta', help="Pasta das cópias (padrão: ESTOQUE_BACKUP_DIR ou 'backups')")
+    commands = parser.add_subparsers(dest='comando', required=True)
+
+    create = commands.add_parser('criar', help="Faz uma cópia agora")
+    create.add_argument('--manter', type=int, help="Mantém só as N cópias mais novas")
+    create.add_argument('--paginas', type=int, default=PAGES_PER_STEP, help="Páginas copiadas por passo")
+    create.add_argument('--pausa', type=float, default=STEP_SLEEP, help="Pausa entre passos (s)")
+    create.add_argument('--rapido', action='store_true', help="Verificação rápida (quick_check)")
+
+    schedule = commands.add_parser('agendar', help="Faz cópias periódicas até Ctrl+C")
+    schedule.add_argument('--intervalo', type=float, default=60, help="Minutos entre cópias")
+    schedule.add_argument('--manter', type=int, default=DEFAULT_KEEP, help="Cópias mantidas pela rotação")
+
+    commands.add_parser('listar', help="Lista as cópias existentes")
+
+    verify = commands.add_parser('verificar', help="Confere SHA-256 e integridade das cópias")
+    verify.add_argument('arquivos', nargs='*', help="Cópias a conferir (padrão: todas)")
+    verify.add_argument('--rapido', action='store_true', help="Verificação rápida (quick_check)")
+
+    restore = commands.add_parser('restaurar', help="Troca o banco pelo conteúdo de uma cópia")
+    restore.add_argument('arquivo', help="Cópia a restaurar")
+    restore.add_argument('--sim', action='store_true', help="Não pede confirmação")
+    args = parser.parse_args(argv)
+
+    if args.comando == 'criar':
+        _print_report(create_backup(
+            directory=args.pasta, pages=args.paginas, sleep=args.pausa, keep=args.manter,
+            check='quick' if args.rapido else 'integrity'
+        ))
+    elif args.comando == 'agendar':
+        scheduler = BackupScheduler(args.intervalo * 60, directory=args.pasta, keep=args.manter)
+        print(f"Cópia a cada {args.intervalo:g} min em {backup_dir(args.pasta)} (Ctrl+C para parar)")
+        try:
+            _print_report(create_backup(directory=args.pasta, keep=args.manter))
+            scheduler.on_backup = _print_report
+            scheduler.run()
+        except KeyboardInterrupt:
+            print("\nAgendamento encerrado")
+    elif args.comando == 'listar':
+        for path in list_backups(directory=args.pasta):
+            print(f"{path}\t{os.path.getsize(path)}")
+    elif args.comando == 'verificar':
+        failures = 0
+        for backup_path in args.arquivos or list_backups(directory=args.pasta):
+            archive_path = archive_copy_path(get_database(), backup_path)
+            for path in (backup_path, archive_path) if os.path.exists(archive_path) else (backup_path,):
+                ok, reason = verify_backup(path, 'quick' if args.rapido else 'integrity')
+                print(f"{path}\t{'ok' if ok else reason}")
+                failures += not ok
+        return 1 if failures else 0
+    else:
+        if not args.sim:
+            answer = input(f"Substituir {get_database().path} pelo conteúdo de {args.arquivo}? [s/N] ")
+            if answer.strip().lower() not in ('s', 'sim'):
+                print("Restauração cancelada")
+                return 1
+        try:
+            before = restore_backup(args.arquivo, directory=args.pasta)
+        except ValueError as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 1
+        print(f"Banco restaurado de {args.arquivo}")
+        print(f"Conteúdo anterior guardado em {before}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
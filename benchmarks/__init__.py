@@ -0,0 +1,6 @@
+"""
+Benchmarks do sistema de estoque
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.run --tamanhos 1000,10000,100000 --saida resultados.json
+"""
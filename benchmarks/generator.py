@@ -0,0 +1,128 @@
+import random
+from datetime import datetime, timedelta
+
+from db import Database
+
+# Data fixa de início: o mesmo seed gera sempre o mesmo banco
+BASE_DATE = datetime(2024, 1, 1)
+HISTORY_DAYS = 365
+
+BRANDS = [
+    'Nestlé', 'Unilever', 'Ypê', 'Colgate', 'Sadia', 'Perdigão', 'Piracanjuba',
+    'Camil', 'Tio João', 'Pilão', 'Melitta', 'Coca-Cola', 'Ambev', 'Bauducco',
+    'Vitarella', 'Omo', 'Dove', 'Seara', 'Qualy', 'Italac', 'Garoto', 'Lacta',
+]
+NOUNS = [
+    'Arroz', 'Feijão', 'Café', 'Açúcar', 'Leite', 'Biscoito', 'Sabão', 'Detergente',
+    'Shampoo', 'Creme Dental', 'Refrigerante', 'Cerveja', 'Chocolate', 'Macarrão',
+    'Óleo', 'Farinha', 'Margarina', 'Iogurte', 'Queijo', 'Presunto', 'Suco', 'Água',
+]
+VARIANTS = [
+    'Tradicional', 'Integral', 'Light', 'Zero', 'Premium', 'Extra Forte', 'Original',
+    'Morango', 'Chocolate', 'Limão', 'Menta', 'Coco', 'Baunilha', 'Sem Lactose',
+]
+SIZES = ['200g', '500g', '1kg', '2kg', '5kg', '350ml', '1L', '2L', '90g', '12un']
+CHANGE_TYPES = ['venda', 'venda', 'venda', 'entrada', 'manual']
+
+
+def _timestamp(moment):
+    """Formata a data como o CURRENT_TIMESTAMP do SQLite"""
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def generate_catalog(path, products, history, seed=42, batch_size=50000, progress=None):
+    """
+    Gera um banco sintético e determinístico para benchmarks
+
+    O histórico é gerado em ordem cronológica com old_stock/new_stock
+    encadeados por produto, e o estoque final de cada produto bate com
+    a última movimentação. O mesmo (products, history, seed) gera sempre
+    os mesmos dados.
+
+    Args:
+        path (str): Caminho do arquivo a criar (deve ser novo)
+        products (int): Quantidade de produtos
+        history (int): Quantidade de linhas de stock_history
+        seed (int): Semente do gerador pseudoaleatório
+        batch_size (int): Linhas por executemany
+        progress (callable): Chamado com (tabela, linhas gravadas) a cada lote
+    """
+    rng = random.Random(seed)
+    db = Database(path)
+    conn = db.conn
+    # Banco descartável: durabilidade não importa durante a carga
+    conn.execute('PRAGMA synchronous = OFF')
+
+    stock = [rng.randint(0, 200) for _ in range(products)]
+    last_update = [BASE_DATE] * products
+
+    step = timedelta(days=HISTORY_DAYS) / max(history, 1)
+    rows = []
+    with db.transaction():
+        for i in range(history):
+            product_index = rng.randrange(products)
+            change_type = rng.choice(CHANGE_TYPES)
+            if change_type == 'venda':
+                delta = -rng.randint(1, 5)
+            elif change_type == 'entrada':
+                delta = rng.randint(10, 100)
+            else:
+                delta = rng.randint(-10, 10)
+            old_stock = stock[product_index]
+            new_stock = max(old_stock + delta, 0)
+            stock[product_index] = new_stock
+            moment = BASE_DATE + step * i
+            last_update[product_index] = moment
+            rows.append((product_index + 1, old_stock, new_stock, change_type, '', _timestamp(moment)))
+
+            if len(rows) >= batch_size:
+                _insert_history(db, rows)
+                if progress:
+                    progress('stock_history', i + 1)
+                rows = []
+        if rows:
+            _insert_history(db, rows)
+            if progress:
+                progress('stock_history', history)
+
+    rows = []
+    with db.transaction():
+        for index in range(products):
+            brand = rng.choice(BRANDS)
+            name = f"{rng.choice(NOUNS)} {brand} {rng.choice(VARIANTS)} {rng.choice(SIZES)}"
+            price = round(rng.uniform(1.5, 120.0), 2)
+            rows.append((
+                index + 1, name, f"Produto sintético {index + 1}", price, stock[index], brand,
+                _timestamp(BASE_DATE), _timestamp(last_update[index])
+            ))
+
+            if len(rows) >= batch_size:
+                _insert_products(db, rows)
+                if progress:
+                    progress('products', index + 1)
+                rows = []
+        if rows:
+            _insert_products(db, rows)
+            if progress:
+                progress('products', products)
+
+    conn.execute('ANALYZE')
+    db.close_all()
+
+
+def _insert_history(db, rows):
+    """Grava um lote de linhas de histórico"""
+    db.executemany('''
+        INSERT INTO stock_history
+        (product_id, old_stock, new_stock, change_type, reason, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def _insert_products(db, rows):
+    """Grava um lote de produtos"""
+    db.executemany('''
+        INSERT INTO products
+        (id, name, description, price, stock, brand, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
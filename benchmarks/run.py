@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.generator import BASE_DATE, HISTORY_DAYS, generate_catalog
+from cache import LRUCache
+from db import Database
+from models import ProductModel, StockHistoryModel
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Linhas de histórico por produto no banco gerado
+HISTORY_RATIO = 20
+DEFAULT_SEED = 42
+
+# Cada benchmark roda até atingir o número de iterações ou o tempo máximo
+DEFAULT_ITERATIONS = 2000
+DEFAULT_TIME_LIMIT = 3.0
+WARMUP_ITERATIONS = 20
+
+# Variação relativa a partir da qual um resultado é considerado regressão
+DEFAULT_TOLERANCE = 0.20
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por vizinho mais próximo de uma lista já ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(operation, iterations, time_limit):
+    """
+    Executa uma operação repetidamente e mede a latência de cada chamada
+
+    Args:
+        operation (callable): Recebe o número da iteração
+        iterations (int): Máximo de iterações medidas
+        time_limit (float): Tempo máximo de medição, em segundos
+
+    Returns:
+        dict: ops, ops_per_sec, p50_ms, p99_ms e max_ms
+    """
+    for i in range(WARMUP_ITERATIONS):
+        operation(i)
+
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + time_limit
+    for i in range(iterations):
+        before = time.perf_counter()
+        operation(i)
+        after = time.perf_counter()
+        latencies.append(after - before)
+        if after > deadline:
+            break
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'ops': len(latencies),
+        'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def build_benchmarks(products, history, size, seed):
+    """
+    Monta a lista de microbenchmarks dos métodos dos modelos
+
+    Os argumentos de cada chamada são sorteados com um gerador próprio,
+    então duas execuções com o mesmo seed fazem exatamente as mesmas chamadas.
+
+    Returns:
+        list: Pares (nome, função que recebe o número da iteração)
+    """
+    rng = random.Random(seed)
+    ids = [rng.randint(1, size) for _ in range(4096)]
+    deltas = [rng.choice((-2, -1, 1, 3)) for _ in range(4096)]
+    names = [products.get_by_id(product_id).name for product_id in ids[:256]]
+    # Trechos do meio do nome, como um operador digitaria
+    terms = [name.split(' ')[0][:5] for name in names] + [name.split(' ')[1] for name in names]
+    days = [
+        (BASE_DATE + timedelta(days=rng.randrange(HISTORY_DAYS))).strftime('%Y-%m-%d')
+        for _ in range(256)
+    ]
+    deep_cursor = products.get_all_page(limit=min(size // 2, 5000)).next_cursor
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    def iterate_day(i):
+        start = pick(days, i)
+        for _ in history.iter_range(start + ' 00:00:00', start + ' 01:00:00'):
+            pass
+
+    return [
+        ('product.get_by_id', lambda i: products.get_by_id(pick(ids, i))),
+        ('product.search', lambda i: products.search(pick(terms, i))),
+        ('product.search_id', lambda i: products.search(str(pick(ids, i)))),
+        # Índice em memória (montado no aquecimento, antes da medição)
+        ('product.suggest_page', lambda i: products.suggest_page(pick(terms, i))),
+        ('product.get_all_page.first', lambda i: products.get_all_page()),
+        ('product.get_all_page.deep', lambda i: products.get_all_page(deep_cursor)),
+        ('product.get_low_stock_page', lambda i: products.get_low_stock_page()),
+        ('product.get_out_of_stock_page', lambda i: products.get_out_of_stock_page()),
+        ('product.get_stats', lambda i: products.get_stats()),
+        ('product.get_stats.custom_threshold', lambda i: products.get_stats(5)),
+        ('product.update_stock', lambda i: products.update_stock(pick(ids, i), 50, 'bench')),
+        ('product.adjust_stock', lambda i: products.adjust_stock(pick(ids, i), pick(deltas, i), 'bench')),
+        ('product.apply_movement.10', lambda i: products.apply_movement(
+            [(pick(ids, i + j), pick(deltas, i + j)) for j in range(10)], 'bench'
+        )),
+        ('history.get_by_product', lambda i: history.get_by_product(pick(ids, i))),
+        ('history.get_recent', lambda i: history.get_recent()),
+        ('history.get_recent_page', lambda i: history.get_recent_page()),
+        ('history.iter_range.1h', iterate_day),
+    ]
+
+
+def run_size(size, data_dir, seed, iterations, time_limit, only=None):
+    """
+    Gera (ou reaproveita) o banco de um tamanho e roda os benchmarks nele
+
+    Returns:
+        list: Um dicionário de resultado por benchmark
+    """
+    history_rows = size * HISTORY_RATIO
+    path = os.path.join(data_dir, f'bench_{size}_{history_rows}_{seed}.db')
+    if not os.path.exists(path):
+        print(f"Gerando {size} produtos e {history_rows} movimentações em {path}...", flush=True)
+        started = time.perf_counter()
+        generate_catalog(path, size, history_rows, seed)
+        print(f"  gerado em {time.perf_counter() - started:.1f}s", flush=True)
+
+    db = Database(path)
+    products = ProductModel(db)
+    history = StockHistoryModel(db)
+    # Mede o banco, não o cache: um cache de tamanho zero nunca acerta
+    products.cache = LRUCache(0)
+    products.search_cache = LRUCache(0)
+
+    results = []
+    for name, operation in build_benchmarks(products, history, size, seed):
+        if only and not any(pattern in name for pattern in only):
+            continue
+        result = measure(operation, iterations, time_limit)
+        result.update({'size': size, 'benchmark': name})
+        results.append(result)
+        print(
+            f"  {size:>9} {name:<36} {result['ops_per_sec']:>10.1f} ops/s"
+            f"  p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms",
+            flush=True
+        )
+
+    db.close_all()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compara resultados com uma execução anterior
+
+    Uma regressão é uma queda de ops/s ou aumento de p99 acima da tolerância.
+
+    Returns:
+        list: Mensagens descrevendo cada regressão encontrada
+    """
+    previous = {(r['size'], r['benchmark']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result['size'], result['benchmark']))
+        if not old:
+            continue
+        if old['ops_per_sec'] and result['ops_per_sec'] < old['ops_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{result['benchmark']} ({result['size']}): ops/s "
+                f"{old['ops_per_sec']:.1f} -> {result['ops_per_sec']:.1f}"
+            )
+        if old['p99_ms'] and result['p99_ms'] > old['p99_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{result['benchmark']} ({result['size']}): p99 "
+                f"{old['p99_ms']:.3f} ms -> {result['p99_ms']:.3f} ms"
+            )
+    return regressions
+
+
+def main(argv=None):
+    """Ponto de entrada dos benchmarks pela linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmarks reproduzíveis dos modelos de estoque")
+    parser.add_argument('--tamanhos', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Quantidades de produtos, separadas por vírgula")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Semente dos dados e das chamadas")
+    parser.add_argument('--dados', default='bench_data', help="Pasta dos bancos gerados (reaproveitados)")
+    parser.add_argument('--iteracoes', type=int, default=DEFAULT_ITERATIONS, help="Máximo de chamadas por benchmark")
+    parser.add_argument('--tempo', type=float, default=DEFAULT_TIME_LIMIT, help="Tempo máximo por benchmark (s)")
+    parser.add_argument('--filtro', help="Roda só benchmarks cujo nome contenha um destes trechos (vírgulas)")
+    parser.add_argument('--saida', help="Grava os resultados neste arquivo JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=DEFAULT_TOLERANCE,
+                        help="Variação relativa tolerada antes de acusar regressão")
+    args = parser.parse_args(argv)
+
+    sizes = [int(value) for value in args.tamanhos.split(',') if value.strip()]
+    only = [value.strip() for value in args.filtro.split(',')] if args.filtro else None
+    os.makedirs(args.dados, exist_ok=True)
+
+    results = []
+    for size in sizes:
+        results.extend(run_size(size, args.dados, args.seed, args.iteracoes, args.tempo, only))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'history_ratio': HISTORY_RATIO,
+        },
+        'results': results,
+    }
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerancia)
+        if regressions:
+            print("\nRegressões:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNenhuma regressão acima da tolerância")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
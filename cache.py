@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Marcador de "não está no cache" (None é um valor válido para guardar)
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache em memória com tamanho limitado (LRU) e validade por tempo (TTL)
+
+    Seguro para uso por várias threads. Mantém contadores de acertos,
+    faltas e descartes para diagnóstico.
+
+    Toda remoção incrementa `generation`. Quem lê do banco para preencher
+    o cache anota a geração antes da leitura e a passa para set(): se
+    alguma remoção aconteceu no meio, o valor lido pode ser anterior a
+    ela e não é guardado.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30.0, clock=time.monotonic):
+        """
+        Args:
+            maxsize (int): Quantidade máxima de entradas
+            ttl (float): Validade de cada entrada, em segundos
+            clock (callable): Relógio usado para o TTL
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+    def get(self, key, default=MISSING):
+        """Retorna o valor guardado ou `default` se ausente ou expirado"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        """
+        Guarda um valor, descartando o menos usado se o cache estiver cheio
+
+        Args:
+            key: Chave
+            value: Valor
+            generation (int): `generation` lida antes de buscar o valor; se
+                mudou desde então, o valor não é guardado
+
+        Returns:
+            bool: True se o valor foi guardado
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key):
+        """Remove uma entrada, se existir"""
+        with self._lock:
+            self._data.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        """Remove todas as entradas (os contadores são mantidos)"""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self):
+        """
+        Retorna os contadores do cache
+
+        Returns:
+            dict: hits, misses, evictions, size, maxsize e hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
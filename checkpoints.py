@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from db import get_database
+from models import StockHistoryModel
+
+
+def parse_timestamp(value):
+    """
+    Converte a data da linha de comando para o formato do banco
+
+    Uma data sem horário significa o fim do dia ('AAAA-MM-DD 23:59:59').
+    """
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == '%Y-%m-%d':
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    raise ValueError(f"Data inválida: {value!r} (use AAAA-MM-DD)")
+
+
+def build_checkpoint(db=None, taken_at=None):
+    """
+    Grava um checkpoint com o estoque de todos os produtos
+
+    Sem `taken_at`, fotografa a tabela products agora, dentro de uma
+    transação de escrita (nenhum ajuste entra no meio). Com `taken_at`
+    no passado, o estoque é reconstruído com StockHistoryModel.as_of a
+    partir do checkpoint anterior. Um instante no futuro é recusado: o
+    estoque de hoje ficaria gravado como se fosse o daquela data.
+
+    Args:
+        db (Database): Banco; padrão é a instância compartilhada
+        taken_at (str): Instante 'AAAA-MM-DD HH:MM:SS' do checkpoint
+
+    Returns:
+        tuple: (id do checkpoint, quantidade de produtos); se já existir
+            um checkpoint no mesmo instante, ele é devolvido sem refazer
+
+    Raises:
+        ValueError: Se `taken_at` for posterior ao instante atual
+    """
+    db = db or get_database()
+    history = StockHistoryModel(db)
+    # O arquivo só pode ser anexado fora da transação
+    db.attach_archive()
+    with db.transaction():
+        now = db.fetch_one('SELECT CURRENT_TIMESTAMP')[0]
+        if taken_at is None:
+            taken_at = now
+        elif taken_at > now:
+            raise ValueError(f"Checkpoint no futuro: {taken_at} é depois de agora ({now} UTC)")
+        existing = db.fetch_one(
+            'SELECT id, product_count FROM stock_checkpoints WHERE taken_at = ?', (taken_at,)
+        )
+        if existing:
+            return existing
+
+        if taken_at == now:
+            items_query = '''
+                SELECT ?, id, stock, price FROM products WHERE created_at <= ?
+            '''
+            items_params = (taken_at,)
+        else:
+            query, items_params = history._as_of_query(taken_at)
+            items_query = f'SELECT ?, product_id, stock, price FROM ({query})'
+
+        checkpoint_id = db.execute(
+            'INSERT INTO stock_checkpoints (taken_at) VALUES (?)', (taken_at,)
+        ).lastrowid
+        count = db.execute(f'''
+            INSERT INTO stock_checkpoint_items (checkpoint_id, product_id, stock, price)
+            {items_query}
+        ''', [checkpoint_id] + list(items_params)).rowcount
+        db.execute(
+            'UPDATE stock_checkpoints SET product_count = ? WHERE id = ?', (count, checkpoint_id)
+        )
+    return checkpoint_id, count
+
+
+def build_monthly_checkpoints(db=None, progress=None):
+    """
+    Cria os checkpoints de fim de mês que ainda não existem
+
+    Vai do mês da movimentação mais antiga até o último mês fechado, em
+    ordem, então cada checkpoint é reconstruído a partir do anterior.
+
+    Args:
+        db (Database): Banco; padrão é a instância compartilhada
+        progress (callable): Chamado com (taken_at, produtos) a cada checkpoint
+
+    Returns:
+        int: Quantidade de checkpoints criados
+    """
+    db = db or get_database()
+    first = db.fetch_one('SELECT MIN(created_at) FROM stock_history')[0]
+    if db.attach_archive():
+        archived = db.fetch_one('SELECT MIN(created_at) FROM archive.stock_history')[0]
+        if archived and (not first or archived < first):
+            first = archived
+    if not first:
+        return 0
+
+    year, month = int(first[:4]), int(first[5:7])
+    now = datetime.now()
+    created = 0
+    while (year, month) < (now.year, now.month):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        # Último segundo do mês anterior a (year, month)
+        taken_at = (datetime(year, month, 1) - timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S')
+        if db.fetch_one('SELECT 1 FROM stock_checkpoints WHERE taken_at = ?', (taken_at,)):
+            continue
+        _, count = build_checkpoint(db, taken_at)
+        created += 1
+        if progress:
+            progress(taken_at, count)
+    return created
+
+
+def main(argv=None):
+    """Ponto de entrada dos checkpoints pela linha de comando"""
+    parser = argparse.ArgumentParser(description="Checkpoints de estoque e inventário em uma data passada")
+    commands = parser.add_subparsers(dest='comando', required=True)
+    create = commands.add_parser('criar', help="Cria um checkpoint (agora ou na data informada)")
+    create.add_argument('--em', help="Data/hora do checkpoint (AAAA-MM-DD [HH:MM:SS])")
+    commands.add_parser('mensal', help="Cria os checkpoints de fim de mês que faltam")
+    inventory = commands.add_parser('inventario', help="Mostra o valor do inventário em uma data")
+    inventory.add_argument('data', help="Data/hora (AAAA-MM-DD = fim do dia)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.comando == 'criar':
+        try:
+            checkpoint_id, count = build_checkpoint(taken_at=parse_timestamp(args.em) if args.em else None)
+        except ValueError as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 1
+        print(f"Checkpoint {checkpoint_id} com {count} produtos")
+    elif args.comando == 'mensal':
+        created = build_monthly_checkpoints(
+            progress=lambda taken_at, count: print(f"  {taken_at}: {count} produtos", flush=True)
+        )
+        print(f"{created} checkpoints criados")
+    else:
+        timestamp = parse_timestamp(args.data)
+        history = StockHistoryModel()
+        valuation = history.valuation_as_of(timestamp)
+        checkpoint = history.nearest_checkpoint(timestamp)
+        print(f"Inventário em {timestamp}")
+        print(f"  Checkpoint de referência: {checkpoint[1] if checkpoint else 'nenhum'}")
+        print(f"  Produtos: {valuation['total_products']}")
+        print(f"  Unidades: {valuation['total_units']}")
+        print(f"  Valor: R$ {valuation['total_value']:.2f}")
+    print(f"Concluído em {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
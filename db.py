@@ -1,16 +1,168 @@
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+import migrations
+from metrics import QueryMetrics
+
+# Caminho padrão do banco; pode ser trocado pela variável de ambiente ESTOQUE_DB
+DEFAULT_DB_PATH = 'estoque.db'
+
+# Ajustes aplicados a toda conexão aberta
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Arquivo do histórico arquivado: 'estoque.db' -> 'estoque-arquivo.db' (ver archive.py)
+ARCHIVE_SUFFIX = '-arquivo'
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def get_database(path=None):
+    """
+    Retorna a instância de Database compartilhada para o caminho informado
+    
+    Todos os modelos que usam o mesmo arquivo compartilham a mesma
+    instância e, portanto, a mesma conexão em cada thread.
+    
+    Args:
+        path (str): Caminho do banco; padrão ESTOQUE_DB ou 'estoque.db'
+    
+    Returns:
+        Database: Instância compartilhada
+    """
+    path = path or os.environ.get('ESTOQUE_DB', DEFAULT_DB_PATH)
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = Database(path)
+        return _databases[path]
+
 class Database:
-    def __init__(self):
-        """Inicializa a conexão com o banco de dados SQLite e cria as tabelas"""
-        self.conn = sqlite3.connect('estoque.db', check_same_thread=False)
+    def __init__(self, path=None):
+        """
+        Prepara o acesso ao banco de dados SQLite e cria as tabelas
+        
+        Cada thread recebe sua própria conexão (criada no primeiro uso),
+        todas configuradas com WAL, synchronous=NORMAL, busy_timeout,
+        mmap e cache maiores. Prefira get_database() para compartilhar
+        a instância entre os modelos.
+        
+        Args:
+            path (str): Caminho do banco; padrão ESTOQUE_DB ou 'estoque.db'
+        """
+        self.path = path or os.environ.get('ESTOQUE_DB', DEFAULT_DB_PATH)
+        root, ext = os.path.splitext(self.path)
+        self.archive_path = f'{root}{ARCHIVE_SUFFIX}{ext or ".db"}'
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Tempo e linhas de cada query, com log das lentas (ver metrics.py)
+        self.metrics = QueryMetrics()
         self.create_tables()
     
+    @property
+    def conn(self):
+        """Conexão da thread atual, aberta e configurada no primeiro acesso"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.transaction_depth = 0
+            self._local.archive_attached = False
+        return conn
+    
+    @property
+    def _transaction_depth(self):
+        """Nível de aninhamento de transaction() na thread atual"""
+        return getattr(self._local, 'transaction_depth', 0)
+    
+    @_transaction_depth.setter
+    def _transaction_depth(self, value):
+        self._local.transaction_depth = value
+    
+    def _connect(self):
+        """Abre uma nova conexão com os PRAGMAs de desempenho aplicados"""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False
+        )
+        # Só tem efeito em banco novo (antes do WAL criar o arquivo); bancos
+        # existentes são convertidos pelo archive.py com um VACUUM
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        # WAL: leitores não bloqueiam o escritor e vice-versa
+        conn.execute('PRAGMA journal_mode = WAL')
+        # Em WAL, NORMAL só faz fsync no checkpoint, sem risco de corromper o banco
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+    
+    def attach_archive(self, create=False):
+        """
+        Anexa o banco de arquivo à conexão da thread atual com o nome 'archive'
+        
+        O arquivo só é anexado se existir (ou se `create` for True) e fora
+        de transação, pois o SQLite não permite ATTACH dentro de uma.
+        
+        Args:
+            create (bool): Cria o arquivo se ainda não existir
+        
+        Returns:
+            bool: True se 'archive' está disponível nesta conexão
+        """
+        conn = self.conn
+        if self._local.archive_attached:
+            return True
+        if not create and not os.path.exists(self.archive_path):
+            return False
+        if conn.in_transaction:
+            return False
+        conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+        migrations.migrate_archive(conn)
+        self._local.archive_attached = True
+        return True
+    
+    def close(self):
+        """Fecha a conexão da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with self._connections_lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+            self._local.conn = None
+    
+    def close_all(self):
+        """Fecha as conexões de todas as threads (use ao encerrar o processo)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+    
     def create_tables(self):
-        """Cria as tabelas do banco de dados se elas não existirem"""
-        cursor = self.conn.cursor()
+        """
+        Cria as tabelas do banco de dados se elas não existirem
         
+        As tabelas abaixo formam a versão 0 do esquema; mudanças
+        posteriores ficam em migrations.py.
+        """
+        cursor = self.conn.cursor()
+
+        # Banco já na versão atual: nada a criar nem migrar (partida rápida da CLI)
+        if migrations.current_version(self.conn) >= migrations.latest_version():
+            self.has_fts = migrations.table_exists(cursor, 'products_fts')
+            return
+
         # Tabela de produtos
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS products (
@@ -39,22 +191,177 @@ class Database:
         ''')
         
         self.conn.commit()
+        
+        # Aplica as migrações pendentes (índices, busca, novas colunas...)
+        migrations.migrate(self.conn)
+        self.has_fts = migrations.table_exists(cursor, 'products_fts')
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa várias escritas em uma única transação (um único commit)
+        
+        Dentro do bloco, execute() e executemany() não fazem commit
+        individual. Em caso de exceção é feito rollback de tudo.
+        Transações aninhadas são incorporadas à transação externa; o que
+        foi agendado com after_transaction() roda quando a externa termina.
+        """
+        if self._transaction_depth:
+            self._transaction_depth += 1
+            try:
+                yield self.conn
+            finally:
+                self._transaction_depth -= 1
+            return
+        
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._transaction_depth = 1
+        self._local.after_transaction = []
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._transaction_depth = 0
+            callbacks, self._local.after_transaction = self._local.after_transaction, []
+            for callback in callbacks:
+                callback()
+    
+    def after_transaction(self, callback):
+        """
+        Agenda uma função para quando a transação da thread atual terminar
+        
+        Roda depois do COMMIT (ou ROLLBACK) da transaction() mais externa,
+        ou na hora se não houver transação aberta. Usado para limpar caches:
+        dentro de uma transação aninhada (ex.: um job do writer.py) o dado
+        novo só fica visível às outras conexões no commit do lote, e
+        limpar antes disso deixaria outra thread guardar o valor antigo.
+        
+        Args:
+            callback (callable): Função sem argumentos
+        """
+        if not self._transaction_depth:
+            callback()
+            return
+        self._local.after_transaction.append(callback)
+
+    @contextmanager
+    def savepoint(self, name='sp'):
+        """
+        Parte de uma transaction() que pode ser desfeita sozinha
+
+        Se o bloco lançar exceção, só as escritas dele são desfeitas
+        (ROLLBACK TO) e a exceção continua; a transação externa segue
+        aberta com o resto. Usado pelo writer.py para isolar cada job de
+        um commit em grupo.
+
+        Args:
+            name (str): Nome do savepoint (identificador SQL)
+        """
+        if not self._transaction_depth:
+            raise RuntimeError("savepoint() só pode ser usado dentro de transaction()")
+        self.conn.execute(f'SAVEPOINT {name}')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute(f'ROLLBACK TO {name}')
+            self.conn.execute(f'RELEASE {name}')
+            raise
+        else:
+            self.conn.execute(f'RELEASE {name}')
+    
+    def _explainer(self, query, params):
+        """Função que devolve o EXPLAIN QUERY PLAN da query (usada nas lentas)"""
+        return lambda: self.conn.execute(f'EXPLAIN QUERY PLAN {query}', params).fetchall()
     
     def execute(self, query, params=()):
         """Executa uma query SQL e retorna o cursor"""
+        started = time.perf_counter()
         cursor = self.conn.cursor()
         cursor.execute(query, params)
-        self.conn.commit()
+        if not self._transaction_depth:
+            self.conn.commit()
+        self.metrics.record(
+            query, time.perf_counter() - started, max(cursor.rowcount, 0),
+            self._explainer(query, params)
+        )
+        return cursor
+    
+    def executemany(self, query, params_seq):
+        """Executa a mesma query SQL para cada conjunto de parâmetros"""
+        started = time.perf_counter()
+        cursor = self.conn.cursor()
+        cursor.executemany(query, params_seq)
+        if not self._transaction_depth:
+            self.conn.commit()
+        self.metrics.record(query, time.perf_counter() - started, max(cursor.rowcount, 0))
         return cursor
     
-    def fetch_one(self, query, params=()):
-        """Executa uma query e retorna um único resultado"""
+    def fetch_one(self, query, params=(), row_type=None):
+        """
+        Executa uma query e retorna um único resultado
+        
+        Com `row_type` (ex.: records.Product) a linha vem como esse
+        registro em vez de tupla.
+        """
+        started = time.perf_counter()
         cursor = self.conn.cursor()
         cursor.execute(query, params)
-        return cursor.fetchone()
+        if row_type is not None:
+            cursor.row_factory = row_type.row_factory(cursor.description)
+        row = cursor.fetchone()
+        self.metrics.record(
+            query, time.perf_counter() - started, int(row is not None),
+            self._explainer(query, params)
+        )
+        return row
     
-    def fetch_all(self, query, params=()):
-        """Executa uma query e retorna todos os resultados"""
+    def fetch_all(self, query, params=(), row_type=None):
+        """Executa uma query e retorna todos os resultados (como `row_type`, se informado)"""
+        started = time.perf_counter()
         cursor = self.conn.cursor()
         cursor.execute(query, params)
-        return cursor.fetchall()
\ No newline at end of file
+        if row_type is not None:
+            cursor.row_factory = row_type.row_factory(cursor.description)
+        rows = cursor.fetchall()
+        self.metrics.record(
+            query, time.perf_counter() - started, len(rows),
+            self._explainer(query, params)
+        )
+        return rows
+    
+    def iter_all(self, query, params=(), chunk_size=500, row_type=None):
+        """
+        Executa uma query e devolve os resultados aos poucos (gerador)
+        
+        Os registros são lidos do cursor em blocos de `chunk_size` com
+        fetchmany, então a memória usada não cresce com o tamanho da tabela.
+        O tempo registrado nas métricas é só o gasto no banco, sem contar
+        o processamento de quem consome o gerador.
+        """
+        elapsed = 0.0
+        count = 0
+        started = time.perf_counter()
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        if row_type is not None:
+            cursor.row_factory = row_type.row_factory(cursor.description)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                elapsed += time.perf_counter() - started
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+                started = time.perf_counter()
+        finally:
+            cursor.close()
+            self.metrics.record(query, elapsed, count, self._explainer(query, params))
+    
+    def columns(self, table):
+        """Retorna os nomes das colunas de uma tabela, na ordem do SELECT *"""
+        return [row[1] for row in self.fetch_all(f'PRAGMA table_info({table})')]
\ No newline at end of file
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timedelta
+
+from models import ProductModel, StockHistoryModel
+
+FORMATS = ('csv', 'jsonl')
+
+
+def parse_date(value, end=False):
+    """
+    Converte uma data da linha de comando para o formato usado no banco
+
+    Aceita 'AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM[:SS]'. Quando é uma data
+    final sem horário, o dia inteiro é incluído (limite exclusivo no dia seguinte).
+
+    Returns:
+        str: Data/hora no formato 'AAAA-MM-DD HH:MM:SS' ou None
+    """
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if end and fmt == '%Y-%m-%d':
+            parsed += timedelta(days=1)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    raise ValueError(f"Data inválida: {value!r} (use AAAA-MM-DD)")
+
+
+def write_csv(rows, columns, out):
+    """Grava os registros em CSV, um por vez; retorna a quantidade gravada"""
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, columns, out):
+    """Grava os registros como um objeto JSON por linha; retorna a quantidade gravada"""
+    count = 0
+    for row in rows:
+        out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        out.write('\n')
+        count += 1
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+}
+
+
+def export_table(table, out, file_format='csv', start=None, end=None):
+    """
+    Exporta produtos ou histórico de estoque em modo streaming
+
+    Args:
+        table (str): 'products' ou 'stock_history'
+        out (file): Arquivo de saída já aberto em modo texto
+        file_format (str): 'csv' ou 'jsonl'
+        start (str): Data/hora inicial (inclusiva) no formato do banco
+        end (str): Data/hora final (exclusiva) no formato do banco
+
+    Returns:
+        int: Quantidade de registros exportados
+    """
+    if table == 'products':
+        model = ProductModel()
+        rows = model.iter_all(start, end)
+    elif table == 'stock_history':
+        model = StockHistoryModel()
+        rows = model.iter_range(start, end)
+    else:
+        raise ValueError(f"Tabela não suportada: {table}")
+
+    return WRITERS[file_format](rows, model.db.columns(table), out)
+
+
+def main(argv=None):
+    """Ponto de entrada da exportação pela linha de comando"""
+    parser = argparse.ArgumentParser(description="Exporta produtos ou histórico de estoque para CSV ou JSONL")
+    parser.add_argument('tabela', choices=('products', 'stock_history'), help="Dados a exportar")
+    parser.add_argument('saida', nargs='?', default='-', help="Arquivo de saída (padrão: saída padrão)")
+    parser.add_argument('--formato', choices=FORMATS, help="Formato de saída (padrão: pela extensão, ou csv)")
+    parser.add_argument('--de', help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument('--ate', help="Data final, inclusiva (AAAA-MM-DD)")
+    args = parser.parse_args(argv)
+
+    file_format = args.formato
+    if not file_format:
+        file_format = 'jsonl' if args.saida.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    start = parse_date(args.de)
+    end = parse_date(args.ate, end=True)
+
+    if args.saida == '-':
+        count = export_table(args.tabela, sys.stdout, file_format, start, end)
+    else:
+        with open(args.saida, 'w', newline='', encoding='utf-8') as out:
+            count = export_table(args.tabela, out, file_format, start, end)
+        print(f"{count} registros exportados para {args.saida}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import os
+import sys
+
+from models import ProductModel, UPSERT_KEYS
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ImportReport:
+    """Resultado de uma importação: contadores e erros por linha"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        # Linhas que repetiam a chave de outra do mesmo lote (mescladas nela)
+        self.merged = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        """Registra um erro de validação na linha informada"""
+        self.errors.append((line, message))
+
+    @property
+    def total(self):
+        """Total de linhas processadas (válidas e inválidas)"""
+        return self.inserted + self.updated + self.merged + len(self.errors)
+
+
+def read_csv(path):
+    """
+    Lê um arquivo CSV linha a linha
+
+    Yields:
+        tuple: (número da linha, dicionário com os campos)
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    """
+    Lê um arquivo JSONL (um objeto JSON por linha) linha a linha
+
+    Yields:
+        tuple: (número da linha, dicionário com os campos ou a mensagem de erro)
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_num, "Cada linha deve ser um objeto JSON"
+                continue
+            yield line_num, row
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def detect_format(path):
+    """Deduz o formato do arquivo pela extensão"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def _blank(value):
+    """Indica se o valor veio vazio (coluna vazia no CSV ou null no JSON)"""
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _integer(value):
+    """
+    Converte um campo inteiro sem truncar
+
+    Números do JSON com parte fracionária (2.7) e booleanos são
+    recusados; 2.0 vale 2.
+
+    Raises:
+        ValueError: Se o valor não for um inteiro
+    """
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+def validate_row(row, upsert_key=None):
+    """
+    Valida e normaliza uma linha de importação
+
+    Args:
+        row (dict): Campos lidos do arquivo
+        upsert_key (str): Chave de upsert em uso, se houver
+
+    Returns:
+        dict: Dados do produto prontos para o banco
+
+    Raises:
+        ValueError: Se algum campo for inválido
+    """
+    product = {}
+
+    if not _blank(row.get('id')):
+        try:
+            product['id'] = _integer(row['id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"ID inválido: {row['id']!r}")
+        if product['id'] <= 0:
+            raise ValueError("ID deve ser positivo")
+
+    name = row.get('name')
+    if not _blank(name):
+        product['name'] = str(name).strip()
+    elif upsert_key != 'id' or 'id' not in product:
+        # Só o upsert por ID pode atualizar um produto sem informar o nome
+        raise ValueError("Nome do produto é obrigatório")
+
+    if not _blank(row.get('price')):
+        try:
+            product['price'] = float(str(row['price']).replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"Preço inválido: {row['price']!r}")
+        if product['price'] < 0:
+            raise ValueError("Preço não pode ser negativo")
+
+    if not _blank(row.get('stock')):
+        try:
+            product['stock'] = _integer(row['stock'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Estoque inválido: {row['stock']!r}")
+        if product['stock'] < 0:
+            raise ValueError("Estoque não pode ser negativo")
+
+    if not _blank(row.get('min_stock')):
+        try:
+            product['min_stock'] = _integer(row['min_stock'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Estoque mínimo inválido: {row['min_stock']!r}")
+        if product['min_stock'] < 0:
+            raise ValueError("Estoque mínimo não pode ser negativo")
+
+    for field in ('description', 'brand'):
+        if not _blank(row.get(field)):
+            product[field] = str(row[field]).strip()
+
+    if upsert_key != 'id':
+        # Fora do upsert por ID os IDs são sempre gerados pelo banco
+        product.pop('id', None)
+
+    return product
+
+
+class ProductImporter:
+    """Importa produtos em lote a partir de arquivos CSV ou JSONL"""
+
+    def __init__(self, product_model=None, batch_size=DEFAULT_BATCH_SIZE, upsert_key=None):
+        """
+        Args:
+            product_model (ProductModel): Modelo usado para gravar os produtos
+            batch_size (int): Quantidade de linhas por executemany
+            upsert_key (str): 'id' ou 'name' para atualizar produtos existentes
+        """
+        if batch_size < 1:
+            raise ValueError("O tamanho do lote deve ser maior que zero")
+        if upsert_key not in (None,) + UPSERT_KEYS:
+            raise ValueError(f"Chave de upsert inválida: {upsert_key}")
+
+        self.product_model = product_model or ProductModel()
+        self.batch_size = batch_size
+        self.upsert_key = upsert_key
+
+    def import_file(self, path, file_format=None):
+        """
+        Importa um arquivo inteiro em uma única transação
+
+        Args:
+            path (str): Caminho do arquivo
+            file_format (str): 'csv' ou 'jsonl'; deduzido pela extensão se None
+
+        Returns:
+            ImportReport: Resultado da importação
+        """
+        file_format = file_format or detect_format(path)
+        if file_format not in READERS:
+            raise ValueError(f"Formato não suportado: {file_format}")
+        return self.import_rows(READERS[file_format](path))
+
+    def import_rows(self, rows):
+        """
+        Valida e grava linhas em lotes dentro de uma única transação
+
+        Linhas inválidas são registradas no relatório e ignoradas;
+        as demais são gravadas. Um erro de banco desfaz toda a importação.
+
+        Args:
+            rows (iterable): Pares (número da linha, dicionário ou mensagem de erro)
+
+        Returns:
+            ImportReport: Resultado da importação
+        """
+        report = ImportReport()
+        batch = {}
+
+        with self.product_model.db.transaction():
+            for line, row in rows:
+                if isinstance(row, str):
+                    report.add_error(line, row)
+                    continue
+                try:
+                    product = validate_row(row, self.upsert_key)
+                except ValueError as e:
+                    report.add_error(line, str(e))
+                    continue
+
+                # Com upsert, linhas repetidas no mesmo lote: a última prevalece
+                key = product.get(self.upsert_key) if self.upsert_key else None
+                if key is None:
+                    key = ('linha', line)
+                if key in batch:
+                    # Contada como inclusão ou atualização só quando o lote for gravado
+                    report.merged += 1
+                    batch[key][1].update(product)
+                else:
+                    batch[key] = (line, product)
+
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, report)
+
+            if batch:
+                self._flush(batch, report)
+
+        report.errors.sort()
+        return report
+
+    def _flush(self, batch, report):
+        """Grava o lote atual e limpa o buffer"""
+        products = []
+        if self.upsert_key == 'id':
+            # Upsert por ID sem nome só é válido para produtos que já existem
+            ids = [p['id'] for _, p in batch.values() if 'name' not in p]
+            existing = self.product_model.existing_keys('id', ids)
+            for line, product in batch.values():
+                if 'name' not in product and product['id'] not in existing:
+                    report.add_error(line, f"Produto {product['id']} não existe e não tem nome")
+                else:
+                    products.append(product)
+        else:
+            products = [product for _, product in batch.values()]
+
+        inserted, updated = self.product_model.create_many(products, self.upsert_key)
+        report.inserted += inserted
+        report.updated += updated
+        batch.clear()
+
+
+def write_error_report(report, path):
+    """Grava os erros da importação em um arquivo CSV (linha, erro)"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['linha', 'erro'])
+        writer.writerows(report.errors)
+
+
+def main(argv=None):
+    """Ponto de entrada da importação em lote pela linha de comando"""
+    parser = argparse.ArgumentParser(description="Importa produtos em lote a partir de CSV ou JSONL")
+    parser.add_argument('arquivo', help="Arquivo .csv ou .jsonl com os produtos")
+    parser.add_argument('--formato', choices=sorted(READERS), help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument('--lote', type=int, default=DEFAULT_BATCH_SIZE, help="Linhas por lote de gravação")
+    parser.add_argument('--upsert', choices=UPSERT_KEYS, help="Atualiza produtos existentes por esta chave")
+    parser.add_argument('--relatorio', help="Grava os erros por linha neste arquivo CSV")
+    args = parser.parse_args(argv)
+
+    importer = ProductImporter(batch_size=args.lote, upsert_key=args.upsert)
+    report = importer.import_file(args.arquivo, args.formato)
+
+    print(f"Inseridos: {report.inserted}")
+    print(f"Atualizados: {report.updated}")
+    if report.merged:
+        print(f"Repetidos (mesclados): {report.merged}")
+    print(f"Erros: {len(report.errors)}")
+
+    if args.relatorio:
+        write_error_report(report, args.relatorio)
+        print(f"Relatório de erros gravado em {args.relatorio}")
+    else:
+        for line, message in report.errors[:20]:
+            print(f"  Linha {line}: {message}")
+        if len(report.errors) > 20:
+            print(f"  ... e mais {len(report.errors) - 20} erros (use --relatorio)")
+
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
-from menu import MenuManager
+import argparse
+import os
+import sys
 
-def main():
+# Arquivo do log de queries lentas; pode ser trocado por ESTOQUE_SLOW_LOG
+SLOW_LOG_PATH = 'consultas-lentas.log'
+
+# Campos impressos pelos comandos de consulta, na ordem das colunas
+PRODUCT_OUTPUT_FIELDS = ('id', 'name', 'brand', 'price', 'stock', 'min_stock')
+
+# Os módulos pesados (rich, menu, exportação...) só são importados pelo
+# comando que precisa deles: uma consulta por script não carrega a interface.
+
+
+def run_menu():
     """
-    Função principal que inicia a aplicação
+    Inicia o menu interativo
     Trata exceções e garante uma saída graciosa
     """
+    from menu import MenuManager
+    from metrics import enable_slow_log
+
     try:
+        # Queries lentas vão para arquivo, para não interromper o menu
+        enable_slow_log(os.environ.get('ESTOQUE_SLOW_LOG', SLOW_LOG_PATH))
+
         # Cria e inicia o gerenciador de menus
         app = MenuManager()
         app.main_menu()
@@ -17,7 +35,427 @@ def main():
     except Exception as e:
         # Trata erros inesperados
         print(f"\nErro: {e}")
+    return 0
+
+
+class CommandError(Exception):
+    """Erro de um comando não interativo (produto inexistente, estoque insuficiente...)"""
+
+
+class CommandParser(argparse.ArgumentParser):
+    """ArgumentParser que lança exceção em vez de encerrar o processo (modo batch)"""
+
+    def error(self, message):
+        raise CommandError(message)
+
+
+# Campos impressos pelo comando alert-changes
+ALERT_OUTPUT_FIELDS = ('seq', 'product_id', 'event', 'stock', 'min_stock', 'created_at', 'product_name')
+
+# Campos impressos pelo comando tail
+CHANGE_OUTPUT_FIELDS = ('seq', 'entity', 'op', 'entity_id', 'product_id', 'created_at')
+
+# Campos impressos pelo comando report (por marca e por faixa de estoque)
+BRAND_OUTPUT_FIELDS = ('brand', 'product_count', 'total_units', 'total_value')
+BAND_OUTPUT_FIELDS = ('label', 'product_count', 'total_units', 'total_value')
+
+# Ordenações de `report marcas --ordem` (chaves de ReportModel.BRAND_ORDER)
+BRAND_ORDER_CHOICES = {'valor': 'value', 'unidades': 'units', 'produtos': 'products', 'marca': 'brand'}
+
+
+def print_records(records, fields, as_json=False, out=None):
+    """
+    Imprime registros, um por linha
+
+    Args:
+        records (list): Registros (Product, AlertEvent...)
+        fields (tuple): Campos impressos no formato com tabulação
+        as_json (bool): JSON por linha (todos os campos) em vez de tabulação
+        out (file): Saída; padrão sys.stdout
+    """
+    out = out or sys.stdout
+    if as_json:
+        import json
+        for record in records:
+            out.write(json.dumps(record.as_dict(), ensure_ascii=False) + '\n')
+    else:
+        for record in records:
+            out.write('\t'.join(
+                '' if getattr(record, field) is None else str(getattr(record, field))
+                for field in fields
+            ) + '\n')
+
+
+def print_products(products, as_json=False, out=None):
+    """Imprime produtos, um por linha (ver print_records)"""
+    print_records(products, PRODUCT_OUTPUT_FIELDS, as_json, out)
+
+
+def cmd_get(args):
+    """Mostra produtos pelo ID"""
+    from models import ProductModel
+
+    products = ProductModel().get_by_ids(args.ids)
+    found = {product.id for product in products}
+    missing = [product_id for product_id in args.ids if product_id not in found]
+    print_products(products, args.json)
+    if missing:
+        raise CommandError(f"Produto não encontrado: {', '.join(map(str, missing))}")
+
+
+def cmd_search(args):
+    """Busca produtos por nome, marca, descrição ou ID"""
+    from models import ProductModel
+
+    print_products(ProductModel().search(' '.join(args.termo), args.limite), args.json)
+
+
+def cmd_low_stock(args):
+    """Lista os produtos abaixo do estoque mínimo (ou de um limite único)"""
+    from models import ProductModel
+
+    if args.limite_estoque is None:
+        products = ProductModel().get_alerts()
+    else:
+        products = ProductModel().get_low_stock(args.limite_estoque)
+    print_products(products[:args.limite] if args.limite else products, args.json)
+
+
+def cmd_alert_changes(args):
+    """Lista os alertas abertos/resolvidos depois de um seq"""
+    from models import ProductModel
+
+    events = ProductModel().get_alert_changes(args.desde, args.limite)
+    print_records(events, ALERT_OUTPUT_FIELDS, args.json)
+
+
+def cmd_tail(args):
+    """
+    Lista as alterações de produtos e histórico depois de um seq
+
+    Com --seguir continua esperando novas alterações (até Ctrl+C),
+    lendo no máximo --limite por vez.
+    """
+    import time
+    from models import ChangeLogModel
+
+    changes = ChangeLogModel()
+    if changes.expired(args.desde):
+        raise CommandError(
+            f"Alterações depois de {args.desde} já foram descartadas; refaça a carga completa"
+        )
+    after = args.desde
+    try:
+        while True:
+            batch = changes.get_changes(after, args.limite, args.entidade)
+            print_records(batch, CHANGE_OUTPUT_FIELDS, args.json)
+            if batch:
+                after = batch[-1].seq
+                sys.stdout.flush()
+            if not args.seguir:
+                break
+            if len(batch) < args.limite:
+                time.sleep(args.intervalo)
+    except KeyboardInterrupt:
+        pass
+
+
+def find_location(value):
+    """Local pelo ID ou nome; CommandError se não existir"""
+    from models import LocationModel
+
+    location = LocationModel().find(value)
+    if location is None:
+        raise CommandError(f"Local não encontrado: {value}")
+    return location
+
+
+def cmd_adjust(args):
+    """Soma uma variação ao estoque de um produto"""
+    from models import InsufficientStockError, ProductModel
+
+    location_id = find_location(args.local).id if args.local else None
+    try:
+        result = ProductModel().adjust_stock(
+            args.id, args.variacao, args.tipo, args.motivo, allow_negative=not args.sem_negativo,
+            location_id=location_id
+        )
+    except InsufficientStockError as e:
+        raise CommandError(str(e))
+    if result is None:
+        raise CommandError(f"Produto não encontrado: {args.id}")
+    print(f"{args.id}\t{result[0]}\t{result[1]}")
+
+
+def cmd_transfer(args):
+    """Transfere estoque de um produto entre dois locais"""
+    from models import InsufficientStockError, ProductModel
+
+    source, target = find_location(args.de), find_location(args.para)
+    try:
+        movement_id = ProductModel().transfer_stock(
+            [(args.id, args.quantidade)], source.id, target.id, args.motivo
+        )
+    except (InsufficientStockError, ValueError) as e:
+        raise CommandError(str(e))
+    print(movement_id)
+
+
+def cmd_locations(args):
+    """Lista os locais (ou o estoque de um produto por local) e cadastra novos"""
+    from models import LocationModel
+
+    locations = LocationModel()
+    if args.novo:
+        if locations.find(args.novo):
+            raise CommandError(f"Já existe um local chamado {args.novo!r}")
+        print(locations.create(args.novo))
+    elif args.produto is not None:
+        print_records(
+            locations.product_stock(args.produto), ('location_id', 'location_name', 'stock'), args.json
+        )
+    else:
+        print_records(locations.get_all(), ('id', 'name'), args.json)
+
+
+def cmd_report(args):
+    """Mostra os relatórios de valor em estoque (lidos das tabelas de resumo)"""
+    from models import ReportModel
+
+    reports = ReportModel()
+    if args.tipo == 'faixas':
+        print_records(reports.stock_bands(), BAND_OUTPUT_FIELDS, args.json)
+    elif args.tipo == 'top':
+        print_products(reports.top_by_value(args.limite or 10), args.json)
+    else:
+        summaries = reports.by_brand(BRAND_ORDER_CHOICES[args.ordem], args.limite)
+        print_records(summaries, BRAND_OUTPUT_FIELDS, args.json)
+
+
+def cmd_rebuild_summaries(args):
+    """Recalcula as tabelas de resumo a partir dos produtos"""
+    from models import ReportModel
+
+    ReportModel().rebuild()
+
+
+def cmd_export(args):
+    """Exporta produtos ou histórico (mesmas opções do exporter.py)"""
+    import exporter
+    return exporter.main(args.opcoes)
+
+
+def cmd_import(args):
+    """Importa produtos em lote (mesmas opções do importer.py)"""
+    import importer
+    return importer.main(args.opcoes)
+
+
+def cmd_backup(args):
+    """Cópias de segurança online (mesmas opções do backup.py)"""
+    import backup
+    return backup.main(args.opcoes)
+
+
+def cmd_serve(args):
+    """Inicia a API HTTP (mesmas opções do server.py)"""
+    import server
+    return server.main(args.opcoes)
+
+
+# Subcomandos que repassam todas as opções para o módulo de mesmo papel
+PASSTHROUGH_COMMANDS = {
+    'export': (cmd_export, "Exporta dados (opções do exporter.py)"),
+    'import': (cmd_import, "Importa produtos (opções do importer.py)"),
+    'backup': (cmd_backup, "Cópias de segurança (opções do backup.py)"),
+    'serve': (cmd_serve, "Inicia a API HTTP (opções do server.py)"),
+}
+
+
+def cmd_menu(args):
+    """Inicia o menu interativo"""
+    return run_menu()
+
+
+def cmd_batch(args):
+    """
+    Executa vários comandos lidos da entrada padrão, um por linha
+
+    Todos usam a mesma conexão com o banco. Linhas vazias e iniciadas
+    por '#' são ignoradas; um comando com erro é informado na saída de
+    erro com o número da linha e os seguintes continuam. Comandos
+    interativos, que não terminam (tail --seguir, backup agendar) ou que
+    substituem o banco (backup restaurar) são recusados.
+
+    Returns:
+        int: 1 se algum comando falhou, senão 0
+    """
+    import shlex
+
+    parser = build_parser(batch=True)
+    failures = 0
+    for number, line in enumerate(sys.stdin, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            command = parse_command(parser, shlex.split(line))
+            if command.func in (cmd_batch, cmd_menu, cmd_serve) or getattr(command, 'seguir', False):
+                raise CommandError(f"Comando não permitido em lote: {command.comando}")
+            # A restauração troca o banco inteiro (e pediria confirmação lendo a própria
+            # entrada do lote); o agendamento só termina com Ctrl+C
+            for option in ('restaurar', 'agendar'):
+                if command.func is cmd_backup and option in command.opcoes:
+                    raise CommandError(f"Comando não permitido em lote: backup {option}")
+            if command.func(command):
+                failures += 1
+        except SystemExit as e:
+            # Parsers do exporter/importer encerram com código != 0 em erro
+            failures += 1 if e.code else 0
+        except Exception as e:
+            failures += 1
+            print(f"Linha {number}: {e}", file=sys.stderr)
+        sys.stdout.flush()
+    return 1 if failures else 0
+
+
+def build_parser(batch=False):
+    """
+    Monta o parser dos subcomandos
+
+    Args:
+        batch (bool): Parser usado nas linhas do modo batch (erros viram
+            CommandError em vez de encerrar o processo)
+    """
+    parser_class = CommandParser if batch else argparse.ArgumentParser
+    parser = parser_class(
+        prog='main.py',
+        description="Sistema de Gestão de Estoque. Sem comando, abre o menu interativo."
+    )
+    commands = parser.add_subparsers(dest='comando', required=True, parser_class=parser_class)
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--json', action='store_true', help="Um objeto JSON por linha")
+
+    get = commands.add_parser('get', parents=[output], help="Mostra produtos pelo ID")
+    get.add_argument('ids', type=int, nargs='+', help="IDs dos produtos")
+    get.set_defaults(func=cmd_get)
+
+    search = commands.add_parser('search', parents=[output], help="Busca produtos")
+    search.add_argument('termo', nargs='+', help="Nome, marca, descrição ou ID")
+    search.add_argument('--limite', type=int, default=50, help="Máximo de resultados")
+    search.set_defaults(func=cmd_search)
+
+    low_stock = commands.add_parser('low-stock', parents=[output], help="Produtos abaixo do estoque mínimo")
+    low_stock.add_argument(
+        '--limite-estoque', type=int, help="Usa este limite para todos em vez do mínimo de cada produto"
+    )
+    low_stock.add_argument('--limite', type=int, help="Máximo de resultados")
+    low_stock.set_defaults(func=cmd_low_stock)
+
+    alert_changes = commands.add_parser(
+        'alert-changes', parents=[output], help="Alertas abertos/resolvidos depois de um seq"
+    )
+    alert_changes.add_argument('--desde', type=int, default=0, help="Último seq já processado")
+    alert_changes.add_argument('--limite', type=int, default=500, help="Máximo de eventos")
+    alert_changes.set_defaults(func=cmd_alert_changes)
+
+    tail = commands.add_parser(
+        'tail', parents=[output], help="Alterações de produtos e histórico depois de um seq"
+    )
+    tail.add_argument('--desde', type=int, default=0, help="Último seq já processado")
+    tail.add_argument('--limite', type=int, default=500, help="Máximo de alterações por leitura")
+    tail.add_argument('--entidade', choices=('produto', 'movimentacao'), help="Só este tipo de alteração")
+    tail.add_argument('--seguir', action='store_true', help="Continua esperando novas alterações")
+    tail.add_argument('--intervalo', type=float, default=1.0, help="Espera entre leituras com --seguir (s)")
+    tail.set_defaults(func=cmd_tail)
+
+    adjust = commands.add_parser('adjust', help="Soma uma variação ao estoque (imprime id, antigo e novo)")
+    adjust.add_argument('id', type=int, help="ID do produto")
+    adjust.add_argument('variacao', type=int, help="Variação do estoque (ex.: -1, +10)")
+    adjust.add_argument('--tipo', default='manual', help="Tipo da alteração (padrão: manual)")
+    adjust.add_argument('--motivo', default='', help="Motivo da alteração")
+    adjust.add_argument('--sem-negativo', action='store_true', help="Recusa se faltar estoque")
+    adjust.add_argument('--local', help="ID ou nome do local (padrão: local principal)")
+    adjust.set_defaults(func=cmd_adjust)
+
+    transfer = commands.add_parser(
+        'transfer', help="Transfere estoque entre locais (imprime o ID da movimentação)"
+    )
+    transfer.add_argument('id', type=int, help="ID do produto")
+    transfer.add_argument('quantidade', type=int, help="Quantidade a transferir")
+    transfer.add_argument('--de', required=True, help="ID ou nome do local de origem")
+    transfer.add_argument('--para', required=True, help="ID ou nome do local de destino")
+    transfer.add_argument('--motivo', default='', help="Motivo da transferência")
+    transfer.set_defaults(func=cmd_transfer)
+
+    locations = commands.add_parser('locations', parents=[output], help="Lista ou cadastra locais")
+    locations.add_argument('--produto', type=int, help="Mostra o estoque deste produto por local")
+    locations.add_argument('--novo', help="Cadastra um local com este nome")
+    locations.set_defaults(func=cmd_locations)
+
+    report = commands.add_parser('report', parents=[output], help="Valor em estoque por marca ou faixa")
+    report.add_argument(
+        'tipo', nargs='?', choices=('marcas', 'faixas', 'top'), default='marcas',
+        help="marcas (padrão), faixas de estoque ou produtos de maior valor"
+    )
+    report.add_argument(
+        '--ordem', choices=tuple(BRAND_ORDER_CHOICES), default='valor', help="Ordenação das marcas"
+    )
+    report.add_argument('--limite', type=int, help="Máximo de linhas (top: padrão 10)")
+    report.set_defaults(func=cmd_report)
+
+    commands.add_parser(
+        'rebuild-summaries', help="Recalcula os resumos do painel e dos relatórios"
+    ).set_defaults(func=cmd_rebuild_summaries)
+
+    for name, (func, help_text) in PASSTHROUGH_COMMANDS.items():
+        command = commands.add_parser(name, help=help_text, add_help=False)
+        command.add_argument('opcoes', nargs=argparse.REMAINDER)
+        command.set_defaults(func=func)
+
+    batch_command = commands.add_parser('batch', help="Lê comandos da entrada padrão, um por linha")
+    batch_command.set_defaults(func=cmd_batch)
+
+    commands.add_parser('menu', help="Abre o menu interativo").set_defaults(func=cmd_menu)
+    return parser
+
+
+def parse_command(parser, argv):
+    """
+    Interpreta os argumentos de um subcomando
+
+    Os subcomandos de PASSTHROUGH_COMMANDS recebem o resto da linha sem
+    passar pelo parser: o argparse.REMAINDER não aceita uma opção logo
+    depois do subcomando (ex.: "serve --porta 9000").
+
+    Returns:
+        argparse.Namespace: comando, func e os argumentos do subcomando
+    """
+    if argv and argv[0] in PASSTHROUGH_COMMANDS:
+        func = PASSTHROUGH_COMMANDS[argv[0]][0]
+        return argparse.Namespace(comando=argv[0], opcoes=list(argv[1:]), func=func)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Função principal: sem argumentos abre o menu, senão executa o subcomando
+
+    Returns:
+        int: Código de saída (0 = sucesso)
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return run_menu()
+
+    args = parse_command(build_parser(), argv)
+    try:
+        return args.func(args) or 0
+    except CommandError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
 
 if __name__ == "__main__":
     # Ponto de entrada da aplicação
-    main()
\ No newline at end of file
+    sys.exit(main())
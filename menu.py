@@ -4,10 +4,17 @@ from rich.table import Table
 from rich.panel import Panel
 from rich import box
 
-from models import ProductModel, StockHistoryModel
+from models import (
+    InsufficientStockError, LOW_STOCK_THRESHOLD, LocationModel, ProductModel, ReportModel,
+    StockHistoryModel
+)
 
 console = Console()
 
+# Linhas da tela de relatórios: marcas de maior valor e produtos de maior valor
+REPORT_BRAND_LIMIT = 15
+REPORT_TOP_LIMIT = 10
+
 class MenuManager:
     """Classe principal que gerencia toda a interface do usuário"""
     
@@ -15,6 +22,10 @@ class MenuManager:
         """Inicializa o gerenciador de menus com os modelos de dados"""
         self.product_model = ProductModel()
         self.history_model = StockHistoryModel()
+        self.location_model = LocationModel()
+        self.report_model = ReportModel()
+        # Criado na primeira visita à previsão de reposição (depende do NumPy)
+        self.analytics = None
     
     def clear_screen(self):
         """Limpa a tela do terminal"""
@@ -41,11 +52,15 @@ class MenuManager:
         """
         Mostra lista de produtos para seleção com busca interativa
         
+        A busca usa o índice em memória (ProductModel.suggest_page): aceita
+        só o começo das palavras e erros de digitação, sem ir ao banco.
+        Os resultados são exibidos uma página por vez (p/a para navegar).
+        
         Args:
             prompt_text (str): Texto personalizado para o prompt
         
         Returns:
-            tuple: Dados do produto selecionado ou None se voltar
+            Product: Produto selecionado ou None se voltar
         """
         while True:
             search_term = Prompt.ask(f"\n{prompt_text} (digite nome, marca ou ID)").strip()
@@ -58,83 +73,148 @@ class MenuManager:
                 console.print("[yellow]Digite um termo para busca[/yellow]")
                 continue
             
-            # Busca produtos
-            results = self.product_model.search(search_term)
-            
-            if not results:
-                console.print(f"[yellow]Nenhum produto encontrado para '{search_term}'[/yellow]")
-                continue
-            
-            # Mostrar resultados em lista numerada
-            console.print(f"\n[green]✓ Encontrados {len(results)} produtos:[/green]")
-            
-            table = Table(box=box.SIMPLE, show_header=True, header_style="bold")
-            table.add_column("#", style="cyan", width=4)
-            table.add_column("ID", style="dim", width=6)
-            table.add_column("Nome", style="white")
-            table.add_column("Marca", style="blue")
-            table.add_column("Estoque", style="red")
-            table.add_column("Preço", style="green")
-            
-            for i, product in enumerate(results, 1):
-                stock_style = "red" if product[4] == 0 else "yellow" if product[4] <= 10 else "green"
-                table.add_row(
-                    str(i),
-                    str(product[0]),
-                    product[1][:30] + "..." if len(product[1]) > 30 else product[1],
-                    product[5] or "—",
-                    f"[{stock_style}]{product[4]}[/{stock_style}]",
-                    f"R$ {product[3]:.2f}"
-                )
-            
-            console.print(table)
-            
-            # Opções para o usuário
-            console.print("\n[bold]Opções:[/bold]")
-            console.print("[cyan]1-" + str(len(results)) + "[/cyan] - Selecionar produto")
+            cursors = [None]
+            while True:
+                # Busca somente a página atual
+                page = self.product_model.suggest_page(search_term, after=cursors[-1])
+                results = page.rows
+                
+                if not results:
+                    console.print(f"[yellow]Nenhum produto encontrado para '{search_term}'[/yellow]")
+                    break
+                
+                # Mostrar resultados em lista numerada
+                console.print(f"\n[green]✓ Resultados (página {len(cursors)}):[/green]")
+                
+                table = Table(box=box.SIMPLE, show_header=True, header_style="bold")
+                table.add_column("#", style="cyan", width=4)
+                table.add_column("ID", style="dim", width=6)
+                table.add_column("Nome", style="white")
+                table.add_column("Marca", style="blue")
+                table.add_column("Estoque", style="red")
+                table.add_column("Preço", style="green")
+                
+                for i, product in enumerate(results, 1):
+                    stock_style = "red" if product.stock == 0 else "yellow" if product.stock <= 10 else "green"
+                    table.add_row(
+                        str(i),
+                        str(product.id),
+                        product.name[:30] + "..." if len(product.name) > 30 else product.name,
+                        product.brand or "—",
+                        f"[{stock_style}]{product.stock}[/{stock_style}]",
+                        f"R$ {product.price:.2f}"
+                    )
+                
+                console.print(table)
+                
+                # Opções para o usuário
+                console.print("\n[bold]Opções:[/bold]")
+                console.print("[cyan]1-" + str(len(results)) + "[/cyan] - Selecionar produto")
+                if page.next_cursor:
+                    console.print("[cyan]p[/cyan] - Próxima página")
+                if len(cursors) > 1:
+                    console.print("[cyan]a[/cyan] - Página anterior")
+                console.print("[yellow]0[/yellow] - Voltar")
+                console.print("[yellow]nova busca[/yellow] - Digitar novo termo de busca")
+                
+                choice = Prompt.ask("\nSua escolha").strip().lower()
+                
+                if choice in ['0', 'voltar']:
+                    return None
+                
+                if choice in ['nova busca', 'buscar']:
+                    break
+                
+                if choice == 'p' and page.next_cursor:
+                    cursors.append(page.next_cursor)
+                    continue
+                
+                if choice == 'a' and len(cursors) > 1:
+                    cursors.pop()
+                    continue
+                
+                try:
+                    choice_num = int(choice)
+                    if 1 <= choice_num <= len(results):
+                        return results[choice_num - 1]
+                    else:
+                        console.print("[red]Opção inválida![/red]")
+                except ValueError:
+                    console.print("[red]Digite um número válido[/red]")
+    
+    def browse_pages(self, subtitle, fetch_page, render_page, empty_message):
+        """
+        Exibe uma listagem paginada, buscando e desenhando uma página por vez
+        
+        Args:
+            subtitle (str): Subtítulo da tela
+            fetch_page (callable): Recebe o cursor (None = início) e devolve uma Page
+            render_page (callable): Desenha os registros de uma página
+            empty_message (str): Mensagem exibida quando não há registros
+        """
+        # Pilha de cursores: o topo é o cursor que gerou a página atual
+        cursors = [None]
+        while True:
+            self.show_header(subtitle)
+            page = fetch_page(cursors[-1])
+            
+            if not page.rows and len(cursors) == 1:
+                console.print(empty_message)
+                self.wait_for_enter()
+                return
+            
+            render_page(page.rows)
+            
+            if not page.next_cursor and len(cursors) == 1:
+                self.wait_for_enter()
+                return
+            
+            console.print(f"\n[dim]Página {len(cursors)}[/dim]")
+            choices = ["0"]
+            if page.next_cursor:
+                console.print("[cyan]p[/cyan] - Próxima página")
+                choices.append("p")
+            if len(cursors) > 1:
+                console.print("[cyan]a[/cyan] - Página anterior")
+                choices.append("a")
             console.print("[yellow]0[/yellow] - Voltar")
-            console.print("[yellow]nova busca[/yellow] - Digitar novo termo de busca")
-            
-            choice = Prompt.ask("\nSua escolha").strip().lower()
             
-            if choice in ['0', 'voltar']:
-                return None
-            
-            if choice in ['nova busca', 'buscar']:
-                continue
+            choice = Prompt.ask("\nSua escolha", choices=choices, default="0")
             
-            try:
-                choice_num = int(choice)
-                if 1 <= choice_num <= len(results):
-                    return results[choice_num - 1]
-                else:
-                    console.print("[red]Opção inválida![/red]")
-            except ValueError:
-                console.print("[red]Digite um número válido[/red]")
+            if choice == "p":
+                cursors.append(page.next_cursor)
+            elif choice == "a":
+                cursors.pop()
+            else:
+                return
     
     def main_menu(self):
         """Menu principal do sistema - ponto de entrada da aplicação"""
         while True:
             self.show_header()
             
-            # Estatísticas rápidas
-            products = self.product_model.get_all()
-            low_stock = self.product_model.get_low_stock()
-            out_of_stock = self.product_model.get_out_of_stock()
+            # Estatísticas rápidas (uma única leitura agregada)
+            stats = self.product_model.get_stats()
             
             console.print(f"📊 [bold]Estatísticas:[/bold]")
-            console.print(f"   Total de produtos: [cyan]{len(products)}[/cyan]")
-            console.print(f"   Estoque baixo: [yellow]{len(low_stock)}[/yellow]")
-            console.print(f"   Sem estoque: [red]{len(out_of_stock)}[/red]")
+            console.print(f"   Total de produtos: [cyan]{stats['total_products']}[/cyan]")
+            console.print(f"   Unidades em estoque: [cyan]{stats['total_units']}[/cyan]")
+            console.print(f"   Valor em estoque: [green]R$ {stats['total_value']:.2f}[/green]")
+            console.print(f"   Abaixo do mínimo: [yellow]{stats['alerts']}[/yellow]")
+            console.print(f"   Sem estoque: [red]{stats['out_of_stock']}[/red]")
             
             console.print("\n[bold]Menu Principal:[/bold]")
             console.print("1. 📦 Gerenciar Produtos")
             console.print("2. 📊 Controle de Estoque")
             console.print("3. 🔍 Buscar Produtos")
             console.print("4. 📈 Histórico de Estoque")
+            console.print("5. 📑 Relatórios")
             console.print("0. 🚪 Sair")
             
-            choice = Prompt.ask("\nSelecione uma opção", choices=["0", "1", "2", "3", "4"])
+            # "d" abre a tela de diagnóstico, que não aparece no menu
+            choice = Prompt.ask(
+                "\nSelecione uma opção", choices=["0", "1", "2", "3", "4", "5", "d"], show_choices=False
+            )
             
             if choice == "1":
                 self.products_menu()
@@ -144,6 +224,10 @@ class MenuManager:
                 self.search_products()
             elif choice == "4":
                 self.history_menu()
+            elif choice == "5":
+                self.reports()
+            elif choice == "d":
+                self.diagnostics()
             elif choice == "0":
                 if Confirm.ask("Tem certeza que deseja sair?"):
                     break
@@ -177,38 +261,36 @@ class MenuManager:
                 break
     
     def list_products(self):
-        """Lista todos os produtos em formato de tabela"""
-        self.show_header("Lista de Produtos")
-        
-        products = self.product_model.get_all()
-        
-        if not products:
-            console.print("[yellow]Nenhum produto cadastrado.[/yellow]")
-            self.wait_for_enter()
-            return
-        
-        table = Table(box=box.ROUNDED)
-        table.add_column("ID", style="cyan", width=6)
-        table.add_column("Nome", style="white")
-        table.add_column("Marca", style="blue")
-        table.add_column("Preço", style="green")
-        table.add_column("Estoque", style="red")
-        table.add_column("Descrição", style="dim")
-        
-        for product in products:
-            stock_style = "red" if product[4] == 0 else "yellow" if product[4] <= 10 else "green"
-            description = product[2] or "—"
-            table.add_row(
-                str(product[0]),
-                product[1][:25] + "..." if len(product[1]) > 25 else product[1],
-                product[5] or "—",
-                f"R$ {product[3]:.2f}",
-                f"[{stock_style}]{product[4]}[/{stock_style}]",
-                description[:30] + "..." if len(description) > 30 else description
-            )
+        """Lista os produtos em formato de tabela, uma página por vez"""
+        def render(products):
+            table = Table(box=box.ROUNDED)
+            table.add_column("ID", style="cyan", width=6)
+            table.add_column("Nome", style="white")
+            table.add_column("Marca", style="blue")
+            table.add_column("Preço", style="green")
+            table.add_column("Estoque", style="red")
+            table.add_column("Descrição", style="dim")
+            
+            for product in products:
+                stock_style = "red" if product.stock == 0 else "yellow" if product.stock <= 10 else "green"
+                description = product.description or "—"
+                table.add_row(
+                    str(product.id),
+                    product.name[:25] + "..." if len(product.name) > 25 else product.name,
+                    product.brand or "—",
+                    f"R$ {product.price:.2f}",
+                    f"[{stock_style}]{product.stock}[/{stock_style}]",
+                    description[:30] + "..." if len(description) > 30 else description
+                )
+            
+            console.print(table)
         
-        console.print(table)
-        self.wait_for_enter()
+        self.browse_pages(
+            "Lista de Produtos",
+            lambda after: self.product_model.get_all_page(after=after),
+            render,
+            "[yellow]Nenhum produto cadastrado.[/yellow]"
+        )
     
     def add_product(self):
         """Interface para adicionar um novo produto"""
@@ -224,13 +306,15 @@ class MenuManager:
         price = FloatPrompt.ask("Preço de venda")
         stock = IntPrompt.ask("Estoque inicial", default=0)
         brand = Prompt.ask("Marca", default="")
+        min_stock = IntPrompt.ask("Estoque mínimo (alerta de reposição)", default=LOW_STOCK_THRESHOLD)
         
         product_data = {
             'name': name,
             'description': description,
             'price': price,
             'stock': stock,
-            'brand': brand
+            'brand': brand,
+            'min_stock': min_stock
         }
         
         if Confirm.ask("\nSalvar produto?"):
@@ -247,23 +331,25 @@ class MenuManager:
         if not product:
             return
         
-        console.print(f"\n[bold]Editando:[/bold] [cyan]{product[1]}[/cyan]")
-        console.print(f"[bold]ID:[/bold] {product[0]}")
+        console.print(f"\n[bold]Editando:[/bold] [cyan]{product.name}[/cyan]")
+        console.print(f"[bold]ID:[/bold] {product.id}")
         
-        name = Prompt.ask("Nome", default=product[1])
-        description = Prompt.ask("Descrição", default=product[2] or "")
-        price = FloatPrompt.ask("Preço", default=product[3])
-        brand = Prompt.ask("Marca", default=product[5] or "")
+        name = Prompt.ask("Nome", default=product.name)
+        description = Prompt.ask("Descrição", default=product.description or "")
+        price = FloatPrompt.ask("Preço", default=product.price)
+        brand = Prompt.ask("Marca", default=product.brand or "")
+        min_stock = IntPrompt.ask("Estoque mínimo", default=product.min_stock)
         
         update_data = {
             'name': name,
             'description': description,
             'price': price,
-            'brand': brand
+            'brand': brand,
+            'min_stock': min_stock
         }
         
         if Confirm.ask("\nAtualizar produto?"):
-            self.product_model.update(product[0], update_data)
+            self.product_model.update(product.id, update_data)
             console.print("[green]✓ Produto atualizado com sucesso[/green]")
         
         self.wait_for_enter()
@@ -277,13 +363,13 @@ class MenuManager:
             return
         
         console.print(f"\n[bold]Produto selecionado:[/bold]")
-        console.print(f"ID: [cyan]{product[0]}[/cyan]")
-        console.print(f"Nome: [white]{product[1]}[/white]")
-        console.print(f"Marca: [blue]{product[5] or '—'}[/blue]")
-        console.print(f"Estoque atual: [red]{product[4]}[/red] unidades")
+        console.print(f"ID: [cyan]{product.id}[/cyan]")
+        console.print(f"Nome: [white]{product.name}[/white]")
+        console.print(f"Marca: [blue]{product.brand or '—'}[/blue]")
+        console.print(f"Estoque atual: [red]{product.stock}[/red] unidades")
         
         if Confirm.ask("\n[red]Tem certeza que deseja excluir este produto?[/red]"):
-            if self.product_model.delete(product[0]):
+            if self.product_model.delete(product.id):
                 console.print("[green]✓ Produto excluído com sucesso[/green]")
             else:
                 console.print("[red]❌ Erro ao excluir produto[/red]")
@@ -298,14 +384,22 @@ class MenuManager:
         if not product:
             return
         
-        content = f"[bold]ID:[/bold] {product[0]}\n"
-        content += f"[bold]Nome:[/bold] {product[1]}\n"
-        content += f"[bold]Descrição:[/bold] {product[2] or 'N/A'}\n"
-        content += f"[bold]Preço:[/bold] R$ {product[3]:.2f}\n"
-        content += f"[bold]Estoque:[/bold] {product[4]}\n"
-        content += f"[bold]Marca:[/bold] {product[5] or 'N/A'}\n"
-        content += f"[bold]Criado em:[/bold] {product[6]}\n"
-        content += f"[bold]Atualizado em:[/bold] {product[7]}"
+        content = f"[bold]ID:[/bold] {product.id}\n"
+        content += f"[bold]Nome:[/bold] {product.name}\n"
+        content += f"[bold]Descrição:[/bold] {product.description or 'N/A'}\n"
+        content += f"[bold]Preço:[/bold] R$ {product.price:.2f}\n"
+        content += f"[bold]Estoque:[/bold] {product.stock}\n"
+        content += f"[bold]Estoque mínimo:[/bold] {product.min_stock}\n"
+        content += f"[bold]Marca:[/bold] {product.brand or 'N/A'}\n"
+        content += f"[bold]Criado em:[/bold] {product.created_at}\n"
+        content += f"[bold]Atualizado em:[/bold] {product.updated_at}"
+        
+        # Estoque por local só quando o produto está em mais de um
+        stock_by_location = self.location_model.product_stock(product.id)
+        if len(stock_by_location) > 1:
+            content += "\n\n[bold]Estoque por local:[/bold]"
+            for row in stock_by_location:
+                content += f"\n  {row.location_name}: {row.stock}"
         
         console.print(Panel.fit(content, title="Detalhes do Produto", border_style="cyan"))
         self.wait_for_enter()
@@ -317,11 +411,14 @@ class MenuManager:
             
             console.print("[bold]Opções:[/bold]")
             console.print("1. Ajustar Estoque")
-            console.print("2. Produtos com Estoque Baixo")
+            console.print("2. Produtos Abaixo do Estoque Mínimo")
             console.print("3. Produtos Sem Estoque")
+            console.print("4. Previsão de Reposição")
+            console.print("5. Transferir entre Locais")
+            console.print("6. Locais de Estoque")
             console.print("0. ↩️  Voltar ao Menu Principal")
             
-            choice = Prompt.ask("\nSelecione uma opção", choices=["0", "1", "2", "3"])
+            choice = Prompt.ask("\nSelecione uma opção", choices=["0", "1", "2", "3", "4", "5", "6"])
             
             if choice == "1":
                 self.adjust_stock()
@@ -329,9 +426,35 @@ class MenuManager:
                 self.low_stock_products()
             elif choice == "3":
                 self.out_of_stock_products()
+            elif choice == "4":
+                self.reorder_forecast()
+            elif choice == "5":
+                self.transfer_stock()
+            elif choice == "6":
+                self.locations()
             elif choice == "0":
                 break
     
+    def ask_location(self, prompt_text, locations, default=None):
+        """
+        Pede a escolha de um local pelo ID
+        
+        Args:
+            prompt_text (str): Texto do prompt
+            locations (list): Locais (Location) disponíveis
+            default (int): ID sugerido
+        
+        Returns:
+            Location: Local escolhido
+        """
+        for location in locations:
+            console.print(f"  [cyan]{location.id}[/cyan] - {location.name}")
+        by_id = {str(location.id): location for location in locations}
+        choice = Prompt.ask(
+            prompt_text, choices=list(by_id), default=None if default is None else str(default)
+        )
+        return by_id[choice]
+    
     def adjust_stock(self):
         """Interface para ajustar o estoque de um produto"""
         self.show_header("Ajustar Estoque")
@@ -341,56 +464,156 @@ class MenuManager:
             return
         
         console.print(f"\n[bold]Produto selecionado:[/bold]")
-        console.print(f"Nome: [cyan]{product[1]}[/cyan]")
-        console.print(f"Estoque atual: [yellow]{product[4]}[/yellow] unidades")
+        console.print(f"Nome: [cyan]{product.name}[/cyan]")
+        console.print(f"Estoque atual: [yellow]{product.stock}[/yellow] unidades")
+        
+        value = Prompt.ask("\nNovo estoque (ou +N / -N para entrada/saída)").strip()
+        try:
+            amount = int(value)
+        except ValueError:
+            console.print("[red]Digite um número válido[/red]")
+            self.wait_for_enter()
+            return
         
-        new_stock = IntPrompt.ask("\nNovo estoque")
         reason = Prompt.ask("Motivo do ajuste", default="Ajuste manual")
         
-        if Confirm.ask(f"\nAlterar estoque de {product[4]} para {new_stock}?"):
-            if self.product_model.update_stock(product[0], new_stock, 'manual', reason):
-                console.print("[green]✓ Estoque atualizado com sucesso[/green]")
+        if value.startswith(('+', '-')):
+            # Com mais de um local, a variação é lançada no local escolhido
+            location_id = None
+            locations = self.location_model.get_all()
+            if len(locations) > 1:
+                location_id = self.ask_location("Local do ajuste", locations, locations[0].id).id
+            
+            # Variação relativa: aplicada atomicamente sobre o estoque atual do banco
+            if Confirm.ask(f"\nAplicar variação de {amount:+d} ao estoque?"):
+                try:
+                    result = self.product_model.adjust_stock(
+                        product.id, amount, 'manual', reason, allow_negative=False,
+                        location_id=location_id
+                    )
+                except InsufficientStockError as e:
+                    console.print(f"[red]❌ Estoque insuficiente (disponível: {e.stock})[/red]")
+                else:
+                    if result:
+                        console.print(f"[green]✓ Estoque atualizado de {result[0]} para {result[1]}[/green]")
+        elif Confirm.ask(f"\nAlterar estoque de {product.stock} para {amount}?"):
+            try:
+                updated = self.product_model.update_stock(product.id, amount, 'manual', reason)
+            except InsufficientStockError as e:
+                # O total não pode ficar abaixo do estoque guardado nos outros locais
+                console.print(
+                    f"[red]❌ Estoque insuficiente no local principal (disponível: {e.stock})[/red]"
+                )
+            else:
+                if updated:
+                    console.print("[green]✓ Estoque atualizado com sucesso[/green]")
         
         self.wait_for_enter()
     
-    def low_stock_products(self):
-        """Lista produtos com estoque baixo (≤ 10 unidades)"""
-        self.show_header("Produtos com Estoque Baixo (≤ 10 unidades)")
+    def transfer_stock(self):
+        """Interface para transferir estoque de um produto entre dois locais"""
+        self.show_header("Transferir entre Locais")
         
-        low_stock_products = self.product_model.get_low_stock(10)
+        locations = self.location_model.get_all()
+        if len(locations) < 2:
+            console.print("[yellow]Cadastre pelo menos dois locais para transferir estoque[/yellow]")
+            self.wait_for_enter()
+            return
+        
+        product = self.select_product("Selecione o produto a transferir")
+        if not product:
+            return
         
-        if not low_stock_products:
-            console.print("[green]✓ Nenhum produto com estoque baixo[/green]")
-        else:
+        stock_by_location = {row.location_id: row.stock for row in self.location_model.product_stock(product.id)}
+        console.print(f"\n[bold]Produto:[/bold] [cyan]{product.name}[/cyan]")
+        for location in locations:
+            console.print(f"  {location.name}: [yellow]{stock_by_location.get(location.id, 0)}[/yellow]")
+        
+        console.print("\n[bold]Origem:[/bold]")
+        source = self.ask_location("Local de origem", locations)
+        console.print("\n[bold]Destino:[/bold]")
+        target = self.ask_location(
+            "Local de destino", [location for location in locations if location.id != source.id]
+        )
+        quantity = IntPrompt.ask("Quantidade")
+        if quantity <= 0:
+            console.print("[red]A quantidade deve ser positiva[/red]")
+            self.wait_for_enter()
+            return
+        reason = Prompt.ask("Motivo", default="")
+        
+        if Confirm.ask(f"\nTransferir {quantity} un. de {source.name} para {target.name}?"):
+            try:
+                self.product_model.transfer_stock(
+                    [(product.id, quantity)], source.id, target.id, reason
+                )
+            except InsufficientStockError as e:
+                console.print(f"[red]❌ Estoque insuficiente na origem (disponível: {e.stock})[/red]")
+            else:
+                console.print("[green]✓ Transferência registrada[/green]")
+        
+        self.wait_for_enter()
+    
+    def locations(self):
+        """Lista os locais de estoque e permite cadastrar novos"""
+        while True:
+            self.show_header("Locais de Estoque")
+            
+            table = Table(box=box.ROUNDED)
+            table.add_column("ID", style="cyan")
+            table.add_column("Nome", style="white")
+            table.add_column("Desde", style="dim")
+            for location in self.location_model.get_all():
+                table.add_row(str(location.id), location.name, str(location.created_at)[:10])
+            console.print(table)
+            
+            console.print("\n[cyan]n[/cyan] - Novo local")
+            console.print("[yellow]0[/yellow] - Voltar")
+            if Prompt.ask("\nSua escolha", choices=["0", "n"], default="0") == "0":
+                return
+            
+            name = Prompt.ask("Nome do novo local").strip()
+            if not name:
+                continue
+            if self.location_model.find(name):
+                console.print(f"[red]Já existe um local chamado '{name}'[/red]")
+                self.wait_for_enter()
+            else:
+                self.location_model.create(name)
+    
+    def low_stock_products(self):
+        """Lista os produtos com alerta de reposição (estoque ≤ mínimo do produto)"""
+        def render(products):
             table = Table(box=box.ROUNDED)
             table.add_column("ID", style="cyan")
             table.add_column("Nome", style="white")
             table.add_column("Marca", style="blue")
             table.add_column("Estoque", style="red")
+            table.add_column("Mínimo", style="yellow")
             table.add_column("Preço", style="green")
             
-            for product in low_stock_products:
+            for product in products:
                 table.add_row(
-                    str(product[0]),
-                    product[1][:25] + "..." if len(product[1]) > 25 else product[1],
-                    product[5] or "—",
-                    f"[red]{product[4]}[/red]",
-                    f"R$ {product[3]:.2f}"
+                    str(product.id),
+                    product.name[:25] + "..." if len(product.name) > 25 else product.name,
+                    product.brand or "—",
+                    f"[red]{product.stock}[/red]",
+                    str(product.min_stock),
+                    f"R$ {product.price:.2f}"
                 )
             
             console.print(table)
         
-        self.wait_for_enter()
+        self.browse_pages(
+            "Produtos Abaixo do Estoque Mínimo",
+            lambda after: self.product_model.get_alerts_page(after=after),
+            render,
+            "[green]✓ Nenhum produto abaixo do estoque mínimo[/green]"
+        )
     
     def out_of_stock_products(self):
         """Lista produtos sem estoque"""
-        self.show_header("Produtos Sem Estoque")
-        
-        out_of_stock_products = self.product_model.get_out_of_stock()
-        
-        if not out_of_stock_products:
-            console.print("[green]✓ Nenhum produto sem estoque[/green]")
-        else:
+        def render(products):
             table = Table(box=box.ROUNDED)
             table.add_column("ID", style="cyan")
             table.add_column("Nome", style="white")
@@ -398,17 +621,74 @@ class MenuManager:
             table.add_column("Preço", style="green")
             table.add_column("Última atualização", style="dim")
             
-            for product in out_of_stock_products:
+            for product in products:
                 table.add_row(
-                    str(product[0]),
-                    product[1][:25] + "..." if len(product[1]) > 25 else product[1],
-                    product[5] or "—",
-                    f"R$ {product[3]:.2f}",
-                    str(product[7])[:16]
+                    str(product.id),
+                    product.name[:25] + "..." if len(product.name) > 25 else product.name,
+                    product.brand or "—",
+                    f"R$ {product.price:.2f}",
+                    str(product.updated_at)[:16]
                 )
             
             console.print(table)
         
+        self.browse_pages(
+            "Produtos Sem Estoque",
+            lambda after: self.product_model.get_out_of_stock_page(after=after),
+            render,
+            "[green]✓ Nenhum produto sem estoque[/green]"
+        )
+    
+    def reorder_forecast(self):
+        """Mostra os produtos que devem acabar primeiro e quanto comprar de cada um"""
+        self.show_header("Previsão de Reposição")
+        
+        if self.analytics is None:
+            try:
+                from analytics import DemandAnalytics
+            except ImportError:
+                console.print("[red]❌ A previsão precisa do NumPy (pip install -r requirements.txt)[/red]")
+                self.wait_for_enter()
+                return
+            self.analytics = DemandAnalytics(self.product_model.db)
+        
+        with console.status("Calculando consumo..."):
+            summary = self.analytics.summary()
+            forecast = self.analytics.forecast(limit=20)
+        
+        console.print(
+            f"Consumo dos últimos {summary['window_days']} dias: "
+            f"[cyan]{summary['products_moving']}[/cyan] produtos com saída, "
+            f"[yellow]{summary['need_reorder']}[/yellow] abaixo do ponto de pedido "
+            f"([green]{summary['units_to_order']}[/green] unidades a comprar)\n"
+        )
+        
+        if not forecast:
+            console.print("[yellow]Nenhuma saída de estoque no período.[/yellow]")
+            self.wait_for_enter()
+            return
+        
+        table = Table(box=box.ROUNDED)
+        table.add_column("ID", style="cyan", width=6)
+        table.add_column("Nome", style="white")
+        table.add_column("Estoque", style="yellow", justify="right")
+        table.add_column("Consumo/dia", style="magenta", justify="right")
+        table.add_column("Cobertura", style="red", justify="right")
+        table.add_column("Ponto de Pedido", style="blue", justify="right")
+        table.add_column("Comprar", style="green", justify="right")
+        
+        for item in forecast:
+            table.add_row(
+                str(item.product_id),
+                item.name[:30] + "..." if len(item.name) > 30 else item.name,
+                str(item.stock),
+                f"{item.velocity:.2f}",
+                f"{item.days_of_cover:.1f} dias",
+                f"{item.reorder_point:.0f}",
+                str(item.reorder_quantity) if item.reorder_quantity else "-"
+            )
+        
+        console.print(table)
         self.wait_for_enter()
     
     def search_products(self):
@@ -422,12 +702,8 @@ class MenuManager:
             self.wait_for_enter()
             return
         
-        results = self.product_model.search(search_term)
-        
-        if not results:
-            console.print(f"[yellow]Nenhum produto encontrado para '{search_term}'[/yellow]")
-        else:
-            console.print(f"[green]✓ Encontrados {len(results)} produtos[/green]")
+        def render(results):
+            console.print(f"[bold]Busca:[/bold] {search_term}")
             
             table = Table(box=box.ROUNDED)
             table.add_column("ID", style="cyan")
@@ -438,20 +714,25 @@ class MenuManager:
             table.add_column("Descrição", style="dim")
             
             for product in results:
-                stock_style = "red" if product[4] == 0 else "yellow" if product[4] <= 10 else "green"
-                description = product[2] or "—"
+                stock_style = "red" if product.stock == 0 else "yellow" if product.stock <= 10 else "green"
+                description = product.description or "—"
                 table.add_row(
-                    str(product[0]),
-                    product[1][:25] + "..." if len(product[1]) > 25 else product[1],
-                    product[5] or "—",
-                    f"R$ {product[3]:.2f}",
-                    f"[{stock_style}]{product[4]}[/{stock_style}]",
+                    str(product.id),
+                    product.name[:25] + "..." if len(product.name) > 25 else product.name,
+                    product.brand or "—",
+                    f"R$ {product.price:.2f}",
+                    f"[{stock_style}]{product.stock}[/{stock_style}]",
                     description[:25] + "..." if len(description) > 25 else description
                 )
             
             console.print(table)
         
-        self.wait_for_enter()
+        self.browse_pages(
+            "Buscar Produtos",
+            lambda after: self.product_model.suggest_page(search_term, after=after),
+            render,
+            f"[yellow]Nenhum produto encontrado para '{search_term}'[/yellow]"
+        )
     
     def history_menu(self):
         """Menu de histórico de movimentações de estoque"""
@@ -480,13 +761,9 @@ class MenuManager:
         if not product:
             return
         
-        console.print(f"\n[bold]Produto:[/bold] [cyan]{product[1]}[/cyan]")
-        
-        history = self.history_model.get_by_product(product[0])
-        
-        if not history:
-            console.print("[yellow]Nenhum registro de histórico para este produto.[/yellow]")
-        else:
+        def render(history):
+            console.print(f"[bold]Produto:[/bold] [cyan]{product.name}[/cyan]")
+            
             table = Table(box=box.ROUNDED)
             table.add_column("Data", style="cyan")
             table.add_column("Estoque Antigo", style="yellow")
@@ -496,32 +773,31 @@ class MenuManager:
             table.add_column("Motivo", style="white")
             
             for record in history:
-                variation = record[3] - record[2]
+                variation = record.variation
                 variation_str = f"+{variation}" if variation > 0 else str(variation)
                 variation_style = "green" if variation > 0 else "red" if variation < 0 else "yellow"
                 
                 table.add_row(
-                    str(record[6])[:16],
-                    str(record[2]),
-                    str(record[3]),
+                    str(record.created_at)[:16],
+                    str(record.old_stock),
+                    str(record.new_stock),
                     f"[{variation_style}]{variation_str}[/{variation_style}]",
-                    record[4],
-                    record[5] or "—"
+                    record.change_type,
+                    record.reason or "—"
                 )
             
             console.print(table)
         
-        self.wait_for_enter()
+        self.browse_pages(
+            "Histórico por Produto",
+            lambda after: self.history_model.get_by_product_page(product.id, after=after),
+            render,
+            "[yellow]Nenhum registro de histórico para este produto.[/yellow]"
+        )
     
     def recent_history(self):
         """Mostra histórico recente de todas as movimentações"""
-        self.show_header("Histórico Recente")
-        
-        history = self.history_model.get_recent(20)
-        
-        if not history:
-            console.print("[yellow]Nenhum registro de histórico.[/yellow]")
-        else:
+        def render(history):
             table = Table(box=box.ROUNDED)
             table.add_column("Data", style="cyan")
             table.add_column("Produto", style="white")
@@ -531,19 +807,137 @@ class MenuManager:
             table.add_column("Tipo", style="blue")
             
             for record in history:
-                variation = record[3] - record[2]
+                variation = record.variation
                 variation_str = f"+{variation}" if variation > 0 else str(variation)
                 variation_style = "green" if variation > 0 else "red" if variation < 0 else "yellow"
                 
                 table.add_row(
-                    str(record[6])[:16],
-                    record[7][:20] + "..." if len(record[7]) > 20 else record[7],
-                    str(record[2]),
-                    str(record[3]),
+                    str(record.created_at)[:16],
+                    record.product_name[:20] + "..." if len(record.product_name) > 20 else record.product_name,
+                    str(record.old_stock),
+                    str(record.new_stock),
                     f"[{variation_style}]{variation_str}[/{variation_style}]",
-                    record[4]
+                    record.change_type
                 )
             
             console.print(table)
         
-        self.wait_for_enter()
\ No newline at end of file
+        self.browse_pages(
+            "Histórico Recente",
+            lambda after: self.history_model.get_recent_page(after=after),
+            render,
+            "[yellow]Nenhum registro de histórico.[/yellow]"
+        )
+    
+    def reports(self):
+        """Relatórios de valor em estoque: por marca, por faixa de estoque e maiores valores"""
+        while True:
+            self.show_header("Relatórios")
+            stats = self.product_model.get_stats()
+            total_value = stats['total_value'] or 0
+            
+            console.print(
+                f"📦 [cyan]{stats['total_products']}[/cyan] produtos, "
+                f"[cyan]{stats['total_units']}[/cyan] unidades, "
+                f"[green]R$ {total_value:.2f}[/green] em estoque\n"
+            )
+            
+            table = Table(title="Valor por marca", box=box.ROUNDED)
+            table.add_column("Marca", style="blue")
+            table.add_column("Produtos", style="cyan", justify="right")
+            table.add_column("Unidades", style="cyan", justify="right")
+            table.add_column("Valor", style="green", justify="right")
+            table.add_column("%", style="yellow", justify="right")
+            for summary in self.report_model.by_brand(limit=REPORT_BRAND_LIMIT):
+                share = summary.total_value / total_value * 100 if total_value else 0
+                table.add_row(
+                    summary.brand or "—",
+                    str(summary.product_count),
+                    str(summary.total_units),
+                    f"R$ {summary.total_value:.2f}",
+                    f"{share:.1f}"
+                )
+            console.print(table)
+            
+            table = Table(title="Faixas de estoque", box=box.ROUNDED)
+            table.add_column("Estoque", style="white")
+            table.add_column("Produtos", style="cyan", justify="right")
+            table.add_column("Unidades", style="cyan", justify="right")
+            table.add_column("Valor", style="green", justify="right")
+            for band in self.report_model.stock_bands():
+                table.add_row(
+                    band.label, str(band.product_count), str(band.total_units), f"R$ {band.total_value:.2f}"
+                )
+            console.print(table)
+            
+            table = Table(title="Maiores valores em estoque", box=box.ROUNDED)
+            table.add_column("ID", style="cyan")
+            table.add_column("Nome", style="white")
+            table.add_column("Marca", style="blue")
+            table.add_column("Estoque", style="yellow", justify="right")
+            table.add_column("Valor", style="green", justify="right")
+            for product in self.report_model.top_by_value(REPORT_TOP_LIMIT):
+                table.add_row(
+                    str(product.id),
+                    product.name[:25] + "..." if len(product.name) > 25 else product.name,
+                    product.brand or "—",
+                    str(product.stock),
+                    f"R$ {(product.stock or 0) * (product.price or 0):.2f}"
+                )
+            console.print(table)
+            
+            console.print("\n[cyan]r[/cyan] - Recalcular resumos")
+            console.print("[yellow]0[/yellow] - Voltar")
+            if Prompt.ask("\nSua escolha", choices=["0", "r"], default="0") == "0":
+                return
+            
+            with console.status("Recalculando resumos..."):
+                self.report_model.rebuild()
+    
+    def diagnostics(self):
+        """Tela oculta com as métricas das queries e dos caches (opção "d")"""
+        while True:
+            self.show_header("Diagnóstico")
+            metrics = self.product_model.db.metrics
+            snapshot = metrics.snapshot(limit=15)
+            
+            table = Table(title="Queries por tempo total", box=box.ROUNDED)
+            table.add_column("Query", style="white", no_wrap=True, overflow="ellipsis", max_width=60)
+            table.add_column("Execuções", style="cyan", justify="right")
+            table.add_column("Média (ms)", style="yellow", justify="right")
+            table.add_column("Máx (ms)", style="red", justify="right")
+            table.add_column("Total (ms)", style="magenta", justify="right")
+            table.add_column("Linhas", style="green", justify="right")
+            
+            for stats in snapshot['statements']:
+                table.add_row(
+                    stats['query'][:120],
+                    str(stats['count']),
+                    f"{stats['mean_ms']:.2f}",
+                    f"{stats['max_ms']:.2f}",
+                    f"{stats['total_ms']:.1f}",
+                    str(stats['rows'])
+                )
+            console.print(table)
+            
+            console.print(f"\n[bold]Queries lentas[/bold] (acima de {snapshot['slow_query_ms']:g} ms):")
+            if not snapshot['slow']:
+                console.print("   [green]Nenhuma[/green]")
+            for entry in snapshot['slow'][:5]:
+                console.print(f"   [red]{entry['elapsed_ms']:.1f} ms[/red] {entry['query'][:100]}")
+                for line in entry['plan'].splitlines():
+                    console.print(f"      [dim]{line}[/dim]")
+            
+            console.print("\n[bold]Caches:[/bold]")
+            for name, stats in self.product_model.cache_stats().items():
+                console.print(
+                    f"   {name}: {stats['size']}/{stats['maxsize']} entradas, "
+                    f"{stats['hit_rate']:.0%} de acertos ({stats['hits']} acertos, {stats['misses']} faltas)"
+                )
+            
+            console.print("\nr. Zerar métricas   0. Voltar")
+            choice = Prompt.ask("\nSua escolha", choices=["0", "r"], default="0")
+            if choice == "r":
+                metrics.reset()
+            else:
+                return
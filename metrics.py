@@ -0,0 +1,218 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# Nome do logger das queries lentas
+LOGGER_NAME = 'estoque.sql'
+
+# Limite padrão do log de queries lentas; pode ser trocado por ESTOQUE_SLOW_QUERY_MS
+DEFAULT_SLOW_QUERY_MS = 100.0
+
+# Limites superiores (ms) das faixas do histograma de tempo; a última é "acima de 1s"
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+# Quantidade de queries lentas recentes guardadas em memória
+SLOW_LOG_SIZE = 50
+
+# Listas de placeholders de tamanho variável, como em "IN (?, ?, ?)"
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+def get_logger():
+    """
+    Logger das queries lentas
+
+    O módulo logging só é importado aqui, na primeira query lenta ou em
+    enable_slow_log(), para não pesar na partida dos comandos rápidos.
+    Sem configuração o log fica mudo (não suja a tela do menu).
+    """
+    import logging
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def enable_slow_log(path=None):
+    """
+    Passa a gravar o log de queries lentas
+
+    Args:
+        path (str): Arquivo do log; None grava na saída de erro
+    """
+    import logging
+    logger = get_logger()
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+
+def normalize_query(query):
+    """
+    Normaliza o texto de uma query para agrupar as estatísticas
+
+    Espaços e quebras de linha são colapsados e listas de placeholders
+    viram "?, ...", para que um IN com 3 ou 900 IDs conte como a mesma query.
+    """
+    return _PLACEHOLDER_LIST.sub('?, ...', ' '.join(query.split()))
+
+
+def format_plan(plan_rows):
+    """
+    Formata a saída do EXPLAIN QUERY PLAN como uma árvore indentada
+
+    Args:
+        plan_rows (list): Linhas (id, parent, notused, detail)
+
+    Returns:
+        str: Uma linha por passo do plano
+    """
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in plan_rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return '\n'.join(lines)
+
+
+class StatementStats:
+    """Contadores acumulados de uma query normalizada"""
+
+    __slots__ = ('count', 'total', 'max', 'rows', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms, rows):
+        """Soma uma execução às estatísticas"""
+        self.count += 1
+        self.total += elapsed_ms
+        self.rows += rows
+        if elapsed_ms > self.max:
+            self.max = elapsed_ms
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                self.histogram[index] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+
+class QueryMetrics:
+    """
+    Estatísticas de tempo e linhas por query e log de queries lentas
+
+    Seguro para uso por várias threads. As queries acima de
+    `slow_query_ms` são registradas no logger 'estoque.sql' (nível
+    WARNING) com o plano de execução, e as mais recentes ficam
+    disponíveis em snapshot().
+    """
+
+    def __init__(self, slow_query_ms=None, enabled=True):
+        """
+        Args:
+            slow_query_ms (float): Limite do log de lentas; padrão
+                ESTOQUE_SLOW_QUERY_MS ou 100 ms
+            enabled (bool): Se False, record() não faz nada
+        """
+        if slow_query_ms is None:
+            slow_query_ms = float(os.environ.get('ESTOQUE_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS))
+        self.slow_query_ms = slow_query_ms
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._statements = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed, rows, explain=None):
+        """
+        Registra uma execução
+
+        Args:
+            query (str): Texto da query
+            elapsed (float): Duração em segundos
+            rows (int): Linhas retornadas ou afetadas
+            explain (callable): Devolve as linhas do EXPLAIN QUERY PLAN;
+                só é chamado se a query for lenta
+        """
+        if not self.enabled:
+            return
+        key = normalize_query(query)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats()
+            stats.add(elapsed_ms, rows)
+
+        if elapsed_ms >= self.slow_query_ms:
+            self._log_slow(key, elapsed_ms, rows, explain)
+
+    def _log_slow(self, key, elapsed_ms, rows, explain):
+        """Guarda e registra no log uma query lenta com seu plano"""
+        plan = ''
+        if explain is not None:
+            try:
+                plan = format_plan(explain())
+            except Exception as e:
+                plan = f'(plano indisponível: {e})'
+        entry = {
+            'query': key,
+            'elapsed_ms': elapsed_ms,
+            'rows': rows,
+            'plan': plan,
+            'at': time.time(),
+        }
+        with self._lock:
+            self._slow.append(entry)
+        get_logger().warning("Query lenta (%.1f ms, %d linhas): %s\n%s", elapsed_ms, rows, key, plan)
+
+    def reset(self):
+        """Zera todas as estatísticas e o log de lentas"""
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+    def snapshot(self, limit=None):
+        """
+        Retorna uma cópia das estatísticas atuais
+
+        Args:
+            limit (int): Máximo de queries retornadas (as de maior tempo total)
+
+        Returns:
+            dict: 'statements' (por tempo total, decrescente), 'slow'
+                (mais recentes primeiro), 'slow_query_ms',
+                'histogram_bounds_ms' e 'since'
+        """
+        with self._lock:
+            statements = [
+                {
+                    'query': key,
+                    'count': stats.count,
+                    'total_ms': stats.total,
+                    'mean_ms': stats.total / stats.count,
+                    'max_ms': stats.max,
+                    'rows': stats.rows,
+                    'histogram': list(stats.histogram),
+                }
+                for key, stats in self._statements.items()
+            ]
+            slow = list(reversed(self._slow))
+        statements.sort(key=lambda s: s['total_ms'], reverse=True)
+        return {
+            'statements': statements[:limit] if limit else statements,
+            'slow': slow,
+            'slow_query_ms': self.slow_query_ms,
+            'histogram_bounds_ms': list(HISTOGRAM_BOUNDS_MS),
+            'since': self.started_at,
+        }
@@ -0,0 +1,751 @@
+import sqlite3
+
+# Lista ordenada de migrações: (versão, descrição, função)
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """
+    Registra uma função como migração do esquema
+
+    A função recebe um cursor e deve ser idempotente (IF NOT EXISTS etc.),
+    pois um banco pode ter sido alterado parcialmente antes do versionamento.
+
+    Args:
+        version (int): Versão do esquema após aplicar a migração
+        description (str): Descrição curta da mudança
+    """
+    def register(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migração {version} fora de ordem")
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def current_version(conn):
+    """Retorna a versão do esquema gravada em PRAGMA user_version"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def latest_version():
+    """Retorna a versão mais recente conhecida pelo código"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def migrate(conn):
+    """
+    Aplica, em ordem, as migrações ainda não aplicadas ao banco
+
+    Cada migração roda em sua própria transação junto com a atualização
+    de PRAGMA user_version: se falhar, o banco continua na versão anterior.
+
+    Args:
+        conn (sqlite3.Connection): Conexão com o banco
+
+    Returns:
+        list: Versões aplicadas nesta chamada
+    """
+    applied = []
+    for version, description, func in MIGRATIONS:
+        if version <= current_version(conn):
+            continue
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Outro processo pode ter migrado enquanto esperávamos o lock
+            if version > current_version(conn):
+                func(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                applied.append(version)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    return applied
+
+
+def table_exists(cursor, name):
+    """Indica se uma tabela (ou tabela virtual) existe no banco"""
+    return cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def column_exists(cursor, table, column):
+    """Indica se a tabela já possui a coluna informada"""
+    return any(row[1] == column for row in cursor.execute(f'PRAGMA table_info({table})'))
+
+
+def migrate_archive(conn):
+    """
+    Acrescenta ao histórico arquivado (banco 'archive' anexado) as colunas
+    criadas no histórico principal depois dele
+
+    Args:
+        conn (sqlite3.Connection): Conexão com o arquivo já anexado
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA archive.table_info(stock_history)')]
+    # Tabela ainda não criada (ver archive.ensure_archive)
+    if not columns:
+        return
+    # Migração 8: local de cada movimentação; migração 12: quantidade no local
+    added = False
+    for column in ('location_id', 'quantity'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE archive.stock_history ADD COLUMN {column} INTEGER')
+            added = True
+    if added:
+        conn.commit()
+
+
+@migration(1, "Índices das consultas de histórico, estoque baixo e listagem")
+def add_secondary_indexes(cursor):
+    """Cria os índices secundários usados pelas consultas mais frequentes"""
+    # StockHistoryModel.get_by_product: WHERE product_id = ? ORDER BY created_at
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_history_product_created
+        ON stock_history (product_id, created_at)
+    ''')
+    # StockHistoryModel.get_recent e exportação por período
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_history_created
+        ON stock_history (created_at)
+    ''')
+    # get_low_stock (stock <= ? ORDER BY stock) e get_out_of_stock (stock = 0 ORDER BY name)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_stock_name
+        ON products (stock, name)
+    ''')
+    # get_all: ORDER BY updated_at DESC
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_updated
+        ON products (updated_at)
+    ''')
+    # Estatísticas para o planejador; analysis_limit mantém o ANALYZE
+    # rápido mesmo em bancos com vários GB
+    cursor.execute('PRAGMA analysis_limit = 1000')
+    cursor.execute('ANALYZE')
+
+
+@migration(2, "Índice de texto completo dos produtos (FTS5 com trigramas)")
+def add_search_index(cursor):
+    """
+    Cria o índice de texto completo (FTS5 com trigramas) dos produtos
+
+    O índice cobre nome, marca e descrição e é mantido em sincronia com
+    a tabela products por triggers. O tokenizador de trigramas permite
+    buscar por qualquer trecho do texto, como o antigo LIKE '%termo%'.
+    Se o SQLite não tiver suporte a FTS5/trigram a migração não faz nada
+    e a busca usa LIKE.
+    """
+    if table_exists(cursor, 'products_fts'):
+        return
+
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE products_fts USING fts5(
+                name, brand, description,
+                content='products', content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, brand, description)
+            VALUES (new.id, new.name, new.brand, new.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, brand, description)
+            VALUES ('delete', old.id, old.name, old.brand, old.description);
+        END
+    ''')
+    # Só reindexa quando um campo de texto muda (ajustes de estoque não pagam o custo)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_update
+        AFTER UPDATE OF name, brand, description ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, brand, description)
+            VALUES ('delete', old.id, old.name, old.brand, old.description);
+            INSERT INTO products_fts (rowid, name, brand, description)
+            VALUES (new.id, new.name, new.brand, new.description);
+        END
+    ''')
+
+    # Indexa os produtos que já existiam antes da criação do índice
+    cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+@migration(3, "Identificador de movimentação/documento no histórico")
+def add_movement_id(cursor):
+    """Adiciona stock_history.movement_id, que agrupa as linhas de uma mesma movimentação"""
+    if not column_exists(cursor, 'stock_history', 'movement_id'):
+        cursor.execute('ALTER TABLE stock_history ADD COLUMN movement_id TEXT')
+    # Índice parcial: ajustes avulsos (sem movimentação) não ocupam espaço
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_history_movement
+        ON stock_history (movement_id) WHERE movement_id IS NOT NULL
+    ''')
+
+
+@migration(4, "Resumo do estoque mantido por triggers")
+def add_inventory_summary(cursor):
+    """
+    Cria a tabela inventory_summary (uma única linha) com os totais do painel
+
+    Triggers em products mantêm contagem de produtos, unidades, valor em
+    estoque, estoque baixo e sem estoque, então o menu principal lê os
+    números em O(1) em vez de percorrer o catálogo.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS inventory_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            low_stock_threshold INTEGER NOT NULL,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            total_units INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0,
+            low_stock_count INTEGER NOT NULL DEFAULT 0,
+            out_of_stock_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Limite padrão de ProductModel.get_low_stock
+    cursor.execute('''
+        INSERT OR IGNORE INTO inventory_summary (id, low_stock_threshold) VALUES (1, 10)
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS inventory_summary_insert AFTER INSERT ON products BEGIN
+            UPDATE inventory_summary SET
+                product_count = product_count + 1,
+                total_units = total_units + COALESCE(new.stock, 0),
+                total_value = total_value + COALESCE(new.stock, 0) * COALESCE(new.price, 0),
+                low_stock_count = low_stock_count + COALESCE(new.stock <= low_stock_threshold, 0),
+                out_of_stock_count = out_of_stock_count + COALESCE(new.stock = 0, 0)
+            WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS inventory_summary_delete AFTER DELETE ON products BEGIN
+            UPDATE inventory_summary SET
+                product_count = product_count - 1,
+                total_units = total_units - COALESCE(old.stock, 0),
+                total_value = total_value - COALESCE(old.stock, 0) * COALESCE(old.price, 0),
+                low_stock_count = low_stock_count - COALESCE(old.stock <= low_stock_threshold, 0),
+                out_of_stock_count = out_of_stock_count - COALESCE(old.stock = 0, 0)
+            WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS inventory_summary_update
+        AFTER UPDATE OF stock, price ON products BEGIN
+            UPDATE inventory_summary SET
+                total_units = total_units - COALESCE(old.stock, 0) + COALESCE(new.stock, 0),
+                total_value = total_value
+                    - COALESCE(old.stock, 0) * COALESCE(old.price, 0)
+                    + COALESCE(new.stock, 0) * COALESCE(new.price, 0),
+                low_stock_count = low_stock_count
+                    - COALESCE(old.stock <= low_stock_threshold, 0)
+                    + COALESCE(new.stock <= low_stock_threshold, 0),
+                out_of_stock_count = out_of_stock_count
+                    - COALESCE(old.stock = 0, 0)
+                    + COALESCE(new.stock = 0, 0)
+            WHERE id = 1;
+        END
+    ''')
+    rebuild_inventory_summary(cursor)
+
+
+def rebuild_inventory_summary(cursor):
+    """Recalcula inventory_summary a partir da tabela products (corrige desvios)"""
+    cursor.execute('''
+        UPDATE inventory_summary SET
+            product_count = totals.product_count,
+            total_units = totals.total_units,
+            total_value = totals.total_value,
+            low_stock_count = totals.low_stock_count,
+            out_of_stock_count = totals.out_of_stock_count
+        FROM (
+            SELECT
+                COUNT(*) AS product_count,
+                COALESCE(SUM(stock), 0) AS total_units,
+                COALESCE(SUM(COALESCE(stock, 0) * COALESCE(price, 0)), 0) AS total_value,
+                COALESCE(SUM(stock <= (SELECT low_stock_threshold FROM inventory_summary)), 0)
+                    AS low_stock_count,
+                COALESCE(SUM(stock = 0), 0) AS out_of_stock_count
+            FROM products
+        ) AS totals
+        WHERE id = 1
+    ''')
+
+
+@migration(5, "Resumo diário do histórico arquivado")
+def add_history_rollup(cursor):
+    """
+    Cria as tabelas usadas pelo arquivamento do histórico (archive.py)
+
+    stock_history_daily guarda, por produto e dia, o resumo das
+    movimentações que foram movidas para o banco de arquivo.
+    history_archive (uma única linha) registra até que data o histórico
+    já foi arquivado, para as consultas saberem quando incluir o arquivo.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_history_daily (
+            product_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            movements INTEGER NOT NULL,
+            units_in INTEGER NOT NULL,
+            units_out INTEGER NOT NULL,
+            opening_stock INTEGER,
+            closing_stock INTEGER,
+            PRIMARY KEY (product_id, day)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history_archive (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            archived_before TEXT,
+            archived_rows INTEGER NOT NULL DEFAULT 0,
+            last_run TIMESTAMP
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO history_archive (id) VALUES (1)')
+
+
+@migration(6, "Fotografias periódicas do estoque (checkpoints)")
+def add_stock_checkpoints(cursor):
+    """
+    Cria as tabelas de checkpoints do estoque (checkpoints.py)
+
+    Cada checkpoint guarda o estoque e o preço de todos os produtos em um
+    instante; a consulta "na data" parte do checkpoint mais próximo e só
+    repassa as movimentações posteriores a ele.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_checkpoints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            taken_at TIMESTAMP NOT NULL UNIQUE,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_checkpoint_items (
+            checkpoint_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            stock INTEGER,
+            price REAL,
+            PRIMARY KEY (checkpoint_id, product_id)
+        ) WITHOUT ROWID
+    ''')
+
+
+@migration(7, "Estoque mínimo por produto e alertas de reposição mantidos por triggers")
+def add_stock_alerts(cursor):
+    """
+    Cria products.min_stock e o conjunto de alertas de reposição
+
+    stock_alerts tem uma linha por produto com estoque <= min_stock e
+    alert_events registra, em sequência, cada alerta aberto ou resolvido.
+    Triggers em products mantêm as duas tabelas quando o estoque ou o
+    mínimo cruzam o limite, então ler os alertas atuais custa O(alertas)
+    e a contagem fica em inventory_summary.alert_count.
+    """
+    # Mesmo valor de LOW_STOCK_THRESHOLD, o antigo limite único
+    if not column_exists(cursor, 'products', 'min_stock'):
+        cursor.execute('ALTER TABLE products ADD COLUMN min_stock INTEGER NOT NULL DEFAULT 10')
+    if not column_exists(cursor, 'inventory_summary', 'alert_count'):
+        cursor.execute('ALTER TABLE inventory_summary ADD COLUMN alert_count INTEGER NOT NULL DEFAULT 0')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_alerts (
+            product_id INTEGER PRIMARY KEY,
+            opened_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alert_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            stock INTEGER,
+            min_stock INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Abertura: produto novo já abaixo do mínimo, ou estoque/mínimo que cruzou o limite
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_insert
+        AFTER INSERT ON products WHEN new.stock <= new.min_stock BEGIN
+            INSERT OR IGNORE INTO stock_alerts (product_id) VALUES (new.id);
+            INSERT INTO alert_events (product_id, event, stock, min_stock)
+            VALUES (new.id, 'aberto', new.stock, new.min_stock);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_open
+        AFTER UPDATE OF stock, min_stock ON products
+        WHEN new.stock <= new.min_stock AND (old.stock <= old.min_stock) IS NOT 1 BEGIN
+            INSERT OR IGNORE INTO stock_alerts (product_id) VALUES (new.id);
+            INSERT INTO alert_events (product_id, event, stock, min_stock)
+            VALUES (new.id, 'aberto', new.stock, new.min_stock);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_close
+        AFTER UPDATE OF stock, min_stock ON products
+        WHEN old.stock <= old.min_stock AND (new.stock <= new.min_stock) IS NOT 1 BEGIN
+            DELETE FROM stock_alerts WHERE product_id = old.id;
+            INSERT INTO alert_events (product_id, event, stock, min_stock)
+            VALUES (old.id, 'resolvido', new.stock, new.min_stock);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_delete
+        AFTER DELETE ON products WHEN old.stock <= old.min_stock BEGIN
+            DELETE FROM stock_alerts WHERE product_id = old.id;
+            INSERT INTO alert_events (product_id, event, stock, min_stock)
+            VALUES (old.id, 'removido', old.stock, old.min_stock);
+        END
+    ''')
+
+    # Contagem do painel (só dispara quando a linha realmente entra ou sai)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS alert_count_insert AFTER INSERT ON stock_alerts BEGIN
+            UPDATE inventory_summary SET alert_count = alert_count + 1 WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS alert_count_delete AFTER DELETE ON stock_alerts BEGIN
+            UPDATE inventory_summary SET alert_count = alert_count - 1 WHERE id = 1;
+        END
+    ''')
+    rebuild_stock_alerts(cursor)
+
+
+def rebuild_stock_alerts(cursor):
+    """Recalcula stock_alerts e alert_count a partir da tabela products (corrige desvios)"""
+    cursor.execute('''
+        DELETE FROM stock_alerts WHERE product_id NOT IN (
+            SELECT id FROM products WHERE stock <= min_stock
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO stock_alerts (product_id)
+        SELECT id FROM products WHERE stock <= min_stock
+    ''')
+    cursor.execute('''
+        UPDATE inventory_summary SET alert_count = (SELECT COUNT(*) FROM stock_alerts)
+        WHERE id = 1
+    ''')
+
+
+@migration(8, "Locais de estoque (lojas, depósito) com estoque por local")
+def add_locations(cursor):
+    """
+    Cria os locais de estoque e o estoque de cada produto por local
+
+    product_locations guarda a quantidade de cada produto em cada local;
+    products.stock passa a ser o total, mantido por triggers, então as
+    listagens e os alertas continuam lendo uma única coluna. Escritas
+    diretas em products.stock (código e bancos antigos) são lançadas no
+    local padrão (id 1), para o total e a soma dos locais nunca divergirem.
+    stock_history ganha location_id, o local de cada movimentação.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS locations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Local padrão: recebe o estoque existente e as escritas sem local
+    cursor.execute("INSERT OR IGNORE INTO locations (id, name) VALUES (1, 'Principal')")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS product_locations (
+            product_id INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            stock INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, location_id)
+        ) WITHOUT ROWID
+    ''')
+    # Estoque de um local (a chave primária já cobre as consultas por produto)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_product_locations_location
+        ON product_locations (location_id)
+    ''')
+    if not column_exists(cursor, 'stock_history', 'location_id'):
+        cursor.execute('ALTER TABLE stock_history ADD COLUMN location_id INTEGER')
+    cursor.execute('''
+        INSERT OR IGNORE INTO product_locations (product_id, location_id, stock)
+        SELECT id, 1, COALESCE(stock, 0) FROM products
+    ''')
+
+    # Total do produto = soma dos locais (só grava se mudou)
+    for event, row in (('INSERT', 'new'), ('UPDATE OF stock', 'new'), ('DELETE', 'old')):
+        name = event.split()[0].lower()
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS product_locations_total_{name}
+            AFTER {event} ON product_locations BEGIN
+                UPDATE products SET stock = totals.stock, updated_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT COALESCE(SUM(stock), 0) AS stock
+                    FROM product_locations WHERE product_id = {row}.product_id
+                ) AS totals
+                WHERE products.id = {row}.product_id AND products.stock IS NOT totals.stock;
+            END
+        ''')
+    # Produto novo: estoque inicial no local padrão
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS product_locations_seed AFTER INSERT ON products BEGIN
+            INSERT OR IGNORE INTO product_locations (product_id, location_id, stock)
+            VALUES (new.id, 1, COALESCE(new.stock, 0));
+        END
+    ''')
+    # Escrita direta no total: a diferença vai para o local padrão
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS product_locations_sync
+        AFTER UPDATE OF stock ON products
+        WHEN new.stock IS NOT (SELECT SUM(stock) FROM product_locations WHERE product_id = new.id)
+        BEGIN
+            INSERT INTO product_locations (product_id, location_id, stock)
+            VALUES (
+                new.id, 1,
+                COALESCE(new.stock, 0)
+                    - COALESCE((SELECT SUM(stock) FROM product_locations WHERE product_id = new.id), 0)
+            )
+            ON CONFLICT (product_id, location_id) DO UPDATE SET stock = stock + excluded.stock;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS product_locations_delete AFTER DELETE ON products BEGIN
+            DELETE FROM product_locations WHERE product_id = old.id;
+        END
+    ''')
+
+
+@migration(9, "Registro de alterações de produtos e histórico para sincronização")
+def add_change_log(cursor):
+    """
+    Cria o change_log, o registro em sequência de tudo que mudou
+
+    Triggers gravam uma linha por produto incluído, alterado ou excluído e
+    por movimentação registrada no histórico. Como o SQLite tem um único
+    escritor, o seq (AUTOINCREMENT, nunca reutilizado) cresce na ordem dos
+    commits: quem guarda o último seq lido recebe, na próxima leitura,
+    exatamente o que mudou depois dele, sem percorrer o catálogo.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            product_id INTEGER,
+            op TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for event, op, row in (
+        ('INSERT', 'inclusao', 'new'), ('UPDATE', 'alteracao', 'new'), ('DELETE', 'exclusao', 'old')
+    ):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS change_log_product_{event.lower()}
+            AFTER {event} ON products BEGIN
+                INSERT INTO change_log (entity, entity_id, product_id, op)
+                VALUES ('produto', {row}.id, {row}.id, '{op}');
+            END
+        ''')
+    # O histórico só recebe inclusões (o arquivamento move linhas, não as altera)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS change_log_history_insert
+        AFTER INSERT ON stock_history BEGIN
+            INSERT INTO change_log (entity, entity_id, product_id, op)
+            VALUES ('movimentacao', new.id, new.product_id, 'inclusao');
+        END
+    ''')
+
+
+# Faixas do histograma de estoque: (id, rótulo, limite inferior, limite superior), None = sem limite
+STOCK_BANDS = (
+    (1, 'Negativo', None, -1),
+    (2, 'Sem estoque', 0, 0),
+    (3, '1 a 10', 1, 10),
+    (4, '11 a 50', 11, 50),
+    (5, '51 a 100', 51, 100),
+    (6, '101 a 500', 101, 500),
+    (7, 'Acima de 500', 501, None),
+)
+
+
+def _band_condition(stock):
+    """Condição SQL que seleciona a faixa de stock_bands de um estoque (nulo conta como 0)"""
+    value = f'COALESCE({stock}, 0)'
+    return (
+        f'(lower_bound IS NULL OR {value} >= lower_bound) '
+        f'AND (upper_bound IS NULL OR {value} <= upper_bound)'
+    )
+
+
+@migration(10, "Resumos de relatório por marca e faixa de estoque, índice de valor por produto")
+def add_report_summaries(cursor):
+    """
+    Cria os resumos dos relatórios gerenciais mantidos por triggers
+
+    brand_summary tem produtos, unidades e valor de cada marca (marca
+    vazia ou nula fica em ''); stock_bands conta produtos, unidades e valor
+    por faixa de estoque. Cada escrita em products ajusta só a marca e as
+    faixas envolvidas, então os relatórios leem poucas linhas qualquer que
+    seja o tamanho do catálogo. O índice de expressão sobre estoque x
+    preço entrega os produtos de maior valor sem ordenar a tabela.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS brand_summary (
+            brand TEXT PRIMARY KEY,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            total_units INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_bands (
+            id INTEGER PRIMARY KEY,
+            label TEXT NOT NULL,
+            lower_bound INTEGER,
+            upper_bound INTEGER,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            total_units INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.executemany(
+        'INSERT OR IGNORE INTO stock_bands (id, label, lower_bound, upper_bound) VALUES (?, ?, ?, ?)',
+        STOCK_BANDS
+    )
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_value
+        ON products ((COALESCE(stock, 0) * COALESCE(price, 0)))
+    ''')
+
+    # Entrada e saída de um produto nos resumos (reusadas por inclusão, exclusão e alteração)
+    def add(row):
+        units = f'COALESCE({row}.stock, 0)'
+        value = f'COALESCE({row}.stock, 0) * COALESCE({row}.price, 0)'
+        return f'''
+            INSERT INTO brand_summary (brand, product_count, total_units, total_value)
+            VALUES (COALESCE({row}.brand, ''), 1, {units}, {value})
+            ON CONFLICT (brand) DO UPDATE SET
+                product_count = product_count + 1,
+                total_units = total_units + excluded.total_units,
+                total_value = total_value + excluded.total_value;
+            UPDATE stock_bands SET
+                product_count = product_count + 1,
+                total_units = total_units + {units},
+                total_value = total_value + {value}
+            WHERE {_band_condition(f'{row}.stock')};
+        '''
+
+    def remove(row):
+        units = f'COALESCE({row}.stock, 0)'
+        value = f'COALESCE({row}.stock, 0) * COALESCE({row}.price, 0)'
+        return f'''
+            UPDATE brand_summary SET
+                product_count = product_count - 1,
+                total_units = total_units - {units},
+                total_value = total_value - {value}
+            WHERE brand = COALESCE({row}.brand, '');
+            DELETE FROM brand_summary WHERE brand = COALESCE({row}.brand, '') AND product_count <= 0;
+            UPDATE stock_bands SET
+                product_count = product_count - 1,
+                total_units = total_units - {units},
+                total_value = total_value - {value}
+            WHERE {_band_condition(f'{row}.stock')};
+        '''
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS report_summaries_insert AFTER INSERT ON products BEGIN
+            {add('new')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS report_summaries_delete AFTER DELETE ON products BEGIN
+            {remove('old')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS report_summaries_update
+        AFTER UPDATE OF stock, price, brand ON products BEGIN
+            {remove('old')}
+            {add('new')}
+        END
+    ''')
+    rebuild_report_summaries(cursor)
+
+
+def rebuild_report_summaries(cursor):
+    """Recalcula brand_summary e stock_bands a partir da tabela products (corrige desvios)"""
+    cursor.execute('DELETE FROM brand_summary')
+    cursor.execute('''
+        INSERT INTO brand_summary (brand, product_count, total_units, total_value)
+        SELECT COALESCE(brand, ''), COUNT(*), COALESCE(SUM(stock), 0),
+               COALESCE(SUM(COALESCE(stock, 0) * COALESCE(price, 0)), 0)
+        FROM products
+        GROUP BY COALESCE(brand, '')
+    ''')
+    cursor.execute(f'''
+        UPDATE stock_bands SET
+            product_count = totals.product_count,
+            total_units = totals.total_units,
+            total_value = totals.total_value
+        FROM (
+            SELECT b.id,
+                   COUNT(p.id) AS product_count,
+                   COALESCE(SUM(p.stock), 0) AS total_units,
+                   COALESCE(SUM(COALESCE(p.stock, 0) * COALESCE(p.price, 0)), 0) AS total_value
+            FROM stock_bands b
+            LEFT JOIN products p ON {_band_condition('p.stock')}
+            GROUP BY b.id
+        ) AS totals
+        WHERE stock_bands.id = totals.id
+    ''')
+
+
+def rebuild_summaries(cursor):
+    """
+    Recalcula todas as tabelas de resumo mantidas por triggers
+
+    Painel (inventory_summary), alertas (stock_alerts) e relatórios
+    (brand_summary, stock_bands). Use dentro de uma transação se algum
+    resumo divergir da tabela products (ex.: edição manual do banco).
+    """
+    rebuild_inventory_summary(cursor)
+    rebuild_stock_alerts(cursor)
+    rebuild_report_summaries(cursor)
+
+
+@migration(11, "Índice do nome dos produtos (importação com atualização por nome)")
+def add_product_name_index(cursor):
+    """
+    Indexa products.name
+
+    ProductModel.create_many(upsert_key='name') procura os nomes já
+    cadastrados e atualiza cada produto por WHERE name = ?; sem o índice
+    cada uma dessas consultas percorre a tabela inteira.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)')
+
+
+@migration(12, "Quantidade movimentada no local em cada linha do histórico")
+def add_history_quantity(cursor):
+    """
+    Acrescenta stock_history.quantity, a variação do estoque no local da linha
+
+    old_stock/new_stock são o total do produto, que não muda numa
+    transferência; quantity guarda quanto saiu (negativa) ou entrou
+    (positiva) no location_id de cada linha. Nas linhas anteriores a esta
+    migração fica nula: fora das transferências, vale new_stock - old_stock.
+    """
+    if not column_exists(cursor, 'stock_history', 'quantity'):
+        cursor.execute('ALTER TABLE stock_history ADD COLUMN quantity INTEGER')
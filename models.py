@@ -1,11 +1,181 @@
-from db import Database
+from collections import namedtuple
+
+from cache import MISSING, LRUCache
+from db import get_database
+from records import (
+    AlertEvent, BrandSummary, ChangeEvent, Location, LocationStock, Product, ProductBatch, StockBand,
+    StockMovement
+)
+
+# Colunas das consultas de histórico, com os nomes dos campos de StockMovement.
+# Os apelidos de id e created_at permitem ordenar sem prefixo (inclusive em UNION ALL)
+HISTORY_COLUMNS = (
+    'sh.id AS id, sh.product_id, sh.old_stock, sh.new_stock, sh.change_type, '
+    'sh.reason, sh.created_at AS created_at, p.name AS product_name, sh.movement_id, sh.location_id, '
+    'sh.quantity'
+)
+# Colunas próprias de stock_history, na ordem da tabela (também as do arquivo)
+HISTORY_RAW_COLUMNS = (
+    'id, product_id, old_stock, new_stock, change_type, reason, created_at, movement_id, location_id, '
+    'quantity'
+)
+
+# Local que recebe o estoque quando nenhum é informado (criado pela migração 8)
+DEFAULT_LOCATION_ID = 1
+
+# Limite padrão de estoque baixo; também o estoque mínimo padrão dos produtos novos
+LOW_STOCK_THRESHOLD = 10
+
+# Dias que as alterações ficam no change_log (ver ChangeLogModel.purge)
+CHANGE_LOG_KEEP_DAYS = 30
+
+# Quantidade padrão de registros por página nas listagens
+PAGE_SIZE = 20
+
+# Cache de leitura de produtos: tamanho máximo e validade (segundos)
+PRODUCT_CACHE_SIZE = 4096
+SEARCH_CACHE_SIZE = 256
+CACHE_TTL = 30.0
+
+# Campos que alteram o resultado das buscas quando mudam
+SEARCH_FIELDS = {'name', 'brand', 'description'}
+
+# Campos aceitos como chave para atualizar produtos existentes em lote
+UPSERT_KEYS = ('id', 'name')
+
+class InsufficientStockError(Exception):
+    """Erro lançado quando um ajuste deixaria o estoque de um produto negativo"""
+    
+    def __init__(self, product_id, stock, delta):
+        self.product_id = product_id
+        self.stock = stock
+        self.delta = delta
+        super().__init__(
+            f"Estoque insuficiente para o produto {product_id}: "
+            f"disponível {stock}, variação {delta}"
+        )
+
+# Página de resultados: registros e cursor para buscar a próxima (None se acabou)
+Page = namedtuple('Page', ['rows', 'next_cursor'])
+
+# Produtos alterados depois de um seq: linhas atuais, IDs excluídos e o último seq lido
+ProductChanges = namedtuple('ProductChanges', ['products', 'deleted_ids', 'last_seq'])
+
+def _fetch_page(db, query, params, limit, cursor_of, row_type=Product):
+    """
+    Executa uma consulta paginada por keyset e monta a Page
+    
+    Busca limit + 1 registros: se o extra vier, existe próxima página e o
+    cursor é calculado a partir do último registro desta.
+    """
+    rows = db.fetch_all(query, list(params) + [limit + 1], row_type)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = cursor_of(rows[-1])
+    return Page(rows, next_cursor)
+
+def _min_stock(product_data):
+    """Estoque mínimo informado para um produto novo, ou o padrão"""
+    min_stock = product_data.get('min_stock')
+    return LOW_STOCK_THRESHOLD if min_stock is None else min_stock
+
+def _date_range_query(query, column, start=None, end=None):
+    """Acrescenta à query um filtro opcional de intervalo [start, end) na coluna"""
+    conditions = []
+    params = []
+    if start:
+        conditions.append(f'{column} >= ?')
+        params.append(start)
+    if end:
+        conditions.append(f'{column} < ?')
+        params.append(end)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    return query, params
+
+def _history_tables(db, start=None):
+    """
+    Tabelas de histórico a consultar para um intervalo que começa em `start`
+    
+    O banco de arquivo (archive.py) só entra quando existe e o intervalo
+    alcança datas anteriores às que já foram arquivadas.
+    """
+    tables = ['main.stock_history']
+    if db.attach_archive():
+        archived_before = db.fetch_one('SELECT archived_before FROM history_archive WHERE id = 1')[0]
+        if archived_before and (not start or start < archived_before):
+            tables.append('archive.stock_history')
+    return tables
+
+def _history_query(db, where='', params=(), order='created_at DESC, id DESC', start=None):
+    """
+    Monta a consulta de histórico (HISTORY_COLUMNS) com ordenação, sem o LIMIT
+    
+    Quando o histórico arquivado entra, cada tabela vira um SELECT unido
+    por UNION ALL; o SQLite percorre as duas em paralelo pelos índices
+    (MERGE), sem ordenar o resultado inteiro. `order` usa os apelidos
+    de HISTORY_COLUMNS (id, created_at).
+    
+    Returns:
+        tuple: (query, params)
+    """
+    tables = _history_tables(db, start)
+    selects = [
+        f'SELECT {HISTORY_COLUMNS} FROM {table} sh JOIN products p ON sh.product_id = p.id {where}'
+        for table in tables
+    ]
+    return ' UNION ALL '.join(selects) + f' ORDER BY {order}', list(params) * len(selects)
 
 class ProductModel:
     """Classe responsável por todas as operações relacionadas a produtos"""
     
-    def __init__(self):
-        """Inicializa o modelo de produtos com conexão ao banco"""
-        self.db = Database()
+    def __init__(self, db=None):
+        """
+        Inicializa o modelo de produtos com conexão ao banco
+        
+        Leituras por ID e buscas passam por um cache LRU com TTL; toda
+        escrita feita por este modelo invalida as entradas afetadas.
+        Escritas feitas por outros processos aparecem após o TTL.
+        
+        Args:
+            db (Database): Banco a usar; padrão é a instância compartilhada
+        """
+        self.db = db or get_database()
+        self.cache = LRUCache(PRODUCT_CACHE_SIZE, CACHE_TTL)
+        self.search_cache = LRUCache(SEARCH_CACHE_SIZE, CACHE_TTL)
+    
+    def cache_stats(self):
+        """
+        Retorna os contadores de acertos/faltas dos caches de produtos
+        
+        Returns:
+            dict: Estatísticas de 'products' (por ID) e 'searches' (buscas)
+        """
+        return {
+            'products': self.cache.stats(),
+            'searches': self.search_cache.stats(),
+        }
+    
+    def _invalidate(self, product_ids=(), searches=False):
+        """
+        Remove do cache os produtos alterados
+        
+        Args:
+            product_ids (iterable): IDs dos produtos alterados
+            searches (bool): Se True, descarta também as buscas em cache
+                (necessário quando produtos entram, saem ou mudam de texto)
+        """
+        product_ids = list(product_ids)
+        
+        def invalidate():
+            for product_id in product_ids:
+                self.cache.invalidate(product_id)
+            if searches:
+                self.search_cache.clear()
+        
+        # Só depois do commit: antes dele as outras conexões ainda leem o valor antigo
+        self.db.after_transaction(invalidate)
     
     def create(self, product_data):
         """
@@ -19,8 +189,8 @@ class ProductModel:
         """
         query = '''
             INSERT INTO products (
-                name, description, price, stock, brand
-            ) VALUES (?, ?, ?, ?, ?)
+                name, description, price, stock, brand, min_stock
+            ) VALUES (?, ?, ?, ?, ?, ?)
         '''
         
         params = (
@@ -28,21 +198,177 @@ class ProductModel:
             product_data.get('description', ''),
             product_data.get('price', 0),
             product_data.get('stock', 0),
-            product_data.get('brand', '')
+            product_data.get('brand', ''),
+            _min_stock(product_data)
         )
         
         cursor = self.db.execute(query, params)
+        self._invalidate(searches=True)
         return cursor.lastrowid
     
+    def create_many(self, products, upsert_key=None):
+        """
+        Insere (ou atualiza) vários produtos de uma vez com executemany
+        
+        Não faz commit por produto: quando chamado dentro de
+        Database.transaction() todo o lote entra no mesmo commit.
+        Atualizações que mudam o estoque gravam uma linha de histórico
+        (tipo 'import') por produto alterado.
+        
+        Args:
+            products (list): Lista de dicionários com os dados dos produtos
+            upsert_key (str): Campo usado para identificar produtos existentes
+                ('id' ou 'name'). Se None, todos os produtos são inseridos.
+        
+        Returns:
+            tuple: (quantidade inserida, quantidade atualizada)
+        """
+        if upsert_key not in (None,) + UPSERT_KEYS:
+            raise ValueError(f"Chave de upsert inválida: {upsert_key}")
+        
+        to_insert = list(products)
+        to_update = []
+        
+        if upsert_key:
+            keys = [p.get(upsert_key) for p in to_insert if p.get(upsert_key) is not None]
+            existing = self._stock_by_key(upsert_key, keys)
+            to_update = [p for p in to_insert if p.get(upsert_key) in existing]
+            to_insert = [p for p in to_insert if p.get(upsert_key) not in existing]
+        
+        if to_insert:
+            query = '''
+                INSERT INTO products (
+                    id, name, description, price, stock, brand, min_stock
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            '''
+            self.db.executemany(query, [
+                (
+                    p.get('id'),
+                    p.get('name'),
+                    p.get('description') or '',
+                    p.get('price') or 0,
+                    p.get('stock') or 0,
+                    p.get('brand') or '',
+                    _min_stock(p)
+                )
+                for p in to_insert
+            ])
+        
+        if to_update:
+            # Campos ausentes (None) mantêm o valor atual do produto
+            query = f'''
+                UPDATE products SET
+                    name = COALESCE(?, name),
+                    description = COALESCE(?, description),
+                    price = COALESCE(?, price),
+                    stock = COALESCE(?, stock),
+                    brand = COALESCE(?, brand),
+                    min_stock = COALESCE(?, min_stock),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE {upsert_key} = ?
+            '''
+            self.db.executemany(query, [
+                (
+                    p.get('name'),
+                    p.get('description'),
+                    p.get('price'),
+                    p.get('stock'),
+                    p.get('brand'),
+                    p.get('min_stock'),
+                    p.get(upsert_key)
+                )
+                for p in to_update
+            ])
+            history = [
+                (product_id, old_stock, p['stock'], 'import', 'Importação em lote', None,
+                 DEFAULT_LOCATION_ID, p['stock'] - (old_stock or 0))
+                for p in to_update if p.get('stock') is not None
+                for product_id, old_stock in existing[p[upsert_key]]
+                if p['stock'] != old_stock
+            ]
+            if history:
+                self._insert_history(history)
+        
+        self.db.after_transaction(self.cache.clear)
+        self._invalidate(searches=True)
+        return len(to_insert), len(to_update)
+    
+    def existing_keys(self, key, values):
+        """Retorna quais valores de `key` já existem na tabela de produtos"""
+        existing = set()
+        values = list(values)
+        # Divide em blocos para respeitar o limite de parâmetros do SQLite
+        for start in range(0, len(values), 900):
+            chunk = values[start:start + 900]
+            placeholders = ', '.join('?' * len(chunk))
+            query = f'SELECT {key} FROM products WHERE {key} IN ({placeholders})'
+            existing.update(row[0] for row in self.db.fetch_all(query, chunk))
+        return existing
+    
+    def _stock_by_key(self, key, values):
+        """
+        Busca os produtos cujo `key` está entre os valores informados
+        
+        Returns:
+            dict: {valor: [(id, estoque), ...]} só dos valores existentes
+                (vários produtos podem ter o mesmo nome)
+        """
+        found = {}
+        values = list(values)
+        for start in range(0, len(values), 900):
+            chunk = values[start:start + 900]
+            placeholders = ', '.join('?' * len(chunk))
+            query = f'SELECT {key}, id, stock FROM products WHERE {key} IN ({placeholders})'
+            for value, product_id, stock in self.db.fetch_all(query, chunk):
+                found.setdefault(value, []).append((product_id, stock))
+        return found
+    
     def get_all(self):
         """
         Busca todos os produtos ordenados pela data de atualização
         
         Returns:
-            list: Lista de todos os produtos
+            list: Lista de todos os produtos (Product)
         """
         query = 'SELECT * FROM products ORDER BY updated_at DESC'
-        return self.db.fetch_all(query)
+        return self.db.fetch_all(query, row_type=Product)
+    
+    def iter_all(self, start=None, end=None, chunk_size=500):
+        """
+        Percorre os produtos sem carregar a tabela inteira na memória
+        
+        Args:
+            start (str): Data/hora mínima de atualização (inclusiva)
+            end (str): Data/hora máxima de atualização (exclusiva)
+            chunk_size (int): Quantidade de registros lidos por vez
+        
+        Yields:
+            tuple: Colunas de cada produto, em ordem de ID (tuplas simples,
+                que são mais baratas para exportar)
+        """
+        query, params = _date_range_query('SELECT * FROM products', 'updated_at', start, end)
+        return self.db.iter_all(query + ' ORDER BY id', params, chunk_size)
+    
+    def get_batch(self, updated_since=None, chunk_size=5000):
+        """
+        Lê ID, estoque e preço dos produtos em formato de colunas
+        
+        Para leituras do catálogo inteiro (análises, totais): guarda só
+        três números por produto, em arrays, em vez de um objeto por linha.
+        
+        Args:
+            updated_since (str): Só produtos atualizados a partir desta data/hora
+            chunk_size (int): Quantidade de registros lidos por vez
+        
+        Returns:
+            ProductBatch: Colunas ids, stock e prices, em ordem de ID
+        """
+        query, params = _date_range_query(
+            'SELECT id, stock, price FROM products', 'updated_at', updated_since
+        )
+        batch = ProductBatch()
+        batch.extend(self.db.iter_all(query + ' ORDER BY id', params, chunk_size))
+        return batch
     
     def get_by_id(self, product_id):
         """
@@ -52,10 +378,48 @@ class ProductModel:
             product_id (int): ID do produto
         
         Returns:
-            tuple: Dados do produto ou None se não encontrado
+            Product: Dados do produto ou None se não encontrado
+        """
+        # A geração é lida antes do SELECT: se o produto for alterado (e
+        # descartado do cache) durante a leitura, o valor antigo não é guardado
+        generation = self.cache.generation
+        product = self.cache.get(product_id)
+        if product is MISSING:
+            query = 'SELECT * FROM products WHERE id = ?'
+            product = self.db.fetch_one(query, (product_id,), Product)
+            if product is not None:
+                self.cache.set(product_id, product, generation)
+        return product
+    
+    def get_by_ids(self, product_ids):
+        """
+        Busca vários produtos pelo ID, usando o cache e uma única consulta para o resto
+        
+        Args:
+            product_ids (list): IDs dos produtos
+        
+        Returns:
+            list: Produtos (Product) encontrados, na ordem dos IDs informados
         """
-        query = 'SELECT * FROM products WHERE id = ?'
-        return self.db.fetch_one(query, (product_id,))
+        found = {}
+        missing = []
+        generation = self.cache.generation
+        for product_id in product_ids:
+            product = self.cache.get(product_id)
+            if product is MISSING:
+                missing.append(product_id)
+            else:
+                found[product_id] = product
+        
+        for start in range(0, len(missing), 900):
+            chunk = missing[start:start + 900]
+            placeholders = ', '.join('?' * len(chunk))
+            query = f'SELECT * FROM products WHERE id IN ({placeholders})'
+            for product in self.db.fetch_all(query, chunk, Product):
+                self.cache.set(product.id, product, generation)
+                found[product.id] = product
+        
+        return [found[product_id] for product_id in product_ids if product_id in found]
     
     def update(self, product_id, update_data):
         """
@@ -77,6 +441,7 @@ class ProductModel:
         params.append(product_id)
         
         self.db.execute(query, params)
+        self._invalidate([product_id], searches=bool(SEARCH_FIELDS & set(update_data)))
         return True
     
     def delete(self, product_id):
@@ -91,12 +456,18 @@ class ProductModel:
         """
         query = 'DELETE FROM products WHERE id = ?'
         self.db.execute(query, (product_id,))
+        self._invalidate([product_id], searches=True)
         return True
     
     def update_stock(self, product_id, new_stock, change_type='manual', reason=''):
         """
         Atualiza o estoque de um produto e registra no histórico
         
+        Leitura do estoque antigo, atualização e histórico acontecem em
+        uma única transação (um único commit). A diferença vai para o
+        local padrão, então o novo total não pode ser menor que o estoque
+        guardado nos outros locais.
+        
         Args:
             product_id (int): ID do produto
             new_stock (int): Novo valor de estoque
@@ -105,51 +476,467 @@ class ProductModel:
         
         Returns:
             bool: True se atualizado com sucesso
+        
+        Raises:
+            InsufficientStockError: Se o local padrão ficaria negativo
         """
-        product = self.get_by_id(product_id)
-        if not product:
-            return False
+        with self.db.transaction():
+            # BEGIN IMMEDIATE já reservou a escrita: ninguém altera o estoque entre a leitura e o UPDATE
+            row = self.db.fetch_one('SELECT stock FROM products WHERE id = ?', (product_id,))
+            if not row:
+                return False
+            located = self.location_levels(DEFAULT_LOCATION_ID, [product_id]).get(product_id, 0)
+            elsewhere = (row[0] or 0) - located
+            if elsewhere > 0 and new_stock < elsewhere:
+                raise InsufficientStockError(product_id, located, new_stock - (row[0] or 0))
+            
+            self.db.execute(
+                'UPDATE products SET stock = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (new_stock, product_id)
+            )
+            self._record_history(product_id, row[0], new_stock, change_type, reason)
+        
+        self._invalidate([product_id])
+        return True
+    
+    def adjust_stock(self, product_id, delta, change_type='manual', reason='', allow_negative=True,
+                     location_id=None):
+        """
+        Soma uma variação (positiva ou negativa) ao estoque de um produto
+        
+        O UPDATE aplica `stock = stock + delta` e devolve o novo valor com
+        RETURNING, então ajustes simultâneos nunca se sobrescrevem. O
+        histórico é gravado na mesma transação (um único commit).
+        
+        Args:
+            product_id (int): ID do produto
+            delta (int): Variação do estoque (ex.: -1 numa venda, +10 numa entrada)
+            change_type (str): Tipo de alteração (manual, venda, etc.)
+            reason (str): Motivo da alteração
+            allow_negative (bool): Se False, recusa ajustes que deixariam o
+                estoque do local (não o total) negativo
+            location_id (int): Local do ajuste; None usa o local padrão
         
-        old_stock = product[4]  # stock está na posição 4
+        Returns:
+            tuple: (estoque total antigo, estoque total novo) ou None se o
+                produto não existir
         
-        # Atualiza o estoque
-        self.update(product_id, {'stock': new_stock})
+        Raises:
+            InsufficientStockError: Se allow_negative for False e faltar estoque
+            ValueError: Se o local não existir
+        """
+        if location_id is not None:
+            with self.db.transaction():
+                stock = self.stock_levels([product_id])
+                if product_id not in stock:
+                    return None
+                self._check_location(location_id)
+                located = self.location_levels(location_id, [product_id]).get(product_id, 0)
+                if located + delta < 0 and not allow_negative:
+                    raise InsufficientStockError(product_id, located, delta)
+                self._add_location_stock(location_id, [(product_id, delta)])
+                old_stock = stock[product_id]
+                self._record_history(
+                    product_id, old_stock, old_stock + delta, change_type, reason, location_id
+                )
+            self._invalidate([product_id])
+            return old_stock, old_stock + delta
         
-        # Registra no histórico
         query = '''
-            INSERT INTO stock_history 
-            (product_id, old_stock, new_stock, change_type, reason)
-            VALUES (?, ?, ?, ?, ?)
+            UPDATE products
+            SET stock = COALESCE(stock, 0) + ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
         '''
-        self.db.execute(query, (product_id, old_stock, new_stock, change_type, reason))
+        params = [delta, product_id]
+        if not allow_negative:
+            # A variação vai para o local padrão (trigger product_locations_sync):
+            # é o estoque dele, e não o total, que não pode ficar negativo
+            query += f'''
+                AND COALESCE((
+                    SELECT stock FROM product_locations
+                    WHERE product_id = products.id AND location_id = {DEFAULT_LOCATION_ID}
+                ), 0) + ? >= 0
+            '''
+            params.append(delta)
+        query += ' RETURNING stock'
         
-        return True
+        with self.db.transaction():
+            rows = self.db.fetch_all(query, params)
+            if not rows:
+                if not self.db.fetch_one('SELECT 1 FROM products WHERE id = ?', (product_id,)):
+                    return None
+                located = self.location_levels(DEFAULT_LOCATION_ID, [product_id]).get(product_id, 0)
+                raise InsufficientStockError(product_id, located, delta)
+            
+            new_stock = rows[0][0]
+            old_stock = new_stock - delta
+            self._record_history(product_id, old_stock, new_stock, change_type, reason)
+        
+        self._invalidate([product_id])
+        return old_stock, new_stock
     
-    def search(self, search_term):
+    def apply_movement(self, lines, change_type='movimentacao', reason='', movement_id=None,
+                       allow_negative=True, location_id=None):
         """
-        Busca produtos por nome, marca ou ID
+        Aplica uma movimentação com várias linhas (venda, recebimento...) de uma vez
+        
+        Todas as linhas são aplicadas em uma única transação: ou todas
+        entram, ou nenhuma. Estoques e histórico são gravados com
+        executemany e as linhas de histórico recebem o mesmo movement_id.
         
         Args:
-            search_term (str): Termo para busca (pode ser nome, marca ou ID)
+            lines (list): Tuplas (product_id, delta) ou (product_id, delta, motivo)
+            change_type (str): Tipo de alteração gravado em todas as linhas
+            reason (str): Motivo padrão para linhas sem motivo próprio
+            movement_id (str): Identificador da movimentação/documento; gerado se None
+            allow_negative (bool): Se False, recusa linhas que deixariam o
+                estoque do local (não o total) negativo
+            location_id (int): Local de todas as linhas; None usa o local padrão
         
         Returns:
-            list: Lista de produtos que correspondem à busca
+            str: Identificador da movimentação
+        
+        Raises:
+            ValueError: Se algum produto ou o local não existir
+            InsufficientStockError: Se allow_negative for False e faltar estoque
+        """
+        lines = [
+            (line[0], int(line[1]), line[2] if len(line) > 2 and line[2] else reason)
+            for line in lines
+        ]
+        # uuid só é importado aqui: pesa na partida dos comandos da CLI
+        import uuid
+        movement_id = movement_id or uuid.uuid4().hex
+        
+        with self.db.transaction():
+            # Com a escrita já reservada (BEGIN IMMEDIATE), os estoques lidos não mudam até o commit
+            product_ids = {product_id for product_id, _, _ in lines}
+            stock = self.stock_levels(product_ids)
+            # O limite de estoque negativo vale para o local (sem local, o padrão)
+            if location_id is not None:
+                self._check_location(location_id)
+            available = self.location_levels(location_id or DEFAULT_LOCATION_ID, product_ids)
+            
+            history = []
+            net_deltas = {}
+            for product_id, delta, line_reason in lines:
+                if product_id not in stock:
+                    raise ValueError(f"Produto {product_id} não encontrado")
+                old_stock = stock[product_id]
+                new_stock = old_stock + delta
+                old_available = available.get(product_id, 0)
+                if old_available + delta < 0 and not allow_negative:
+                    raise InsufficientStockError(product_id, old_available, delta)
+                stock[product_id] = new_stock
+                available[product_id] = old_available + delta
+                net_deltas[product_id] = net_deltas.get(product_id, 0) + delta
+                history.append((
+                    product_id, old_stock, new_stock, change_type, line_reason, movement_id,
+                    location_id or DEFAULT_LOCATION_ID, delta
+                ))
+            
+            if location_id is None:
+                self.db.executemany(
+                    '''
+                    UPDATE products
+                    SET stock = COALESCE(stock, 0) + ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                    ''',
+                    [(delta, product_id) for product_id, delta in net_deltas.items()]
+                )
+            else:
+                self._add_location_stock(location_id, net_deltas.items())
+            self._insert_history(history)
+        
+        self._invalidate(net_deltas)
+        return movement_id
+    
+    def stock_levels(self, product_ids):
+        """
+        Busca o estoque atual de vários produtos de uma vez
+        
+        Returns:
+            dict: {product_id: estoque} apenas dos produtos existentes
+        """
+        levels = {}
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), 900):
+            chunk = product_ids[start:start + 900]
+            placeholders = ', '.join('?' * len(chunk))
+            query = f'SELECT id, COALESCE(stock, 0) FROM products WHERE id IN ({placeholders})'
+            levels.update(self.db.fetch_all(query, chunk))
+        return levels
+    
+    def location_levels(self, location_id, product_ids):
+        """
+        Busca o estoque de vários produtos em um local
+        
+        Returns:
+            dict: {product_id: estoque no local} dos produtos com registro no local
+        """
+        levels = {}
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), 900):
+            chunk = product_ids[start:start + 900]
+            placeholders = ', '.join('?' * len(chunk))
+            query = f'''
+                SELECT product_id, stock FROM product_locations
+                WHERE location_id = ? AND product_id IN ({placeholders})
+            '''
+            levels.update(self.db.fetch_all(query, [location_id] + chunk))
+        return levels
+    
+    def transfer_stock(self, lines, from_location_id, to_location_id, reason='', movement_id=None,
+                       allow_negative=False):
+        """
+        Transfere estoque de um local para outro, de forma atômica
+        
+        Todas as linhas entram em uma única transação. O total de cada
+        produto não muda; o histórico recebe duas linhas por produto (saída
+        da origem e entrada no destino, com o location_id de cada uma) com
+        o mesmo movement_id e tipo 'transferencia'. old_stock e new_stock
+        dessas linhas são o total (igual nas duas); a quantidade transferida
+        fica em quantity, negativa na origem e positiva no destino.
+        
+        Args:
+            lines (list): Tuplas (product_id, quantidade) com quantidade > 0
+            from_location_id (int): Local de origem
+            to_location_id (int): Local de destino
+            reason (str): Motivo; padrão descreve a quantidade e os locais
+            movement_id (str): Identificador da transferência; gerado se None
+            allow_negative (bool): Se False, recusa linhas sem estoque suficiente na origem
+        
+        Returns:
+            str: Identificador da transferência
+        
+        Raises:
+            ValueError: Se um produto ou local não existir, os locais forem
+                iguais ou alguma quantidade não for positiva
+            InsufficientStockError: Se faltar estoque na origem
+        """
+        if from_location_id == to_location_id:
+            raise ValueError("Origem e destino da transferência são o mesmo local")
+        quantities = {}
+        for product_id, quantity in lines:
+            if int(quantity) <= 0:
+                raise ValueError(f"Quantidade inválida para o produto {product_id}: {quantity}")
+            quantities[product_id] = quantities.get(product_id, 0) + int(quantity)
+        import uuid
+        movement_id = movement_id or uuid.uuid4().hex
+        
+        with self.db.transaction():
+            source = self._check_location(from_location_id)
+            target = self._check_location(to_location_id)
+            stock = self.stock_levels(quantities)
+            available = self.location_levels(from_location_id, quantities)
+            
+            history = []
+            for product_id, quantity in quantities.items():
+                if product_id not in stock:
+                    raise ValueError(f"Produto {product_id} não encontrado")
+                if available.get(product_id, 0) < quantity and not allow_negative:
+                    raise InsufficientStockError(product_id, available.get(product_id, 0), -quantity)
+                line_reason = reason or f"{quantity} un. de {source.name} para {target.name}"
+                total = stock[product_id]
+                for location_id, moved in ((from_location_id, -quantity), (to_location_id, quantity)):
+                    history.append((
+                        product_id, total, total, 'transferencia', line_reason, movement_id,
+                        location_id, moved
+                    ))
+            
+            self._add_location_stock(
+                from_location_id, [(product_id, -quantity) for product_id, quantity in quantities.items()]
+            )
+            self._add_location_stock(to_location_id, quantities.items())
+            self._insert_history(history)
+        
+        return movement_id
+    
+    def _check_location(self, location_id):
+        """Devolve o Location ou lança ValueError se o local não existir"""
+        location = self.db.fetch_one(
+            'SELECT * FROM locations WHERE id = ?', (location_id,), Location
+        )
+        if location is None:
+            raise ValueError(f"Local {location_id} não encontrado")
+        return location
+    
+    def _add_location_stock(self, location_id, deltas):
+        """Soma as variações (product_id, delta) ao estoque do local; o total vem por trigger"""
+        self.db.executemany(
+            '''
+            INSERT INTO product_locations (product_id, location_id, stock) VALUES (?, ?, ?)
+            ON CONFLICT (product_id, location_id) DO UPDATE SET stock = stock + excluded.stock
+            ''',
+            [(product_id, location_id, delta) for product_id, delta in deltas]
+        )
+    
+    def _insert_history(self, history):
         """
+        Grava várias linhas no histórico
+        
+        Cada linha é (product_id, old, new, tipo, motivo, movement_id,
+        local, quantidade no local).
+        """
+        self.db.executemany(
+            '''
+            INSERT INTO stock_history
+            (product_id, old_stock, new_stock, change_type, reason, movement_id, location_id, quantity)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            history
+        )
+    
+    def _record_history(self, product_id, old_stock, new_stock, change_type, reason,
+                        location_id=DEFAULT_LOCATION_ID):
+        """Grava uma movimentação no histórico (sem commit próprio dentro de transações)"""
         query = '''
-            SELECT * FROM products 
-            WHERE name LIKE ? OR brand LIKE ? OR id = ?
-            ORDER BY name
+            INSERT INTO stock_history 
+            (product_id, old_stock, new_stock, change_type, reason, location_id, quantity)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         '''
-        try:
-            # Tenta converter para número (busca por ID)
-            search_id = int(search_term)
-        except ValueError:
-            search_id = -1  # Se não for número, busca apenas por texto
+        self.db.execute(query, (
+            product_id, old_stock, new_stock, change_type, reason, location_id,
+            (new_stock or 0) - (old_stock or 0)
+        ))
+    
+    def search(self, search_term, limit=50):
+        """
+        Busca produtos por nome, marca, descrição ou ID
+        
+        Usa o índice de texto completo (products_fts), com os resultados
+        ordenados por relevância. Um termo numérico retorna primeiro o
+        produto com aquele ID.
+        
+        Args:
+            search_term (str): Termo para busca (pode ser nome, marca ou ID)
+            limit (int): Quantidade máxima de resultados
+        
+        Returns:
+            list: Lista de produtos que correspondem à busca
+        """
+        return self.search_page(search_term, limit=limit).rows
+    
+    def search_page(self, search_term, after=None, limit=PAGE_SIZE):
+        """
+        Busca paginada (keyset) de produtos por nome, marca, descrição ou ID
+        
+        Args:
+            search_term (str): Termo para busca (pode ser nome, marca ou ID)
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de produtos por página
+        
+        Returns:
+            Page: Produtos da página e cursor da próxima (None se acabou)
+        """
+        search_term = search_term.strip()
+        
+        # O cache guarda só os IDs: os dados (e o estoque) vêm do cache por ID,
+        # então ajustes de estoque não precisam descartar as buscas
+        key = (search_term, after, limit)
+        generation = self.cache.generation
+        search_generation = self.search_cache.generation
+        cached = self.search_cache.get(key)
+        if cached is not MISSING:
+            product_ids, next_cursor = cached
+            return Page(self.get_by_ids(product_ids), next_cursor)
+        
+        page = self._search_page(search_term, after, limit)
+        for product in page.rows:
+            self.cache.set(product.id, product, generation)
+        self.search_cache.set(
+            key, ([product.id for product in page.rows], page.next_cursor), search_generation
+        )
+        return page
+    
+    def suggest_page(self, search_term, after=None, limit=PAGE_SIZE):
+        """
+        Busca paginada para digitação: índice em memória, com tolerância a erros
+
+        Nomes e marcas vêm do SearchIndex (search_index.py), que aceita
+        palavras incompletas e com erro de digitação sem consultar o banco.
+        Um termo numérico mostra primeiro o produto com aquele ID. Se o
+        índice não achar nada (ex.: termo só da descrição), cai na busca de
+        texto completo de search_page.
+
+        Args:
+            search_term (str): Termo digitado (nome, marca ou ID)
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de produtos por página
+
+        Returns:
+            Page: Produtos da página e cursor da próxima (None se acabou)
+        """
+        from search_index import get_search_index
+
+        search_term = search_term.strip()
+        if after is not None and after[0] != 'indice':
+            return self.search_page(search_term, after, limit)
+
+        offset = after[1] if after else 0
+        product_ids = get_search_index(self.db).search(search_term, offset + limit + 1)
+        # Um número só vira o primeiro resultado se for o ID de um produto existente
+        if search_term.isdigit() and self.get_by_id(int(search_term)) is not None:
+            exact_id = int(search_term)
+            product_ids = [exact_id] + [product_id for product_id in product_ids if product_id != exact_id]
+        rows = self.get_by_ids(product_ids[offset:offset + limit])
+        if not rows and offset == 0:
+            return self.search_page(search_term, None, limit)
+        next_cursor = ('indice', offset + limit) if len(product_ids) > offset + limit else None
+        return Page(rows, next_cursor)
+
+    def _search_page(self, search_term, after, limit):
+        """Executa a busca paginada no banco (sem cache)"""
+        rows = []
+        exact_id = int(search_term) if search_term.isdigit() else -1
+        
+        # O produto com o ID digitado aparece só no início da primeira página
+        if after is None and exact_id > 0:
+            product = self.get_by_id(exact_id)
+            if product:
+                rows.append(product)
+        
+        # O tokenizador de trigramas precisa de pelo menos 3 caracteres
+        if self.db.has_fts and len(search_term) >= 3:
+            # Ordena por (relevância, id); o cursor guarda os dois valores
+            query = '''
+                SELECT p.*, hits.score FROM (
+                    SELECT rowid, bm25(products_fts, 10.0, 5.0, 1.0) AS score
+                    FROM products_fts WHERE products_fts MATCH ?
+                ) AS hits
+                JOIN products p ON p.id = hits.rowid
+                WHERE p.id != ? AND (hits.score, p.id) > (?, ?)
+                ORDER BY hits.score, p.id
+                LIMIT ?
+            '''
+            start = (float('-inf'), 0)
+            params = ['"' + search_term.replace('"', '""') + '"', exact_id]
+            cursor_of = lambda row: (row[-1], row[0])
+        else:
+            query = '''
+                SELECT p.*, NULL FROM products p
+                WHERE (name LIKE ? OR brand LIKE ?) AND id != ? AND (name, id) > (?, ?)
+                ORDER BY name, id
+                LIMIT ?
+            '''
+            start = ('', 0)
+            search_pattern = f'%{search_term}%'
+            params = [search_pattern, search_pattern, exact_id]
+            cursor_of = lambda row: (row[1], row[0])
         
-        search_pattern = f'%{search_term}%'
-        return self.db.fetch_all(query, (search_pattern, search_pattern, search_id))
+        remaining = limit - len(rows)
+        found = self.db.fetch_all(query, params + list(after or start) + [remaining + 1])
+        
+        next_cursor = None
+        if len(found) > remaining:
+            found = found[:remaining]
+            next_cursor = cursor_of(found[-1]) if found else start
+        
+        # A coluna auxiliar de relevância fica de fora do Product
+        rows.extend(Product(*row[:-1]) for row in found)
+        return Page(rows, next_cursor)
     
-    def get_low_stock(self, threshold=10):
+    def get_low_stock(self, threshold=LOW_STOCK_THRESHOLD):
         """
         Busca produtos com estoque baixo
         
@@ -157,27 +944,203 @@ class ProductModel:
             threshold (int): Limite para considerar estoque baixo
         
         Returns:
-            list: Produtos com estoque <= threshold
+            list: Produtos (Product) com estoque <= threshold
         """
         query = 'SELECT * FROM products WHERE stock <= ? ORDER BY stock ASC'
-        return self.db.fetch_all(query, (threshold,))
+        return self.db.fetch_all(query, (threshold,), Product)
     
     def get_out_of_stock(self):
         """
         Busca produtos sem estoque
         
         Returns:
-            list: Produtos com estoque zero
+            list: Produtos (Product) com estoque zero
         """
         query = 'SELECT * FROM products WHERE stock = 0 ORDER BY name'
-        return self.db.fetch_all(query)
+        return self.db.fetch_all(query, row_type=Product)
+    
+    def get_all_page(self, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página de produtos, dos atualizados mais recentemente
+        
+        Paginação por cursor (keyset): cada página continua a partir do
+        último produto da anterior usando o índice de updated_at, sem OFFSET.
+        
+        Args:
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de produtos por página
+        
+        Returns:
+            Page: Produtos da página e cursor da próxima (None se acabou)
+        """
+        query = 'SELECT * FROM products'
+        params = []
+        if after:
+            query += ' WHERE (updated_at, id) < (?, ?)'
+            params.extend(after)
+        query += ' ORDER BY updated_at DESC, id DESC LIMIT ?'
+        return _fetch_page(self.db, query, params, limit, lambda row: (row.updated_at, row.id))
+    
+    def get_low_stock_page(self, threshold=LOW_STOCK_THRESHOLD, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página de produtos com estoque baixo (menor estoque primeiro)
+        
+        Args:
+            threshold (int): Limite para considerar estoque baixo
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de produtos por página
+        
+        Returns:
+            Page: Produtos da página e cursor da próxima (None se acabou)
+        """
+        query = 'SELECT * FROM products WHERE stock <= ?'
+        params = [threshold]
+        if after:
+            query += ' AND (stock, name, id) > (?, ?, ?)'
+            params.extend(after)
+        # Mesma ordem do índice (stock, name): a página sai direto do índice
+        query += ' ORDER BY stock, name, id LIMIT ?'
+        return _fetch_page(self.db, query, params, limit, lambda row: (row.stock, row.name, row.id))
+    
+    def get_out_of_stock_page(self, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página de produtos sem estoque, em ordem de nome
+        
+        Args:
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de produtos por página
+        
+        Returns:
+            Page: Produtos da página e cursor da próxima (None se acabou)
+        """
+        query = 'SELECT * FROM products WHERE stock = 0'
+        params = []
+        if after:
+            query += ' AND (name, id) > (?, ?)'
+            params.extend(after)
+        query += ' ORDER BY name, id LIMIT ?'
+        return _fetch_page(self.db, query, params, limit, lambda row: (row.name, row.id))
+    
+    def get_alerts(self):
+        """
+        Busca os produtos com alerta de reposição aberto (estoque <= mínimo)
+        
+        Returns:
+            list: Produtos (Product), do menor estoque para o maior
+        """
+        query = '''
+            SELECT p.* FROM stock_alerts a CROSS JOIN products p ON p.id = a.product_id
+            ORDER BY p.stock, p.name, p.id
+        '''
+        return self.db.fetch_all(query, row_type=Product)
+    
+    def get_alerts_page(self, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página dos produtos com alerta de reposição aberto
+        
+        Lê a tabela stock_alerts, mantida por triggers, em vez de percorrer
+        o catálogo: o custo depende só da quantidade de alertas.
+        
+        Args:
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de produtos por página
+        
+        Returns:
+            Page: Produtos da página e cursor da próxima (None se acabou)
+        """
+        # CROSS JOIN fixa stock_alerts como tabela externa (o SQLite não
+        # reordena), para o planejador não trocar por uma varredura de products
+        query = '''
+            SELECT p.* FROM stock_alerts a CROSS JOIN products p ON p.id = a.product_id
+        '''
+        params = []
+        if after:
+            query += ' WHERE (p.stock, p.name, p.id) > (?, ?, ?)'
+            params.extend(after)
+        query += ' ORDER BY p.stock, p.name, p.id LIMIT ?'
+        return _fetch_page(self.db, query, params, limit, lambda row: (row.stock, row.name, row.id))
+    
+    def get_alert_changes(self, after=0, limit=500):
+        """
+        Busca os alertas abertos, resolvidos ou removidos depois de um cursor
+        
+        Para rotinas de notificação: guarde o `seq` do último evento
+        recebido e passe-o na próxima chamada.
+        
+        Args:
+            after (int): Último seq já processado (0 = desde o início)
+            limit (int): Quantidade máxima de eventos
+        
+        Returns:
+            list: Eventos (AlertEvent) em ordem de seq
+        """
+        query = '''
+            SELECT e.seq, e.product_id, e.event, e.stock, e.min_stock, e.created_at,
+                   p.name AS product_name
+            FROM alert_events e
+            LEFT JOIN products p ON p.id = e.product_id
+            WHERE e.seq > ?
+            ORDER BY e.seq
+            LIMIT ?
+        '''
+        return self.db.fetch_all(query, (after, limit), AlertEvent)
+    
+    def get_stats(self, low_stock_threshold=None):
+        """
+        Busca os números do painel: produtos, unidades, valor e alertas
+        
+        Com o limite padrão os valores vêm da tabela inventory_summary,
+        mantida por triggers (leitura de uma única linha). Com outro
+        limite, uma única consulta agregada calcula tudo.
+        
+        Args:
+            low_stock_threshold (int): Limite de estoque baixo; None usa o padrão
+        
+        Returns:
+            dict: total_products, total_units, total_value, low_stock,
+                out_of_stock e alerts (produtos abaixo do próprio mínimo)
+        """
+        summary = self.db.fetch_one('''
+            SELECT product_count, total_units, total_value, low_stock_count,
+                   out_of_stock_count, low_stock_threshold, alert_count
+            FROM inventory_summary WHERE id = 1
+        ''')
+        
+        if summary is None or low_stock_threshold not in (None, summary[5]):
+            query = '''
+                SELECT
+                    COUNT(*),
+                    COALESCE(SUM(stock), 0),
+                    COALESCE(SUM(COALESCE(stock, 0) * COALESCE(price, 0)), 0),
+                    COALESCE(SUM(stock <= ?), 0),
+                    COALESCE(SUM(stock = 0), 0),
+                    NULL,
+                    COALESCE(SUM(stock <= min_stock), 0)
+                FROM products
+            '''
+            threshold = LOW_STOCK_THRESHOLD if low_stock_threshold is None else low_stock_threshold
+            summary = self.db.fetch_one(query, (threshold,))
+        
+        return {
+            'total_products': summary[0],
+            'total_units': summary[1],
+            'total_value': summary[2],
+            'low_stock': summary[3],
+            'out_of_stock': summary[4],
+            'alerts': summary[6],
+        }
 
 class StockHistoryModel:
     """Classe responsável por operações relacionadas ao histórico de estoque"""
     
-    def __init__(self):
-        """Inicializa o modelo de histórico com conexão ao banco"""
-        self.db = Database()
+    def __init__(self, db=None):
+        """
+        Inicializa o modelo de histórico com conexão ao banco
+        
+        Args:
+            db (Database): Banco a usar; padrão é a instância compartilhada
+        """
+        self.db = db or get_database()
     
     def get_by_product(self, product_id, limit=50):
         """
@@ -188,17 +1151,277 @@ class StockHistoryModel:
             limit (int): Limite de registros a retornar
         
         Returns:
-            list: Histórico de movimentações do produto
+            list: Histórico de movimentações (StockMovement) do produto
         """
-        query = '''
-            SELECT sh.*, p.name 
-            FROM stock_history sh 
-            JOIN products p ON sh.product_id = p.id 
-            WHERE sh.product_id = ? 
-            ORDER BY sh.created_at DESC 
-            LIMIT ?
+        query, params = _history_query(self.db, 'WHERE sh.product_id = ?', (product_id,))
+        return self.db.fetch_all(query + ' LIMIT ?', params + [limit], StockMovement)
+    
+    def iter_range(self, start=None, end=None, chunk_size=500):
+        """
+        Percorre o histórico de estoque sem carregá-lo inteiro na memória
+        
+        Se o intervalo alcançar datas já arquivadas, as movimentações do
+        banco de arquivo são incluídas na mesma sequência.
+        
+        Args:
+            start (str): Data/hora mínima da movimentação (inclusiva)
+            end (str): Data/hora máxima da movimentação (exclusiva)
+            chunk_size (int): Quantidade de registros lidos por vez
+        
+        Yields:
+            tuple: Dados de cada movimentação, em ordem de ID
+        """
+        selects = []
+        params = []
+        for table in _history_tables(self.db, start):
+            query, table_params = _date_range_query(
+                f'SELECT {HISTORY_RAW_COLUMNS} FROM {table}', 'created_at', start, end
+            )
+            selects.append(query)
+            params.extend(table_params)
+        return self.db.iter_all(' UNION ALL '.join(selects) + ' ORDER BY id', params, chunk_size)
+    
+    def get_daily(self, product_id, start=None, end=None):
+        """
+        Resumo diário das movimentações de um produto
+        
+        Dias já arquivados vêm de stock_history_daily; os demais são
+        calculados na hora a partir de stock_history.
+        
+        Args:
+            product_id (int): ID do produto
+            start (str): Dia inicial 'AAAA-MM-DD' (inclusivo)
+            end (str): Dia final 'AAAA-MM-DD' (exclusivo)
+        
+        Returns:
+            list: (day, movements, units_in, units_out, opening_stock,
+                closing_stock) em ordem de dia
+        """
+        live = '''
+            SELECT day, COUNT(*), SUM(MAX(change, 0)), SUM(MAX(-change, 0)),
+                   MIN(opening_stock), MIN(closing_stock)
+            FROM (
+                SELECT date(created_at) AS day,
+                       COALESCE(new_stock, 0) - COALESCE(old_stock, 0) AS change,
+                       FIRST_VALUE(old_stock) OVER (
+                           PARTITION BY date(created_at) ORDER BY created_at, id
+                       ) AS opening_stock,
+                       FIRST_VALUE(new_stock) OVER (
+                           PARTITION BY date(created_at) ORDER BY created_at DESC, id DESC
+                       ) AS closing_stock
+                FROM main.stock_history
+                WHERE product_id = ?
+            )
+            GROUP BY day
+        '''
+        rolled = '''
+            SELECT day, movements, units_in, units_out, opening_stock, closing_stock
+            FROM stock_history_daily
+            WHERE product_id = ?
+        '''
+        query, params = _date_range_query(
+            f'SELECT * FROM ({rolled} UNION ALL {live})', 'day', start, end
+        )
+        return self.db.fetch_all(query + ' ORDER BY day', [product_id, product_id] + params)
+    
+    def nearest_checkpoint(self, timestamp):
+        """
+        Checkpoint de estoque mais recente até o instante informado
+        
+        Returns:
+            tuple: (id, taken_at) ou None se não houver nenhum
+        """
+        return self.db.fetch_one('''
+            SELECT id, taken_at FROM stock_checkpoints
+            WHERE taken_at <= ? ORDER BY taken_at DESC LIMIT 1
+        ''', (timestamp,))
+    
+    def _as_of_query(self, timestamp, product_id=None):
+        """
+        Monta a consulta do estoque de cada produto em um instante
+        
+        Parte do checkpoint mais próximo anterior ao instante: o estoque
+        é o new_stock da última movimentação entre o checkpoint e o
+        instante ou, se não houver, o do checkpoint. Produtos fora do
+        checkpoint (criados depois dele) são resolvidos pelo índice de
+        histórico do próprio produto, no histórico principal e no
+        arquivado. Como vale a última movimentação, e
+        não uma soma, movimentações no mesmo segundo do checkpoint podem
+        entrar na janela sem contar duas vezes.
+        
+        Returns:
+            tuple: (query, params) com colunas product_id, stock e price
+        """
+        checkpoint_id, taken_at = self.nearest_checkpoint(timestamp) or (None, None)
+        product_filter = ' AND product_id = ?' if product_id is not None else ''
+        
+        windows = []
+        window_params = []
+        for table in _history_tables(self.db, taken_at):
+            windows.append(f'''
+                SELECT id, product_id, new_stock, created_at FROM {table}
+                WHERE created_at >= ? AND created_at <= ?{product_filter}
+            ''')
+            window_params.extend([taken_at or '', timestamp])
+            if product_id is not None:
+                window_params.append(product_id)
+        
+        # Sem movimentação na janela: a última até o instante ou, se não
+        # houver, o estoque anterior à primeira depois dele (em qualquer tabela)
+        def fallback(column, condition, order, tables):
+            selects = ' UNION ALL '.join(
+                f'SELECT {column}, created_at, id FROM {table} '
+                f'WHERE product_id = k.product_id AND created_at {condition} ?'
+                for table in tables
+            )
+            return f'(SELECT {column} FROM ({selects}) ORDER BY {order} LIMIT 1)'
+        
+        before_tables = _history_tables(self.db)
+        after_tables = _history_tables(self.db, timestamp)
+        
+        query = f'''
+            WITH moves AS (
+                SELECT product_id, new_stock FROM (
+                    SELECT product_id, new_stock, ROW_NUMBER() OVER (
+                        PARTITION BY product_id ORDER BY created_at DESC, id DESC
+                    ) AS position
+                    FROM ({' UNION ALL '.join(windows)})
+                )
+                WHERE position = 1
+            ),
+            known AS (
+                SELECT id AS product_id FROM products
+                WHERE created_at <= ?{product_filter.replace('product_id', 'id')}
+                UNION
+                SELECT product_id FROM stock_checkpoint_items
+                WHERE checkpoint_id = ?{product_filter}
+            )
+            SELECT k.product_id,
+                   COALESCE(
+                       m.new_stock,
+                       ci.stock,
+                       {fallback('new_stock', '<=', 'created_at DESC, id DESC', before_tables)},
+                       {fallback('old_stock', '>', 'created_at, id', after_tables)},
+                       p.stock
+                   ) AS stock,
+                   COALESCE(ci.price, p.price) AS price
+            FROM known k
+            LEFT JOIN moves m ON m.product_id = k.product_id
+            LEFT JOIN stock_checkpoint_items ci
+                ON ci.checkpoint_id = ? AND ci.product_id = k.product_id
+            LEFT JOIN products p ON p.id = k.product_id
         '''
-        return self.db.fetch_all(query, (product_id, limit))
+        params = window_params + [timestamp]
+        if product_id is not None:
+            params.append(product_id)
+        params.append(checkpoint_id)
+        if product_id is not None:
+            params.append(product_id)
+        params.extend([timestamp] * (len(before_tables) + len(after_tables)))
+        params.append(checkpoint_id)
+        return query, params
+    
+    def as_of(self, timestamp, product_id=None):
+        """
+        Estoque em um instante passado, para um produto ou o catálogo todo
+        
+        Usa o checkpoint mais próximo anterior ao instante (ver
+        checkpoints.py) e só repassa as movimentações desde ele.
+        
+        Args:
+            timestamp (str): Instante 'AAAA-MM-DD HH:MM:SS' (inclusivo)
+            product_id (int): Produto; None para todos
+        
+        Returns:
+            int | list: Estoque do produto (None se ainda não existia) ou,
+                sem product_id, lista de (product_id, stock, price) por ID
+        """
+        query, params = self._as_of_query(timestamp, product_id)
+        if product_id is not None:
+            row = self.db.fetch_one(query, params)
+            return row[1] if row else None
+        return self.db.fetch_all(query + ' ORDER BY k.product_id', params)
+    
+    def valuation_as_of(self, timestamp):
+        """
+        Valor do inventário em um instante passado
+        
+        O preço usado é o do checkpoint de referência (ou o atual, para
+        produtos criados depois dele).
+        
+        Args:
+            timestamp (str): Instante 'AAAA-MM-DD HH:MM:SS' (inclusivo)
+        
+        Returns:
+            dict: total_products, total_units e total_value
+        """
+        query, params = self._as_of_query(timestamp)
+        row = self.db.fetch_one(f'''
+            SELECT COUNT(*), COALESCE(SUM(stock), 0),
+                   COALESCE(SUM(COALESCE(stock, 0) * COALESCE(price, 0)), 0)
+            FROM ({query})
+        ''', params)
+        return {
+            'total_products': row[0],
+            'total_units': row[1],
+            'total_value': row[2],
+        }
+    
+    def get_by_movement(self, movement_id):
+        """
+        Busca todas as linhas de uma movimentação
+        
+        Args:
+            movement_id (str): Identificador da movimentação/documento
+        
+        Returns:
+            list: Linhas da movimentação (StockMovement), na ordem em que foram aplicadas
+        """
+        query, params = _history_query(self.db, 'WHERE sh.movement_id = ?', (movement_id,), order='id')
+        return self.db.fetch_all(query, params, StockMovement)
+    
+    def get_by_product_page(self, product_id, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página do histórico de um produto (mais recentes primeiro)
+        
+        Args:
+            product_id (int): ID do produto
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de registros por página
+        
+        Returns:
+            Page: Movimentações da página e cursor da próxima (None se acabou)
+        """
+        where = 'WHERE sh.product_id = ?'
+        params = [product_id]
+        if after:
+            where += ' AND (sh.created_at, sh.id) < (?, ?)'
+            params.extend(after)
+        query, params = _history_query(self.db, where, params)
+        return _fetch_page(
+            self.db, query + ' LIMIT ?', params, limit, lambda row: (row.created_at, row.id), StockMovement
+        )
+    
+    def get_recent_page(self, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página do histórico de todos os produtos (mais recentes primeiro)
+        
+        Args:
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de registros por página
+        
+        Returns:
+            Page: Movimentações da página e cursor da próxima (None se acabou)
+        """
+        where = ''
+        params = []
+        if after:
+            where = 'WHERE (sh.created_at, sh.id) < (?, ?)'
+            params.extend(after)
+        query, params = _history_query(self.db, where, params)
+        return _fetch_page(
+            self.db, query + ' LIMIT ?', params, limit, lambda row: (row.created_at, row.id), StockMovement
+        )
     
     def get_recent(self, limit=50):
         """
@@ -208,13 +1431,308 @@ class StockHistoryModel:
             limit (int): Limite de registros a retornar
         
         Returns:
-            list: Histórico recente de movimentações
+            list: Histórico recente de movimentações (StockMovement)
+        """
+        query, params = _history_query(self.db)
+        return self.db.fetch_all(query + ' LIMIT ?', params + [limit], StockMovement)
+
+class LocationModel:
+    """Classe responsável pelos locais de estoque (lojas, depósito) e o estoque de cada um"""
+    
+    def __init__(self, db=None):
+        """
+        Inicializa o modelo de locais com conexão ao banco
+        
+        Args:
+            db (Database): Banco a usar; padrão é a instância compartilhada
+        """
+        self.db = db or get_database()
+    
+    def create(self, name):
+        """
+        Cadastra um novo local
+        
+        Args:
+            name (str): Nome do local (único)
+        
+        Returns:
+            int: ID do local criado
+        """
+        return self.db.execute('INSERT INTO locations (name) VALUES (?)', (name.strip(),)).lastrowid
+    
+    def get_all(self):
+        """
+        Busca todos os locais
+        
+        Returns:
+            list: Locais (Location) em ordem de ID; o primeiro é o padrão
+        """
+        return self.db.fetch_all('SELECT * FROM locations ORDER BY id', row_type=Location)
+    
+    def find(self, value):
+        """
+        Busca um local pelo ID ou pelo nome
+        
+        Args:
+            value (str|int): ID ou nome do local
+        
+        Returns:
+            Location: Local encontrado ou None
+        """
+        value = str(value).strip()
+        if value.isdigit():
+            return self.db.fetch_one('SELECT * FROM locations WHERE id = ?', (int(value),), Location)
+        return self.db.fetch_one(
+            'SELECT * FROM locations WHERE name = ? COLLATE NOCASE', (value,), Location
+        )
+    
+    def product_stock(self, product_id):
+        """
+        Busca o estoque de um produto em cada local
+        
+        Args:
+            product_id (int): ID do produto
+        
+        Returns:
+            list: LocationStock de cada local com registro do produto, em ordem de local
+        """
+        query = '''
+            SELECT pl.product_id, pl.location_id, pl.stock, p.name AS product_name,
+                   l.name AS location_name
+            FROM product_locations pl
+            JOIN products p ON p.id = pl.product_id
+            JOIN locations l ON l.id = pl.location_id
+            WHERE pl.product_id = ?
+            ORDER BY pl.location_id
+        '''
+        return self.db.fetch_all(query, (product_id,), LocationStock)
+    
+    def get_stock_page(self, location_id, after=None, limit=PAGE_SIZE):
+        """
+        Busca uma página dos produtos com estoque em um local, em ordem de ID
+        
+        Percorre o índice de product_locations por local, sem ler os
+        outros locais.
+        
+        Args:
+            location_id (int): ID do local
+            after (tuple): Cursor devolvido pela página anterior (None = início)
+            limit (int): Quantidade de registros por página
+        
+        Returns:
+            Page: LocationStock da página e cursor da próxima (None se acabou)
+        """
+        query = '''
+            SELECT pl.product_id, pl.location_id, pl.stock, p.name AS product_name,
+                   l.name AS location_name
+            FROM product_locations pl
+            JOIN products p ON p.id = pl.product_id
+            JOIN locations l ON l.id = pl.location_id
+            WHERE pl.location_id = ? AND pl.stock <> 0
+        '''
+        params = [location_id]
+        if after:
+            query += ' AND pl.product_id > ?'
+            params.extend(after)
+        query += ' ORDER BY pl.product_id LIMIT ?'
+        return _fetch_page(
+            self.db, query, params, limit, lambda row: (row.product_id,), LocationStock
+        )
+
+
+class ChangeLogModel:
+    """Classe responsável pelo registro de alterações (change_log) lido pelas sincronizações"""
+    
+    def __init__(self, db=None):
+        """
+        Inicializa o modelo do registro de alterações com conexão ao banco
+        
+        Args:
+            db (Database): Banco a usar; padrão é a instância compartilhada
+        """
+        self.db = db or get_database()
+    
+    def get_changes(self, after=0, limit=500, entity=None):
+        """
+        Busca as alterações registradas depois de um cursor
+        
+        Guarde o `seq` da última alteração recebida e passe-o na próxima
+        chamada; o custo é proporcional ao que mudou, não ao catálogo.
+        Antes de usar um seq antigo, confira expired().
+        
+        Args:
+            after (int): Último seq já processado (0 = desde o início)
+            limit (int): Quantidade máxima de alterações
+            entity (str): Só 'produto' ou só 'movimentacao' (None = todas)
+        
+        Returns:
+            list: Alterações (ChangeEvent) em ordem de seq
+        """
+        query = 'SELECT * FROM change_log WHERE seq > ?'
+        params = [after]
+        if entity:
+            query += ' AND entity = ?'
+            params.append(entity)
+        query += ' ORDER BY seq LIMIT ?'
+        return self.db.fetch_all(query, params + [limit], ChangeEvent)
+    
+    def get_changed_products(self, products, after=0, limit=500):
+        """
+        Busca o estado atual dos produtos alterados depois de um cursor
+        
+        Várias alterações do mesmo produto viram uma só linha; produtos que
+        não existem mais vêm em deleted_ids.
+        
+        Args:
+            products (ProductModel): Modelo usado para ler os produtos (e seu cache)
+            after (int): Último seq já processado
+            limit (int): Quantidade máxima de alterações lidas do registro
+        
+        Returns:
+            ProductChanges: Produtos atuais, IDs excluídos e o seq a passar na
+                próxima chamada (o próprio `after` se nada mudou)
+        """
+        changes = self.get_changes(after, limit, 'produto')
+        product_ids = list(dict.fromkeys(change.entity_id for change in changes))
+        current = products.get_by_ids(product_ids)
+        found = {product.id for product in current}
+        return ProductChanges(
+            current,
+            [product_id for product_id in product_ids if product_id not in found],
+            changes[-1].seq if changes else after
+        )
+    
+    def bounds(self):
+        """
+        Retorna o menor e o maior seq ainda no registro
+        
+        Returns:
+            tuple: (primeiro seq, último seq), ou (None, None) se vazio
+        """
+        return self.db.fetch_one('SELECT MIN(seq), MAX(seq) FROM change_log')
+    
+    def expired(self, after):
+        """
+        Indica se já foram descartadas alterações posteriores a `after`
+        
+        Nesse caso o consumidor perdeu alterações e precisa refazer a
+        carga completa (purge() sempre mantém a última linha, então o
+        primeiro seq restante mostra até onde o registro foi limpo).
+        
+        Args:
+            after (int): Último seq processado pelo consumidor
+        
+        Returns:
+            bool: True se há lacuna entre `after` e o registro atual
+        """
+        first, _ = self.bounds()
+        return first is not None and after < first - 1
+    
+    def purge(self, keep_days=CHANGE_LOG_KEEP_DAYS):
+        """
+        Remove as alterações mais antigas que `keep_days` dias
+        
+        Os seqs crescem com o tempo, então basta achar o primeiro seq que
+        fica e apagar os anteriores (a busca para no primeiro registro
+        recente, sem índice em created_at). A última alteração nunca é
+        apagada, para expired() saber até onde o registro foi limpo.
+        
+        Args:
+            keep_days (int): Dias de alterações mantidos
+        
+        Returns:
+            int: Quantidade de alterações removidas
+        """
+        with self.db.transaction():
+            keep = self.db.fetch_one(
+                "SELECT seq FROM change_log WHERE created_at >= datetime('now', ?) ORDER BY seq LIMIT 1",
+                (f'-{int(keep_days)} days',)
+            )
+            if keep is None:
+                keep = self.db.fetch_one('SELECT MAX(seq) FROM change_log')
+            if keep is None or keep[0] is None:
+                return 0
+            return self.db.execute('DELETE FROM change_log WHERE seq < ?', (keep[0],)).rowcount
+
+
+class ReportModel:
+    """Classe responsável pelos relatórios gerenciais (valor por marca, faixas de estoque)"""
+    
+    # Ordenações aceitas pelo relatório por marca
+    BRAND_ORDER = {
+        'value': 'total_value DESC',
+        'units': 'total_units DESC',
+        'products': 'product_count DESC',
+        'brand': 'brand',
+    }
+    
+    def __init__(self, db=None):
+        """
+        Inicializa o modelo de relatórios com conexão ao banco
+        
+        Args:
+            db (Database): Banco a usar; padrão é a instância compartilhada
+        """
+        self.db = db or get_database()
+    
+    def by_brand(self, order_by='value', limit=None):
+        """
+        Busca produtos, unidades e valor em estoque de cada marca
+        
+        Lê brand_summary, mantida por triggers: uma linha por marca, sem
+        percorrer os produtos.
+        
+        Args:
+            order_by (str): 'value', 'units', 'products' ou 'brand'
+            limit (int): Quantidade máxima de marcas (None = todas)
+        
+        Returns:
+            list: BrandSummary de cada marca ('' = sem marca)
+        """
+        query = f'SELECT * FROM brand_summary ORDER BY {self.BRAND_ORDER[order_by]}, brand'
+        params = []
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return self.db.fetch_all(query, params, BrandSummary)
+    
+    def stock_bands(self):
+        """
+        Busca o histograma de estoque (produtos, unidades e valor por faixa)
+        
+        Returns:
+            list: StockBand de cada faixa, da menor para a maior
+        """
+        return self.db.fetch_all('SELECT * FROM stock_bands ORDER BY id', row_type=StockBand)
+    
+    def top_by_value(self, limit=10):
+        """
+        Busca os produtos com maior valor em estoque (estoque x preço)
+        
+        Percorre o índice idx_products_value do fim para o começo e para
+        em `limit` produtos, sem ordenar o catálogo.
+        
+        Args:
+            limit (int): Quantidade de produtos
+        
+        Returns:
+            list: Produtos (Product) do maior para o menor valor
         """
         query = '''
-            SELECT sh.*, p.name 
-            FROM stock_history sh 
-            JOIN products p ON sh.product_id = p.id 
-            ORDER BY sh.created_at DESC 
+            SELECT * FROM products
+            ORDER BY (COALESCE(stock, 0) * COALESCE(price, 0)) DESC
             LIMIT ?
         '''
-        return self.db.fetch_all(query, (limit,))
\ No newline at end of file
+        return self.db.fetch_all(query, (limit,), Product)
+    
+    def rebuild(self):
+        """
+        Recalcula todos os resumos (painel, alertas e relatórios) a partir dos produtos
+        
+        Corrige desvios, como o arredondamento acumulado nos valores ou uma
+        edição manual do banco. Percorre o catálogo inteiro em uma transação.
+        """
+        import migrations
+        
+        with self.db.transaction() as conn:
+            migrations.rebuild_summaries(conn.cursor())
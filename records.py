@@ -0,0 +1,228 @@
+from array import array
+
+
+class Record:
+    """
+    Base dos registros lidos do banco: atributos nomeados em __slots__
+
+    Cada subclasse declara em __slots__ os campos na ordem das colunas
+    da tabela. row_factory() monta, a partir dos nomes das colunas da
+    consulta, a função que o sqlite3 chama para cada linha; colunas que
+    não são campos do registro são ignoradas e campos ausentes ficam None.
+    """
+
+    __slots__ = ()
+
+    # Fábricas já montadas, por (classe, nomes das colunas)
+    _factories = {}
+
+    @classmethod
+    def row_factory(cls, description):
+        """
+        Função (cursor, row) -> registro para as colunas de um cursor
+
+        Args:
+            description (tuple): cursor.description da consulta executada
+        """
+        names = tuple(column[0] for column in description)
+        key = (cls, names)
+        factory = Record._factories.get(key)
+        if factory is None:
+            fields = cls.__slots__
+            if names[:len(fields)] == fields:
+                # Caso comum (SELECT * ou colunas na ordem da tabela)
+                if len(names) == len(fields):
+                    factory = lambda cursor, row: cls(*row)
+                else:
+                    size = len(fields)
+                    factory = lambda cursor, row: cls(*row[:size])
+            else:
+                positions = [names.index(field) if field in names else None for field in fields]
+                factory = lambda cursor, row: cls(*[
+                    None if position is None else row[position] for position in positions
+                ])
+            Record._factories[key] = factory
+        return factory
+
+    def as_dict(self):
+        """Campos do registro como dicionário (para JSON)"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __iter__(self):
+        # Permite tuple(registro) e gravar o registro direto em CSV
+        return (getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)
+        return f'{type(self).__name__}({values})'
+
+
+class Product(Record):
+    """Um produto (linha da tabela products)"""
+
+    __slots__ = (
+        'id', 'name', 'description', 'price', 'stock', 'brand', 'created_at', 'updated_at', 'min_stock'
+    )
+
+    def __init__(self, id, name, description=None, price=None, stock=None, brand=None,
+                 created_at=None, updated_at=None, min_stock=None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.stock = stock
+        self.brand = brand
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.min_stock = min_stock
+
+
+class StockMovement(Record):
+    """Uma linha do histórico de estoque, com o nome do produto"""
+
+    __slots__ = (
+        'id', 'product_id', 'old_stock', 'new_stock', 'change_type',
+        'reason', 'created_at', 'product_name', 'movement_id', 'location_id', 'quantity'
+    )
+
+    def __init__(self, id, product_id, old_stock, new_stock, change_type=None, reason=None,
+                 created_at=None, product_name=None, movement_id=None, location_id=None, quantity=None):
+        self.id = id
+        self.product_id = product_id
+        self.old_stock = old_stock
+        self.new_stock = new_stock
+        self.change_type = change_type
+        self.reason = reason
+        self.created_at = created_at
+        self.product_name = product_name
+        self.movement_id = movement_id
+        self.location_id = location_id
+        # Variação no local da linha (numa transferência o total não muda, mas esta sim)
+        self.quantity = quantity
+
+    @property
+    def variation(self):
+        """Diferença entre o estoque novo e o antigo"""
+        return (self.new_stock or 0) - (self.old_stock or 0)
+
+
+class Location(Record):
+    """Um local de estoque (loja, depósito...)"""
+
+    __slots__ = ('id', 'name', 'created_at')
+
+    def __init__(self, id, name, created_at=None):
+        self.id = id
+        self.name = name
+        self.created_at = created_at
+
+
+class LocationStock(Record):
+    """Quantidade de um produto em um local, com os nomes de ambos"""
+
+    __slots__ = ('product_id', 'location_id', 'stock', 'product_name', 'location_name')
+
+    def __init__(self, product_id, location_id, stock, product_name=None, location_name=None):
+        self.product_id = product_id
+        self.location_id = location_id
+        self.stock = stock
+        self.product_name = product_name
+        self.location_name = location_name
+
+
+class AlertEvent(Record):
+    """Abertura ou resolução de um alerta de reposição (linha de alert_events)"""
+
+    __slots__ = ('seq', 'product_id', 'event', 'stock', 'min_stock', 'created_at', 'product_name')
+
+    def __init__(self, seq, product_id, event, stock=None, min_stock=None, created_at=None,
+                 product_name=None):
+        self.seq = seq
+        self.product_id = product_id
+        self.event = event
+        self.stock = stock
+        self.min_stock = min_stock
+        self.created_at = created_at
+        self.product_name = product_name
+
+
+class ChangeEvent(Record):
+    """Inclusão, alteração ou exclusão de um produto ou movimentação (linha de change_log)"""
+
+    __slots__ = ('seq', 'entity', 'entity_id', 'product_id', 'op', 'created_at')
+
+    def __init__(self, seq, entity, entity_id, product_id=None, op=None, created_at=None):
+        self.seq = seq
+        self.entity = entity
+        self.entity_id = entity_id
+        self.product_id = product_id
+        self.op = op
+        self.created_at = created_at
+
+
+class BrandSummary(Record):
+    """Produtos, unidades e valor em estoque de uma marca (linha de brand_summary)"""
+
+    __slots__ = ('brand', 'product_count', 'total_units', 'total_value')
+
+    def __init__(self, brand, product_count=0, total_units=0, total_value=0.0):
+        self.brand = brand
+        self.product_count = product_count
+        self.total_units = total_units
+        self.total_value = total_value
+
+
+class StockBand(Record):
+    """Faixa do histograma de estoque com seus totais (linha de stock_bands)"""
+
+    __slots__ = ('id', 'label', 'lower_bound', 'upper_bound', 'product_count', 'total_units', 'total_value')
+
+    def __init__(self, id, label, lower_bound=None, upper_bound=None, product_count=0, total_units=0,
+                 total_value=0.0):
+        self.id = id
+        self.label = label
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.product_count = product_count
+        self.total_units = total_units
+        self.total_value = total_value
+
+
+class ProductBatch:
+    """
+    Muitos produtos em formato de colunas: IDs, estoques e preços em arrays
+
+    Ocupa 24 bytes por produto, contra centenas de bytes de uma tupla ou
+    Product com todos os textos, e os arrays podem ser usados pelo NumPy
+    sem cópia (numpy.frombuffer). Estoque e preço nulos viram 0.
+    """
+
+    __slots__ = ('ids', 'stock', 'prices')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.stock = array('q')
+        self.prices = array('d')
+
+    def extend(self, rows):
+        """Acrescenta linhas (id, stock, price)"""
+        for product_id, stock, price in rows:
+            self.ids.append(product_id)
+            self.stock.append(stock or 0)
+            self.prices.append(price or 0.0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def total_units(self):
+        """Soma dos estoques"""
+        return sum(self.stock)
+
+    def total_value(self):
+        """Soma de estoque × preço"""
+        return sum(stock * price for stock, price in zip(self.stock, self.prices))
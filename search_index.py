@@ -0,0 +1,340 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+
+from db import get_database
+from models import ChangeLogModel
+
+# Quantidade padrão de sugestões
+DEFAULT_LIMIT = 10
+
+# Palavras mais curtas que isso não recebem correção de digitação
+FUZZY_MIN_LENGTH = 4
+# A partir deste tamanho a palavra aceita 2 erros em vez de 1
+FUZZY_TWO_EDITS_LENGTH = 8
+
+# Pontuação de cada palavra da busca contra um token do produto: exato >
+# prefixo (mais perto de 0.9 quanto mais do token já foi digitado) > com erro
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.6
+PREFIX_BONUS = 0.3
+FUZZY_SCORE = 0.5
+FUZZY_PENALTY = 0.15
+
+# Tokens parecidos (mais trigramas em comum) conferidos com a distância de edição
+FUZZY_MAX_CANDIDATES = 200
+
+# Mais alterações que isso desde a última leitura: reconstrói em vez de aplicar
+REFRESH_LIMIT = 5000
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(db=None):
+    """
+    Retorna o índice de busca compartilhado do banco (montado na primeira busca)
+
+    Args:
+        db (Database): Banco; padrão é a instância compartilhada
+
+    Returns:
+        SearchIndex: Índice daquele banco neste processo
+    """
+    db = db or get_database()
+    with _indexes_lock:
+        if db.path not in _indexes:
+            _indexes[db.path] = SearchIndex(db)
+        return _indexes[db.path]
+
+
+def tokenize(text):
+    """
+    Quebra um texto em tokens sem acento e em minúsculas
+
+    'Café Pilão Extra-Forte' -> ['cafe', 'pilao', 'extra', 'forte']
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return _TOKEN_RE.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def trigrams(token):
+    """Trigramas do token com uma borda de espaço ('cafe' -> ' ca', 'caf', 'afe', 'fe ')"""
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(word, token, max_distance, prefix=False):
+    """
+    Distância de Levenshtein limitada entre uma palavra e um token
+
+    Para assim que a distância passa de `max_distance`, então conferir um
+    candidato ruim custa poucas linhas da tabela.
+
+    Args:
+        word (str): Palavra digitada
+        token (str): Token do índice
+        max_distance (int): Maior distância que interessa
+        prefix (bool): Compara com o melhor prefixo do token (palavra ainda
+            sendo digitada: 'chocl' fica a 1 de 'chocolate')
+
+    Returns:
+        int: Distância, ou max_distance + 1 se passar do limite
+    """
+    if not prefix and abs(len(word) - len(token)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(token) + 1))
+    for i, char in enumerate(word, 1):
+        current = [i]
+        for j, other in enumerate(token, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    distance = min(previous) if prefix else previous[-1]
+    return min(distance, max_distance + 1)
+
+
+class SearchIndex:
+    """
+    Índice em memória de nomes e marcas para sugestões enquanto se digita
+
+    Cada produto vira uma lista de tokens (nome + marca). O vocabulário
+    fica em uma lista ordenada, então os tokens que começam com o que foi
+    digitado saem de uma busca binária; um índice de trigramas do
+    vocabulário acha os tokens parecidos com uma palavra digitada errada,
+    conferidos com a distância de edição limitada, quando a palavra não é
+    começo de nenhum token. Cada palavra da busca precisa casar com algum
+    token do produto (exato, prefixo ou com erro).
+
+    O índice é montado na primeira busca e, antes de cada busca, aplica as
+    alterações de produtos registradas no change_log desde a última
+    leitura (inclusive as feitas por outros processos).
+    """
+
+    def __init__(self, db=None):
+        """
+        Args:
+            db (Database): Banco; padrão é a instância compartilhada
+        """
+        self.db = db or get_database()
+        self.changes = ChangeLogModel(self.db)
+        self.ready = False
+        self.last_seq = 0
+        self._lock = threading.RLock()
+        # id -> tokens do produto
+        self._docs = {}
+        # token -> IDs dos produtos que o contêm
+        self._postings = {}
+        # Vocabulário ordenado (busca por prefixo)
+        self._vocabulary = []
+        # trigrama -> tokens do vocabulário que o contêm
+        self._trigrams = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self):
+        """Monta o índice a partir da tabela products"""
+        with self._lock:
+            self._docs = {}
+            self._postings = {}
+            self._trigrams = {}
+            # Lido antes dos produtos: o que mudar no meio é reaplicado no próximo refresh()
+            _, last_seq = self.changes.bounds()
+            for product_id, name, brand in self.db.iter_all('SELECT id, name, brand FROM products'):
+                tokens = tuple(dict.fromkeys(tokenize(name) + tokenize(brand)))
+                self._docs[product_id] = tokens
+                for token in tokens:
+                    self._postings.setdefault(token, set()).add(product_id)
+            self._vocabulary = sorted(self._postings)
+            for token in self._vocabulary:
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+            self.last_seq = last_seq or 0
+            self.ready = True
+
+    def refresh(self):
+        """
+        Aplica as alterações de produtos feitas desde a última leitura
+
+        Reconstrói o índice se ainda não existir, se houver alterações
+        demais ou se parte delas já tiver sido descartada do change_log.
+        """
+        with self._lock:
+            if not self.ready:
+                self.build()
+                return
+            changes = self.changes.get_changes(self.last_seq, REFRESH_LIMIT)
+            if not changes:
+                return
+            # Os seqs são contínuos: um salto significa que o purge levou alterações
+            if len(changes) == REFRESH_LIMIT or changes[0].seq != self.last_seq + 1:
+                self.build()
+                return
+            product_ids = list(dict.fromkeys(
+                change.entity_id for change in changes if change.entity == 'produto'
+            ))
+            if product_ids:
+                placeholders = ','.join('?' * len(product_ids))
+                rows = self.db.fetch_all(
+                    f'SELECT id, name, brand FROM products WHERE id IN ({placeholders})', product_ids
+                )
+                for product_id, name, brand in rows:
+                    self.update(product_id, name, brand)
+                for product_id in set(product_ids) - {row[0] for row in rows}:
+                    self.remove(product_id)
+            self.last_seq = changes[-1].seq
+
+    def update(self, product_id, name, brand=None):
+        """Inclui ou atualiza um produto no índice"""
+        tokens = tuple(dict.fromkeys(tokenize(name) + tokenize(brand)))
+        with self._lock:
+            if self._docs.get(product_id) == tokens:
+                return
+            self.remove(product_id)
+            self._docs[product_id] = tokens
+            for token in tokens:
+                ids = self._postings.get(token)
+                if ids is None:
+                    ids = self._postings[token] = set()
+                    bisect.insort(self._vocabulary, token)
+                    for gram in trigrams(token):
+                        self._trigrams.setdefault(gram, set()).add(token)
+                ids.add(product_id)
+
+    def remove(self, product_id):
+        """Tira um produto do índice (tokens que ficam sem produto saem do vocabulário)"""
+        with self._lock:
+            for token in self._docs.pop(product_id, ()):
+                ids = self._postings[token]
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[token]
+                    del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+                    for gram in trigrams(token):
+                        self._trigrams[gram].discard(token)
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """
+        Busca os produtos que mais combinam com o texto digitado
+
+        A última palavra vale como prefixo (ainda está sendo digitada); as
+        outras também, mas um token igual vale mais. Empates ficam na ordem
+        em que os produtos foram encontrados.
+
+        Args:
+            text (str): Texto digitado (nome e/ou marca, completos ou não)
+            limit (int): Quantidade máxima de resultados
+
+        Returns:
+            list: IDs dos produtos, do mais para o menos relevante
+        """
+        words = list(dict.fromkeys(tokenize(text)))
+        if not words or limit <= 0:
+            return []
+        with self._lock:
+            self.refresh()
+            matches = [self._match_word(word, last=i == len(words) - 1) for i, word in enumerate(words)]
+            if not all(matches):
+                return []
+
+            candidates = None
+            if len(matches) > 1:
+                # Produtos que casam com todas as palavras (operações de conjunto em C)
+                id_sets = sorted(
+                    (
+                        self._postings[next(iter(scores))] if len(scores) == 1
+                        else set().union(*(self._postings[token] for token in scores))
+                        for scores in matches
+                    ),
+                    key=len
+                )
+                candidates = id_sets[0].intersection(*id_sets[1:])
+                if not candidates:
+                    return []
+            return self._rank(matches, candidates, limit)
+
+    def _match_word(self, word, last):
+        """
+        Tokens do vocabulário que casam com uma palavra da busca
+
+        Returns:
+            dict: token -> pontuação (vazio se nada casar)
+        """
+        scores = {}
+        start = bisect.bisect_left(self._vocabulary, word)
+        for token in self._vocabulary[start:bisect.bisect_right(self._vocabulary, word + '\uffff', start)]:
+            if token == word:
+                scores[token] = EXACT_SCORE
+            else:
+                scores[token] = PREFIX_SCORE + PREFIX_BONUS * len(word) / len(token)
+
+        # Palavra que existe no vocabulário (inteira ou como começo) não é erro
+        if scores or len(word) < FUZZY_MIN_LENGTH:
+            return scores
+        max_distance = 2 if len(word) >= FUZZY_TWO_EDITS_LENGTH else 1
+        # Cada erro estraga no máximo 3 trigramas (mais 1 da borda final no modo prefixo)
+        grams = trigrams(word)
+        required = len(grams) - 3 * max_distance - (1 if last else 0)
+        shared = {}
+        for gram in grams:
+            for token in self._trigrams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        nearest = heapq.nlargest(FUZZY_MAX_CANDIDATES, shared.items(), key=lambda item: item[1])
+        for token, count in nearest:
+            if count < required or token in scores:
+                continue
+            distance = edit_distance(word, token, max_distance, prefix=last)
+            if distance <= max_distance:
+                scores[token] = FUZZY_SCORE - FUZZY_PENALTY * distance
+        return scores
+
+    def _rank(self, matches, candidates, limit):
+        """
+        Os `limit` produtos de maior pontuação (soma das palavras)
+
+        Percorre os tokens da palavra mais seletiva do maior para o menor
+        valor e para assim que nenhum produto restante pode superar os já
+        escolhidos, então uma palavra comum não obriga a pontuar milhares
+        de produtos.
+        """
+        driver = min(range(len(matches)), key=lambda i: len(matches[i]))
+        others = [scores for i, scores in enumerate(matches) if i != driver]
+        others_best = sum(max(scores.values()) for scores in others)
+
+        heap = []
+        seen = set()
+        order = 0
+        for token, token_score in sorted(matches[driver].items(), key=lambda item: -item[1]):
+            if len(heap) >= limit and heap[0][0] >= token_score + others_best:
+                break
+            ids = self._postings[token] if candidates is None else self._postings[token] & candidates
+            for product_id in ids:
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                tokens = self._docs[product_id]
+                score = token_score
+                for scores in others:
+                    score += max(scores.get(other, 0.0) for other in tokens)
+                order += 1
+                entry = (score, -order, product_id)
+                if len(heap) < limit:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+                elif score >= token_score + others_best:
+                    # Os próximos deste token não passam do pior escolhido (já empatam no máximo)
+                    break
+        return [product_id for _, _, product_id in sorted(heap, reverse=True)]
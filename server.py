@@ -0,0 +1,698 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import itertools
+import json
+import os
+import re
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import backup
+from metrics import enable_slow_log
+from models import (
+    InsufficientStockError, LOW_STOCK_THRESHOLD, PAGE_SIZE, ChangeLogModel, LocationModel,
+    ProductModel, ReportModel, StockHistoryModel
+)
+from writer import Writer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8
+
+# Maior página aceita pela API
+MAX_PAGE_SIZE = 500
+
+# Campos que podem ser alterados por PATCH (estoque só por ajuste, para ficar no histórico)
+EDITABLE_FIELDS = {'name', 'description', 'price', 'brand', 'min_stock'}
+
+# Cópias pedidas pela API cujo estado fica disponível em /backups/jobs/<id>
+BACKUP_JOBS_KEPT = 20
+
+
+class ApiError(Exception):
+    """Erro que vira uma resposta HTTP com status e mensagem em JSON"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def product_to_dict(product):
+    """Converte um Product em dicionário para o JSON"""
+    return product.as_dict()
+
+
+def history_to_dict(movement):
+    """Converte um StockMovement em dicionário para o JSON"""
+    return movement.as_dict()
+
+
+def encode_cursor(cursor):
+    """Transforma o cursor de paginação em um texto opaco para a URL"""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode()
+
+
+def decode_cursor(value, size):
+    """
+    Desfaz encode_cursor; None se não houver cursor
+
+    Args:
+        value (str): Cursor recebido na URL
+        size (int): Quantidade de valores do cursor da rota
+
+    Returns:
+        tuple: Valores do cursor; o último é sempre o ID (ou posição) inteiro
+    """
+    if not value:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(value.encode()))
+    except (ValueError, TypeError):
+        raise ApiError(400, "Cursor inválido")
+    if (not isinstance(cursor, list) or len(cursor) != size
+            or not all(isinstance(item, (str, int, float)) and not isinstance(item, bool) for item in cursor)
+            or not isinstance(cursor[-1], int)):
+        raise ApiError(400, "Cursor inválido")
+    return tuple(cursor)
+
+
+def check_product_fields(data):
+    """
+    Confere os tipos dos campos numéricos de um produto vindo do JSON
+
+    Raises:
+        ApiError: 400 indicando o primeiro campo com tipo errado
+    """
+    price = data.get('price')
+    if price is not None and (isinstance(price, bool) or not isinstance(price, (int, float))):
+        raise ApiError(400, "'price' deve ser um número")
+    for name in ('stock', 'min_stock'):
+        value = data.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ApiError(400, f"'{name}' deve ser um inteiro")
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Traduz requisições HTTP/JSON em chamadas a ProductModel e StockHistoryModel"""
+
+    server_version = 'EstoqueAPI/1.0'
+    protocol_version = 'HTTP/1.1'
+    # Conexões keep-alive ociosas liberam a thread do pool após este tempo
+    timeout = 15
+
+    # (método, padrão da rota, nome do método do handler)
+    ROUTES = [
+        ('GET', r'/health', 'health'),
+        ('GET', r'/stats', 'stats'),
+        ('GET', r'/metrics', 'metrics'),
+        ('GET', r'/reports', 'reports'),
+        ('GET', r'/products', 'list_products'),
+        ('POST', r'/products', 'create_product'),
+        ('GET', r'/products/search', 'search_products'),
+        ('GET', r'/products/low-stock', 'low_stock'),
+        ('GET', r'/products/out-of-stock', 'out_of_stock'),
+        ('GET', r'/alerts', 'list_alerts'),
+        ('GET', r'/alerts/changes', 'alert_changes'),
+        ('GET', r'/changes', 'list_changes'),
+        ('GET', r'/changes/products', 'changed_products'),
+        ('GET', r'/products/(\d+)', 'get_product'),
+        ('PATCH', r'/products/(\d+)', 'update_product'),
+        ('DELETE', r'/products/(\d+)', 'delete_product'),
+        ('POST', r'/products/(\d+)/adjust', 'adjust_stock'),
+        ('POST', r'/products/(\d+)/stock', 'set_stock'),
+        ('GET', r'/products/(\d+)/history', 'product_history'),
+        ('GET', r'/products/(\d+)/locations', 'product_locations'),
+        ('GET', r'/locations', 'list_locations'),
+        ('POST', r'/locations', 'create_location'),
+        ('GET', r'/locations/(\d+)/stock', 'location_stock'),
+        ('POST', r'/transfers', 'create_transfer'),
+        ('GET', r'/history', 'recent_history'),
+        ('POST', r'/movements', 'create_movement'),
+        ('GET', r'/movements/([\w.\-]+)', 'get_movement'),
+        ('GET', r'/backups', 'list_backups'),
+        ('POST', r'/backups', 'create_backup'),
+        ('GET', r'/backups/jobs/(\d+)', 'backup_job'),
+    ]
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def dispatch(self, method):
+        """Encontra a rota, executa e responde em JSON (inclusive erros)"""
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            for route_method, pattern, name in self.ROUTES:
+                match = re.fullmatch(pattern, url.path.rstrip('/') or '/')
+                if match and route_method == method:
+                    status, body = getattr(self, name)(*match.groups())
+                    break
+            else:
+                raise ApiError(404, "Rota não encontrada")
+        except ApiError as e:
+            status, body = e.status, {'error': e.message}
+        except InsufficientStockError as e:
+            status, body = 409, {'error': str(e), 'product_id': e.product_id, 'stock': e.stock}
+        except Exception as e:
+            self.log_error("Erro interno: %r", e)
+            status, body = 500, {'error': "Erro interno"}
+        self.send_json(status, body)
+
+    def send_json(self, status, body):
+        """Envia a resposta JSON com Content-Length (mantém a conexão viva)"""
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        """Lê o corpo da requisição como objeto JSON"""
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ApiError(400, "JSON inválido")
+        if not isinstance(body, dict):
+            raise ApiError(400, "O corpo deve ser um objeto JSON")
+        return body
+
+    def int_param(self, name, default=None):
+        """Lê um parâmetro inteiro da query string"""
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(400, f"Parâmetro '{name}' deve ser inteiro")
+
+    def page_args(self, cursor_size=2):
+        """Lê cursor (com cursor_size valores) e limit da query string"""
+        limit = self.int_param('limit', PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ApiError(400, f"'limit' deve estar entre 1 e {MAX_PAGE_SIZE}")
+        return decode_cursor(self.query.get('cursor'), cursor_size), limit
+
+    def page_response(self, page, to_dict):
+        """Monta a resposta padrão de listagens paginadas"""
+        return 200, {
+            'items': [to_dict(row) for row in page.rows],
+            'next_cursor': encode_cursor(page.next_cursor),
+        }
+
+    @property
+    def products(self):
+        return self.server.product_model
+
+    @property
+    def history(self):
+        return self.server.history_model
+
+    @property
+    def locations(self):
+        return self.server.location_model
+
+    def write(self, func, *args, **kwargs):
+        """Executa uma escrita pelo escritor único e devolve o resultado (ou lança a exceção)"""
+        return self.server.writer.run(func, *args, **kwargs)
+
+    def location_param(self, data, name='location_id'):
+        """Lê um ID de local opcional do corpo JSON"""
+        value = data.get(name)
+        if value is not None and not isinstance(value, int):
+            raise ApiError(400, f"'{name}' deve ser um inteiro")
+        return value
+
+    # --- Rotas ---
+
+    def health(self):
+        return 200, {'status': 'ok'}
+
+    def stats(self):
+        return 200, self.products.get_stats(self.int_param('threshold'))
+
+    def metrics(self):
+        return 200, {
+            'queries': self.products.db.metrics.snapshot(self.int_param('limit')),
+            'caches': self.products.cache_stats(),
+            'writer': self.server.writer.stats(),
+        }
+
+    def reports(self):
+        order = self.query.get('order', 'value')
+        if order not in ReportModel.BRAND_ORDER:
+            raise ApiError(400, f"'order' deve ser um de: {', '.join(ReportModel.BRAND_ORDER)}")
+        reports = self.server.report_model
+        return 200, {
+            'brands': [summary.as_dict() for summary in reports.by_brand(order, self.int_param('brands'))],
+            'stock_bands': [band.as_dict() for band in reports.stock_bands()],
+            'top_by_value': [
+                product_to_dict(product) for product in reports.top_by_value(self.int_param('top', 10))
+            ],
+        }
+
+    def list_products(self):
+        after, limit = self.page_args()
+        return self.page_response(self.products.get_all_page(after, limit), product_to_dict)
+
+    def search_products(self):
+        term = self.query.get('q', '').strip()
+        if not term:
+            raise ApiError(400, "Parâmetro 'q' é obrigatório")
+        after, limit = self.page_args()
+        return self.page_response(self.products.search_page(term, after, limit), product_to_dict)
+
+    def low_stock(self):
+        after, limit = self.page_args(3)
+        page = self.products.get_low_stock_page(self.int_param('threshold', LOW_STOCK_THRESHOLD), after, limit)
+        return self.page_response(page, product_to_dict)
+
+    def out_of_stock(self):
+        after, limit = self.page_args()
+        return self.page_response(self.products.get_out_of_stock_page(after, limit), product_to_dict)
+
+    def list_alerts(self):
+        after, limit = self.page_args(3)
+        return self.page_response(self.products.get_alerts_page(after, limit), product_to_dict)
+
+    def alert_changes(self):
+        after = self.int_param('after', 0)
+        limit = self.int_param('limit', MAX_PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ApiError(400, f"'limit' deve estar entre 1 e {MAX_PAGE_SIZE}")
+        events = self.products.get_alert_changes(after, limit)
+        return 200, {
+            'items': [event.as_dict() for event in events],
+            'next_after': events[-1].seq if events else after,
+        }
+
+    def change_args(self):
+        """Lê after e limit do feed de alterações; 410 se o cursor já expirou"""
+        after = self.int_param('after', 0)
+        limit = self.int_param('limit', MAX_PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ApiError(400, f"'limit' deve estar entre 1 e {MAX_PAGE_SIZE}")
+        if self.server.change_model.expired(after):
+            raise ApiError(410, "Alterações depois deste seq já foram descartadas; refaça a carga completa")
+        return after, limit
+
+    def list_changes(self):
+        after, limit = self.change_args()
+        entity = self.query.get('entity')
+        if entity not in (None, 'produto', 'movimentacao'):
+            raise ApiError(400, "'entity' deve ser 'produto' ou 'movimentacao'")
+        changes = self.server.change_model.get_changes(after, limit, entity)
+        return 200, {
+            'items': [change.as_dict() for change in changes],
+            'next_after': changes[-1].seq if changes else after,
+        }
+
+    def changed_products(self):
+        after, limit = self.change_args()
+        changes = self.server.change_model.get_changed_products(self.products, after, limit)
+        return 200, {
+            'items': [product_to_dict(product) for product in changes.products],
+            'deleted_ids': changes.deleted_ids,
+            'next_after': changes.last_seq,
+        }
+
+    def get_product(self, product_id):
+        product = self.products.get_by_id(int(product_id))
+        if not product:
+            raise ApiError(404, "Produto não encontrado")
+        return 200, product_to_dict(product)
+
+    def create_product(self):
+        data = self.read_json()
+        if not str(data.get('name') or '').strip():
+            raise ApiError(400, "Nome do produto é obrigatório")
+        check_product_fields(data)
+        product_id = self.write(self.products.create, data)
+        return 201, product_to_dict(self.products.get_by_id(product_id))
+
+    def update_product(self, product_id):
+        data = self.read_json()
+        invalid = set(data) - EDITABLE_FIELDS
+        if invalid:
+            raise ApiError(400, f"Campos não editáveis: {', '.join(sorted(invalid))}")
+        if not data:
+            raise ApiError(400, "Nenhum campo para atualizar")
+        check_product_fields(data)
+        if not self.products.get_by_id(int(product_id)):
+            raise ApiError(404, "Produto não encontrado")
+        self.write(self.products.update, int(product_id), data)
+        return 200, product_to_dict(self.products.get_by_id(int(product_id)))
+
+    def delete_product(self, product_id):
+        if not self.products.get_by_id(int(product_id)):
+            raise ApiError(404, "Produto não encontrado")
+        self.write(self.products.delete, int(product_id))
+        return 200, {'deleted': int(product_id)}
+
+    def adjust_stock(self, product_id):
+        data = self.read_json()
+        if not isinstance(data.get('delta'), int):
+            raise ApiError(400, "'delta' deve ser um inteiro")
+        try:
+            result = self.write(
+                self.products.adjust_stock,
+                int(product_id),
+                data['delta'],
+                data.get('change_type', 'api'),
+                data.get('reason', ''),
+                allow_negative=bool(data.get('allow_negative', False)),
+                location_id=self.location_param(data)
+            )
+        except ValueError as e:
+            raise ApiError(404, str(e))
+        if result is None:
+            raise ApiError(404, "Produto não encontrado")
+        return 200, {'product_id': int(product_id), 'old_stock': result[0], 'new_stock': result[1]}
+
+    def set_stock(self, product_id):
+        data = self.read_json()
+        if not isinstance(data.get('stock'), int):
+            raise ApiError(400, "'stock' deve ser um inteiro")
+        updated = self.write(
+            self.products.update_stock, int(product_id), data['stock'],
+            data.get('change_type', 'api'), data.get('reason', '')
+        )
+        if not updated:
+            raise ApiError(404, "Produto não encontrado")
+        return 200, product_to_dict(self.products.get_by_id(int(product_id)))
+
+    def product_history(self, product_id):
+        after, limit = self.page_args()
+        page = self.history.get_by_product_page(int(product_id), after, limit)
+        return self.page_response(page, history_to_dict)
+
+    def recent_history(self):
+        after, limit = self.page_args()
+        return self.page_response(self.history.get_recent_page(after, limit), history_to_dict)
+
+    def create_movement(self):
+        data = self.read_json()
+        lines = data.get('lines')
+        if not isinstance(lines, list) or not lines:
+            raise ApiError(400, "'lines' deve ser uma lista não vazia")
+        try:
+            lines = [(int(line['product_id']), int(line['delta']), line.get('reason', '')) for line in lines]
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "Cada linha precisa de 'product_id' e 'delta' inteiros")
+        try:
+            movement_id = self.write(
+                self.products.apply_movement,
+                lines,
+                data.get('change_type', 'movimentacao'),
+                data.get('reason', ''),
+                data.get('movement_id'),
+                allow_negative=bool(data.get('allow_negative', False)),
+                location_id=self.location_param(data)
+            )
+        except ValueError as e:
+            raise ApiError(404, str(e))
+        return 201, {'movement_id': movement_id, 'lines': len(lines)}
+
+    def product_locations(self, product_id):
+        if not self.products.get_by_id(int(product_id)):
+            raise ApiError(404, "Produto não encontrado")
+        return 200, {'items': [row.as_dict() for row in self.locations.product_stock(int(product_id))]}
+
+    def list_locations(self):
+        return 200, {'items': [location.as_dict() for location in self.locations.get_all()]}
+
+    def create_location(self):
+        name = str(self.read_json().get('name') or '').strip()
+        if not name:
+            raise ApiError(400, "Nome do local é obrigatório")
+        if self.locations.find(name):
+            raise ApiError(409, "Já existe um local com este nome")
+        return 201, self.locations.find(self.write(self.locations.create, name)).as_dict()
+
+    def location_stock(self, location_id):
+        if not self.locations.find(location_id):
+            raise ApiError(404, "Local não encontrado")
+        after, limit = self.page_args(1)
+        page = self.locations.get_stock_page(int(location_id), after, limit)
+        return self.page_response(page, lambda row: row.as_dict())
+
+    def create_transfer(self):
+        data = self.read_json()
+        lines = data.get('lines')
+        if not isinstance(lines, list) or not lines:
+            raise ApiError(400, "'lines' deve ser uma lista não vazia")
+        try:
+            lines = [(int(line['product_id']), int(line['quantity'])) for line in lines]
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "Cada linha precisa de 'product_id' e 'quantity' inteiros")
+        source = self.location_param(data, 'from_location_id')
+        target = self.location_param(data, 'to_location_id')
+        if source is None or target is None:
+            raise ApiError(400, "'from_location_id' e 'to_location_id' são obrigatórios")
+        try:
+            movement_id = self.write(
+                self.products.transfer_stock, lines, source, target,
+                data.get('reason', ''), data.get('movement_id'),
+                allow_negative=bool(data.get('allow_negative', False))
+            )
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        return 201, {'movement_id': movement_id, 'lines': len(lines)}
+
+    def get_movement(self, movement_id):
+        rows = self.history.get_by_movement(movement_id)
+        if not rows:
+            raise ApiError(404, "Movimentação não encontrada")
+        return 200, {'movement_id': movement_id, 'lines': [history_to_dict(row) for row in rows]}
+
+    def list_backups(self):
+        items = [
+            {'path': path, 'size': os.path.getsize(path)}
+            for path in backup.list_backups(self.products.db)
+        ]
+        return 200, {'items': items}
+
+    def create_backup(self):
+        data = self.read_json()
+        keep = data.get('keep')
+        if keep is not None and (not isinstance(keep, int) or keep < 1):
+            raise ApiError(400, "'keep' deve ser um inteiro positivo")
+        # Uma cópia por vez: outra pedida durante a cópia recebe 409
+        job = self.server.start_backup(keep)
+        if job is None:
+            raise ApiError(409, "Já existe uma cópia em andamento")
+        return 202, dict(job, status_url=f"/backups/jobs/{job['id']}")
+
+    def backup_job(self, job_id):
+        job = self.server.get_backup_job(int(job_id))
+        if job is None:
+            raise ApiError(404, "Cópia não encontrada")
+        return 200, job
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    Servidor HTTP que atende as conexões em um pool limitado de threads
+
+    Cada thread do pool usa sua própria conexão SQLite (Database abre uma
+    por thread). Quando todas as vagas estão ocupadas, novas conexões
+    esperam na fila do sistema em vez de criar threads sem limite.
+    """
+
+    allow_reuse_address = True
+    # Fila de conexões do sistema enquanto o pool está ocupado
+    request_queue_size = 128
+
+    def __init__(self, address, workers=DEFAULT_WORKERS, quiet=False):
+        super().__init__(address, ApiHandler)
+        self.quiet = quiet
+        self.product_model = ProductModel()
+        self.history_model = StockHistoryModel(self.product_model.db)
+        self.location_model = LocationModel(self.product_model.db)
+        self.change_model = ChangeLogModel(self.product_model.db)
+        self.report_model = ReportModel(self.product_model.db)
+        # Escritas de todas as threads passam por um único escritor (commit em grupo)
+        self.writer = Writer(self.product_model.db)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self.backup_lock = threading.Lock()
+        # Cópias pedidas pela API rodam fora do pool, uma por vez
+        self.backup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup')
+        self.backup_jobs = {}
+        self.backup_jobs_lock = threading.Lock()
+        self._backup_job_ids = itertools.count(1)
+        # Limita conexões em atendimento + aguardando no pool
+        self.slots = threading.BoundedSemaphore(workers * 2)
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def start_backup(self, keep=None):
+        """
+        Inicia uma cópia de segurança em segundo plano
+
+        A cópia online pode levar minutos em bancos grandes; rodando fora
+        do pool, ela não ocupa uma das threads que atendem as requisições.
+
+        Args:
+            keep (int): Cópias mantidas pela rotação (None = todas)
+
+        Returns:
+            dict: Estado da cópia (ver get_backup_job), ou None se outra
+                cópia (da API ou agendada) já estiver em andamento
+        """
+        if not self.backup_lock.acquire(blocking=False):
+            return None
+        job = {
+            'id': next(self._backup_job_ids),
+            'status': 'em_andamento',
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'finished_at': None,
+            'report': None,
+            'error': None,
+        }
+        with self.backup_jobs_lock:
+            self.backup_jobs[job['id']] = job
+            # Descarta as mais antigas (a em andamento é sempre a mais nova)
+            for job_id in list(self.backup_jobs)[:-BACKUP_JOBS_KEPT]:
+                del self.backup_jobs[job_id]
+            snapshot = dict(job)
+        try:
+            self.backup_executor.submit(self._run_backup, job, keep)
+        except RuntimeError:
+            # Servidor encerrando
+            self.backup_lock.release()
+            raise
+        return snapshot
+
+    def _run_backup(self, job, keep):
+        """Faz a cópia de um job de start_backup e grava o resultado nele"""
+        try:
+            report = backup.create_backup(self.product_model.db, keep=keep)
+            update = {'status': 'concluida', 'report': report}
+        except Exception as e:
+            update = {'status': 'erro', 'error': str(e)}
+        finally:
+            self.backup_lock.release()
+        update['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        with self.backup_jobs_lock:
+            job.update(update)
+
+    def get_backup_job(self, job_id):
+        """
+        Estado de uma cópia pedida pela API
+
+        Returns:
+            dict: id, status ('em_andamento', 'concluida' ou 'erro'),
+                started_at, finished_at, report (o de backup.create_backup)
+                e error; None se o id não existir ou já tiver sido descartado
+        """
+        with self.backup_jobs_lock:
+            job = self.backup_jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def server_close(self):
+        """Para de aceitar conexões, termina as requisições e as cópias em andamento e fecha o banco"""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.backup_executor.shutdown(wait=True)
+        self.writer.close()
+        self.product_model.db.close_all()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, quiet=False,
+          backup_interval=None, backup_keep=backup.DEFAULT_KEEP):
+    """
+    Inicia a API e bloqueia até receber SIGINT/SIGTERM
+
+    O encerramento é gracioso: o servidor para de aceitar conexões e
+    espera as requisições em andamento terminarem antes de sair.
+    Com `backup_interval` (minutos), faz cópias de segurança periódicas
+    em segundo plano (ver backup.py).
+    """
+    server = PooledHTTPServer((host, port), workers, quiet)
+    scheduler = None
+    if backup_interval:
+        def on_backup(report):
+            if isinstance(report, Exception):
+                print(f"Erro na cópia de segurança: {report}", file=sys.stderr, flush=True)
+            elif not quiet:
+                print(f"Cópia de segurança: {report['path']} ({report['seconds']:.1f}s)", flush=True)
+
+        # Mesma trava do POST /backups: as cópias nunca se sobrepõem
+        scheduler = backup.BackupScheduler(
+            backup_interval * 60, server.product_model.db, keep=backup_keep,
+            on_backup=on_backup, lock=server.backup_lock
+        )
+        scheduler.start()
+
+    def stop(signum, frame):
+        # shutdown() precisa rodar fora da thread de serve_forever()
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"API de estoque em http://{host}:{server.server_port} ({workers} workers)")
+    try:
+        server.serve_forever()
+    finally:
+        if scheduler is not None:
+            scheduler.stop()
+        server.server_close()
+        print("Servidor encerrado")
+
+
+def main(argv=None):
+    """Ponto de entrada do modo servidor pela linha de comando"""
+    parser = argparse.ArgumentParser(description="API HTTP/JSON local do estoque")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Endereço de escuta (padrão: só local)")
+    parser.add_argument('--porta', type=int, default=DEFAULT_PORT, help="Porta TCP")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Threads de atendimento")
+    parser.add_argument('--silencioso', action='store_true', help="Não registra cada requisição")
+    parser.add_argument('--backup-intervalo', type=float,
+                        help="Faz uma cópia de segurança a cada N minutos (ver backup.py)")
+    parser.add_argument('--backup-manter', type=int, default=backup.DEFAULT_KEEP,
+                        help="Cópias mantidas pela rotação")
+    args = parser.parse_args(argv)
+
+    enable_slow_log()
+    serve(args.host, args.porta, args.workers, args.silencioso, args.backup_intervalo, args.backup_manter)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db as db_module  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    Banco novo e migrado em um diretório temporário
+
+    É também o banco padrão (ESTOQUE_DB / get_database) durante o teste,
+    então o código que não recebe o banco (exportação, CLI) usa o mesmo.
+    """
+    path = str(tmp_path / 'estoque.db')
+    monkeypatch.setenv('ESTOQUE_DB', path)
+    database = db_module.get_database(path)
+    yield database
+    database.close_all()
+    with db_module._databases_lock:
+        db_module._databases.pop(path, None)
+
+
+@pytest.fixture
+def query_plans(db):
+    """
+    Grava os comandos executados pela conexão da thread atual
+
+    Chame o objeto devolvido para obter o EXPLAIN QUERY PLAN de cada
+    comando gravado que contenha o trecho informado.
+    """
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+
+    def plans(fragment):
+        db.conn.set_trace_callback(None)
+        return [
+            ' '.join(row[3] for row in db.conn.execute(f'EXPLAIN QUERY PLAN {sql}'))
+            # Cada comando de trigger repete no trace o comando que o disparou
+            for sql in dict.fromkeys(statements)
+            if fragment in sql and not sql.lstrip().startswith('EXPLAIN')
+        ]
+
+    return plans
+
+
+@pytest.fixture
+def api(db, tmp_path, monkeypatch):
+    """API no banco temporário, em uma porta livre; devolve a URL base"""
+    from server import PooledHTTPServer
+
+    monkeypatch.setenv('ESTOQUE_BACKUP_DIR', str(tmp_path / 'backups'))
+    server = PooledHTTPServer(('127.0.0.1', 0), workers=2, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,52 @@
+import main
+from models import ProductModel
+
+
+def events(products, after=0):
+    return [(event.product_id, event.event, event.stock, event.min_stock)
+            for event in products.get_alert_changes(after)]
+
+
+def test_alert_opens_and_resolves_when_stock_crosses_minimum(db):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 20, 'min_stock': 5})
+    assert events(products) == []
+
+    products.adjust_stock(product_id, -15)
+    products.adjust_stock(product_id, -2)  # continua abaixo: nenhum evento novo
+    products.adjust_stock(product_id, 10)
+    assert events(products) == [
+        (product_id, 'aberto', 5, 5),
+        (product_id, 'resolvido', 13, 5),
+    ]
+
+
+def test_new_product_minimum_change_and_delete(db):
+    products = ProductModel(db)
+    low_id = products.create({'name': 'Chá', 'price': 5.0, 'stock': 1, 'min_stock': 3})
+    other_id = products.create({'name': 'Açúcar', 'price': 4.0, 'stock': 8, 'min_stock': 3})
+    products.update(other_id, {'min_stock': 10})
+    products.delete(low_id)
+
+    assert events(products) == [
+        (low_id, 'aberto', 1, 3),
+        (other_id, 'aberto', 8, 10),
+        (low_id, 'removido', 1, 3),
+    ]
+    assert [product.id for product in products.get_alerts()] == [other_id]
+    assert products.get_stats()['alerts'] == 1
+
+
+def test_alert_changes_cursor(db, capsys):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 1, 'min_stock': 5})
+    first = products.get_alert_changes()
+    products.update_stock(product_id, 9)
+
+    later = products.get_alert_changes(first[-1].seq)
+    assert [(event.event, event.product_name) for event in later] == [('resolvido', 'Café')]
+    assert later[0].seq > first[-1].seq
+
+    assert main.main(['alert-changes', '--desde', str(first[-1].seq)]) == 0
+    fields = capsys.readouterr().out.split('\t')
+    assert fields[:5] == [str(later[0].seq), str(product_id), 'resolvido', '9', '5']
@@ -0,0 +1,70 @@
+import pytest
+
+from analytics import DemandAnalytics
+from models import ProductModel
+
+
+def add_move(db, product_id, old, new, days_ago):
+    db.execute(
+        'INSERT INTO stock_history (product_id, old_stock, new_stock, change_type, created_at) '
+        "VALUES (?, ?, ?, 'venda', datetime('now', ?))",
+        (product_id, old, new, f'-{days_ago} days')
+    )
+
+
+@pytest.fixture
+def catalog(db):
+    """Café vende 3/dia na janela de 10 dias, Chá 0,5/dia e Açúcar não vende"""
+    products = ProductModel(db)
+    ids = {
+        name: products.create({'name': name, 'price': 1.0, 'stock': stock})
+        for name, stock in (('Café', 20), ('Chá', 50), ('Açúcar', 8))
+    }
+    add_move(db, ids['Café'], 150, 50, 20)  # fora da janela
+    add_move(db, ids['Café'], 50, 40, 5)
+    add_move(db, ids['Café'], 40, 20, 2)
+    add_move(db, ids['Café'], 20, 30, 1)  # entrada não conta como consumo
+    add_move(db, ids['Chá'], 55, 50, 3)
+    return ids
+
+
+def test_forecast_numbers(db, catalog):
+    analytics = DemandAnalytics(db, window_days=10)
+    forecast = {row.name: row for row in analytics.forecast()}
+
+    assert list(forecast) == ['Café', 'Chá']
+    cafe = forecast['Café']
+    assert (cafe.product_id, cafe.stock) == (catalog['Café'], 20)
+    assert cafe.velocity == pytest.approx(3.0)
+    assert cafe.days_of_cover == pytest.approx(20 / 3)
+    # Ponto de pedido: 3/dia × (7 de prazo + 3 de segurança); pede até 30 + 3 × 14
+    assert cafe.reorder_point == pytest.approx(30.0)
+    assert cafe.reorder_quantity == 52
+    cha = forecast['Chá']
+    assert (cha.velocity, cha.days_of_cover, cha.reorder_point, cha.reorder_quantity) == (0.5, 100.0, 5.0, 0)
+
+
+def test_forecast_horizon_and_summary(db, catalog):
+    analytics = DemandAnalytics(db, window_days=10)
+
+    assert [row.name for row in analytics.forecast(horizon_days=10)] == ['Café']
+    assert analytics.summary() == {
+        'products_moving': 2, 'need_reorder': 1, 'units_to_order': 52, 'window_days': 10,
+    }
+
+
+def test_refresh_reads_new_movements_and_stock(db, catalog):
+    analytics = DemandAnalytics(db, window_days=10)
+    analytics.forecast()
+
+    add_move(db, catalog['Açúcar'], 18, 8, 0)
+    ProductModel(db).update_stock(catalog['Chá'], 2)
+    analytics.refresh(force=True)
+    forecast = {row.name: row for row in analytics.forecast()}
+
+    assert forecast['Açúcar'].velocity == pytest.approx(1.0)
+    assert forecast['Açúcar'].days_of_cover == pytest.approx(8.0)
+    # update_stock também é uma baixa (50 → 2) na janela
+    assert forecast['Chá'].stock == 2
+    assert forecast['Chá'].velocity == pytest.approx(5.3)
+    assert forecast['Chá'].days_of_cover == pytest.approx(2 / 5.3)
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+import archive
+from models import ProductModel, StockHistoryModel
+
+CUTOFF = date(2025, 1, 1)
+
+
+@pytest.fixture
+def history_rows(db):
+    """Duas movimentações antigas e uma recente de um produto, e uma recente de um excluído"""
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 2.0, 'stock': 25})
+    deleted_id = ProductModel(db).create({'name': 'Chá', 'price': 1.0})
+    db.executemany(
+        'INSERT INTO stock_history (product_id, old_stock, new_stock, change_type, created_at) '
+        "VALUES (?, ?, ?, 'manual', ?)",
+        [
+            (product_id, 0, 50, '2024-01-05 10:00:00'),
+            (product_id, 50, 30, '2024-01-05 12:00:00'),
+            (product_id, 30, 25, '2025-06-01 10:00:00'),
+            (deleted_id, 0, 4, '2025-06-02 10:00:00'),
+        ]
+    )
+    ProductModel(db).delete(deleted_id)
+    return product_id
+
+
+def counts(db):
+    return (
+        db.fetch_one('SELECT COUNT(*) FROM main.stock_history')[0],
+        db.fetch_one('SELECT COUNT(*) FROM archive.stock_history')[0],
+    )
+
+
+def test_recent_orphans_stay_in_main_database(db, history_rows):
+    before = db.fetch_one('SELECT COUNT(*) FROM main.stock_history')[0]
+    report = archive.archive_history(db, before=CUTOFF, vacuum=False)
+
+    assert (report['archived'], report['orphans']) == (2, 0)
+    assert counts(db) == (before - 2, 2)
+    # Intervalo depois do corte: só o banco principal é lido, e a órfã continua lá
+    recent = list(StockHistoryModel(db).iter_range('2025-06-02'))
+    assert [(row[3], row[6]) for row in recent] == [(4, '2025-06-02 10:00:00')]
+
+
+def test_interrupted_batch_is_finished_by_next_run(db, history_rows, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("interrompido")
+
+    monkeypatch.setattr(archive, '_rollup_batch', fail)
+    with pytest.raises(RuntimeError):
+        archive.archive_history(db, before=CUTOFF, vacuum=False)
+
+    # A cópia já foi confirmada; o histórico principal continua intacto
+    main_rows, archived_rows = counts(db)
+    assert archived_rows == 2
+    assert db.fetch_one(
+        "SELECT COUNT(*) FROM main.stock_history WHERE created_at < '2025-01-01'"
+    )[0] == 2
+    assert db.fetch_one('SELECT archived_before FROM history_archive')[0] is None
+
+    monkeypatch.undo()
+    archive.archive_history(db, before=CUTOFF, vacuum=False)
+
+    assert counts(db) == (main_rows - 2, 2)
+    daily = StockHistoryModel(db).get_daily(history_rows, end='2025-01-01')
+    assert [tuple(row) for row in daily] == [('2024-01-05', 2, 50, 20, 0, 30)]
+
+
+def test_old_orphans_are_archived(db, history_rows):
+    report = archive.archive_history(db, before=date(2026, 1, 1), vacuum=False)
+
+    assert report['orphans'] == 1
+    assert db.fetch_one('SELECT COUNT(*) FROM main.stock_history WHERE created_at < ?', ('2026-01-01',))[0] == 0
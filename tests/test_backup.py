@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import time
+import urllib.request
+from datetime import date
+
+import pytest
+
+import archive
+import backup
+import main
+from models import ProductModel
+
+
+def request(url, data=None):
+    body = None if data is None else json.dumps(data).encode()
+    with urllib.request.urlopen(urllib.request.Request(url, body)) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_post_backup_runs_in_background(api):
+    status, job = request(f'{api}/backups', {'keep': 3})
+    assert status == 202
+    assert job['status'] == 'em_andamento'
+    status_url = job['status_url']
+    assert status_url == f"/backups/jobs/{job['id']}"
+
+    deadline = time.monotonic() + 10
+    while job['status'] == 'em_andamento' and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status, job = request(api + status_url)
+    assert status == 200
+    assert job['status'] == 'concluida', job['error']
+    assert os.path.exists(job['report']['path'])
+    assert job['finished_at'] is not None
+
+
+def test_batch_refuses_restore(db, monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO('backup restaurar copia.db --sim\n'))
+
+    assert main.main(['batch']) == 1
+    assert 'backup restaurar' in capsys.readouterr().err
+
+
+def test_batch_refuses_schedule(db, monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO('backup agendar --intervalo 1\n'))
+
+    assert main.main(['batch']) == 1
+    assert 'Comando não permitido em lote: backup agendar' in capsys.readouterr().err
+
+
+def add_old_history(db, product_id, count):
+    db.executemany(
+        'INSERT INTO stock_history (product_id, old_stock, new_stock, change_type, created_at) '
+        "VALUES (?, 0, 1, 'manual', '2020-01-01 10:00:00')",
+        [(product_id,)] * count
+    )
+    archive.archive_history(db, before=date(2021, 1, 1), vacuum=False)
+
+
+def archived_rows(db):
+    return db.fetch_one('SELECT COUNT(*) FROM archive.stock_history')[0]
+
+
+def test_backup_and_restore_include_archive(db, tmp_path):
+    directory = str(tmp_path / 'backups')
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 1.0})
+    add_old_history(db, product_id, 3)
+
+    report = backup.create_backup(db, directory)
+    assert report['archive'] == os.path.join(
+        directory, 'estoque-arquivo-' + os.path.basename(report['path'])[len('estoque-'):]
+    )
+    assert backup.verify_backup(report['archive']) == (True, None)
+    assert backup.list_backups(db, directory) == [report['path']]
+
+    add_old_history(db, product_id, 2)
+    ProductModel(db).create({'name': 'Chá', 'price': 1.0})
+    assert archived_rows(db) == 5
+
+    backup.restore_backup(report['path'], db, directory)
+    assert db.fetch_one('SELECT COUNT(*) FROM products')[0] == 1
+    assert archived_rows(db) == 3
+
+
+def test_restore_without_archive_copy_is_refused(db, tmp_path):
+    directory = str(tmp_path / 'backups')
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 1.0})
+    report = backup.create_backup(db, directory)
+    assert report['archive'] is None
+
+    add_old_history(db, product_id, 2)
+    with pytest.raises(ValueError, match='banco de arquivo'):
+        backup.restore_backup(report['path'], db, directory)
+    assert archived_rows(db) == 2
+
+
+def test_rotation_removes_archive_copies(db, tmp_path):
+    directory = str(tmp_path / 'backups')
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 1.0})
+    add_old_history(db, product_id, 1)
+
+    first = backup.create_backup(db, directory)
+    second = backup.create_backup(db, directory, keep=1)
+
+    assert second['removed'] == [first['path']]
+    assert sorted(os.listdir(directory)) == sorted(
+        os.path.basename(path) + suffix
+        for path in (second['path'], second['archive'])
+        for suffix in ('', backup.CHECKSUM_SUFFIX)
+    )
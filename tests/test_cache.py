@@ -0,0 +1,46 @@
+from cache import LRUCache, MISSING
+from models import ProductModel
+
+
+def test_set_is_skipped_after_invalidation():
+    cache = LRUCache(maxsize=10)
+    generation = cache.generation
+    cache.invalidate('outra')
+    assert cache.set('chave', 1, generation) is False
+    assert cache.get('chave') is MISSING
+    assert cache.set('chave', 2, cache.generation) is True
+    assert cache.get('chave') == 2
+
+
+def test_get_by_id_does_not_cache_row_read_before_invalidation(db, monkeypatch):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 10})
+    fetch_one = db.fetch_one
+
+    def fetch_then_update(*args, **kwargs):
+        # O SELECT já leu o valor antigo quando a alteração é gravada e descartada
+        row = fetch_one(*args, **kwargs)
+        monkeypatch.setattr(db, 'fetch_one', fetch_one)
+        products.update_stock(product_id, 25)
+        return row
+
+    monkeypatch.setattr(db, 'fetch_one', fetch_then_update)
+    assert products.get_by_id(product_id).stock == 10
+    assert products.cache.get(product_id) is MISSING
+    assert products.get_by_id(product_id).stock == 25
+
+
+def test_search_page_does_not_cache_results_read_before_invalidation(db, monkeypatch):
+    products = ProductModel(db)
+    products.create({'name': 'Café Pilão', 'price': 10.0, 'stock': 10})
+    search_page = products._search_page
+
+    def search_then_create(*args, **kwargs):
+        page = search_page(*args, **kwargs)
+        monkeypatch.setattr(products, '_search_page', search_page)
+        products.create({'name': 'Café União', 'price': 9.0, 'stock': 3})
+        return page
+
+    monkeypatch.setattr(products, '_search_page', search_then_create)
+    assert len(products.search_page('café').rows) == 1
+    assert len(products.search_page('café').rows) == 2
@@ -0,0 +1,90 @@
+import main
+from models import ChangeLogModel, ProductModel
+
+
+def summary(changes):
+    return [(change.entity, change.op, change.product_id) for change in changes]
+
+
+def test_changes_follow_commit_order(db):
+    products = ProductModel(db)
+    changes = ChangeLogModel(db)
+    cafe = products.create({'name': 'Café', 'price': 10.0, 'stock': 5})
+    cha = products.create({'name': 'Chá', 'price': 5.0, 'stock': 5})
+    products.adjust_stock(cafe, -1, 'venda')
+    products.delete(cha)
+
+    log = changes.get_changes()
+    assert [change.seq for change in log] == sorted(change.seq for change in log)
+    assert summary(log) == [
+        ('produto', 'inclusao', cafe),
+        ('produto', 'inclusao', cha),
+        ('produto', 'alteracao', cafe),
+        ('movimentacao', 'inclusao', cafe),
+        ('produto', 'exclusao', cha),
+    ]
+    movement = log[3]
+    assert db.fetch_one('SELECT change_type FROM stock_history WHERE id = ?', (movement.entity_id,))[0] == 'venda'
+
+    # Lendo aos poucos a partir do último seq recebido, nada se perde nem repete
+    read, after = [], 0
+    while True:
+        page = changes.get_changes(after, 2)
+        if not page:
+            break
+        read.extend(page)
+        after = page[-1].seq
+    assert read == log
+    assert summary(changes.get_changes(entity='movimentacao')) == [('movimentacao', 'inclusao', cafe)]
+
+
+def test_changed_products_collapse_and_report_deletions(db):
+    products = ProductModel(db)
+    changes = ChangeLogModel(db)
+    cafe = products.create({'name': 'Café', 'price': 10.0, 'stock': 5})
+    cha = products.create({'name': 'Chá', 'price': 5.0, 'stock': 5})
+    start = changes.bounds()[1]
+    products.adjust_stock(cafe, 1)
+    products.update(cafe, {'price': 11.0})
+    products.delete(cha)
+
+    result = changes.get_changed_products(products, start)
+    assert [(product.id, product.price, product.stock) for product in result.products] == [(cafe, 11.0, 6)]
+    assert result.deleted_ids == [cha]
+    assert result.last_seq == changes.bounds()[1]
+    assert changes.get_changed_products(products, result.last_seq) == ([], [], result.last_seq)
+
+
+def test_tail_since_seq(db, capsys):
+    products = ProductModel(db)
+    cafe = products.create({'name': 'Café', 'price': 10.0, 'stock': 5})
+    since = ChangeLogModel(db).bounds()[1]
+    products.adjust_stock(cafe, 2)
+
+    assert main.main(['tail', '--desde', str(since)]) == 0
+    lines = [line.split('\t') for line in capsys.readouterr().out.splitlines()]
+    assert [(line[1], line[2], line[4]) for line in lines] == [
+        ('produto', 'alteracao', str(cafe)),
+        ('movimentacao', 'inclusao', str(cafe)),
+    ]
+    assert int(lines[0][0]) == since + 1
+
+    assert main.main(['tail', '--desde', str(since), '--entidade', 'movimentacao']) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 1
+
+
+def test_purged_cursor_is_expired(db, capsys):
+    products = ProductModel(db)
+    for name in ('Café', 'Chá', 'Açúcar'):
+        products.create({'name': name, 'price': 1.0})
+    changes = ChangeLogModel(db)
+    first, last = changes.bounds()
+    db.execute("UPDATE change_log SET created_at = datetime('now', '-40 days') WHERE seq < ?", (last,))
+
+    assert changes.purge(30) == 2
+    assert changes.bounds() == (last, last)
+    assert changes.expired(first)
+    assert not changes.expired(last - 1)
+
+    assert main.main(['tail', '--desde', str(first)]) == 1
+    assert 'refaça a carga completa' in capsys.readouterr().err
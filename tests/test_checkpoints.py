@@ -0,0 +1,27 @@
+import pytest
+
+import checkpoints
+from models import ProductModel
+
+
+def test_future_checkpoint_is_rejected(db):
+    ProductModel(db).create({'name': 'Café', 'price': 2.0, 'stock': 10})
+
+    with pytest.raises(ValueError, match='futuro'):
+        checkpoints.build_checkpoint(db, '2999-01-01 00:00:00')
+    assert db.fetch_one('SELECT COUNT(*) FROM stock_checkpoints')[0] == 0
+
+
+def test_cli_reports_future_checkpoint(db, capsys):
+    assert checkpoints.main(['criar', '--em', '2999-01-01']) == 1
+    assert 'Checkpoint no futuro: 2999-01-01 23:59:59' in capsys.readouterr().err
+
+
+def test_checkpoint_now_snapshots_products(db):
+    ProductModel(db).create({'name': 'Café', 'price': 2.0, 'stock': 10})
+
+    checkpoint_id, count = checkpoints.build_checkpoint(db)
+    assert count == 1
+    assert db.fetch_one(
+        'SELECT stock, price FROM stock_checkpoint_items WHERE checkpoint_id = ?', (checkpoint_id,)
+    ) == (10, 2.0)
@@ -0,0 +1,78 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+from models import ProductModel
+
+
+def run_batch(monkeypatch, lines):
+    monkeypatch.setattr('sys.stdin', io.StringIO('\n'.join(lines) + '\n'))
+    return main.main(['batch'])
+
+
+@pytest.fixture
+def product_id(db):
+    return ProductModel(db).create({'name': 'Café', 'price': 10.0, 'stock': 5})
+
+
+@pytest.mark.parametrize('line, name', [
+    ('batch', 'batch'),
+    ('menu', 'menu'),
+    ('serve --porta 0', 'serve'),
+    ('tail --seguir', 'tail'),
+])
+def test_batch_refuses_commands_that_do_not_finish(db, monkeypatch, capsys, product_id, line, name):
+    assert run_batch(monkeypatch, [line, f'get {product_id}']) == 1
+
+    out, err = capsys.readouterr()
+    assert err == f"Linha 1: Comando não permitido em lote: {name}\n"
+    # O comando seguinte roda normalmente
+    assert out.startswith(f'{product_id}\tCafé')
+
+
+def test_batch_reports_errors_with_line_numbers_and_continues(db, monkeypatch, capsys, product_id):
+    lines = [
+        '# comentário',
+        '',
+        'get 999',
+        'adjust x 1',
+        'nao-existe',
+        f'adjust {product_id} -10 --sem-negativo',
+        f'adjust {product_id} -2',
+    ]
+    assert run_batch(monkeypatch, lines) == 1
+
+    out, err = capsys.readouterr()
+    errors = err.splitlines()
+    assert [error.split(':')[0] for error in errors] == ['Linha 3', 'Linha 4', 'Linha 5', 'Linha 6']
+    assert 'Produto não encontrado: 999' in errors[0]
+    assert out.split() == [str(product_id), '5', '3']
+    assert ProductModel(db).get_by_id(product_id).stock == 3
+
+
+def test_batch_without_errors_exits_zero(db, monkeypatch, capsys, product_id):
+    assert run_batch(monkeypatch, [f'get {product_id}', 'search café']) == 0
+    assert capsys.readouterr().out.count('Café') == 2
+
+
+def test_single_command_error_exit_code(db, capsys):
+    assert main.main(['get', '999']) == 1
+    assert capsys.readouterr().err == "Erro: Produto não encontrado: 999\n"
+
+
+def test_scripted_command_does_not_load_menu(db, product_id):
+    code = 'import sys, main; main.main(["get", "%d"]); print(sorted({"rich", "menu"} & set(sys.modules)))'
+    result = subprocess.run(
+        [sys.executable, '-c', code % product_id],
+        cwd=os.path.dirname(main.__file__), capture_output=True, text=True, check=True
+    )
+    assert result.stdout.splitlines()[-1] == '[]'
+
+
+def test_passthrough_commands_accept_leading_options(db, tmp_path, capsys, product_id):
+    assert main.main(['export', '--formato', 'jsonl', 'products']) == 0
+    assert '"name": "Café"' in capsys.readouterr().out
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+import pytest
+
+from db import Database
+from exporter import export_table, parse_date
+from importer import ProductImporter, read_csv, read_jsonl
+from models import ProductModel
+
+FIELDS = ('name', 'description', 'price', 'stock', 'brand', 'min_stock')
+
+
+@pytest.fixture
+def catalog(db):
+    products = ProductModel(db)
+    products.create_many([
+        {'name': 'Café Pilão', 'description': 'Torrado, 500g', 'price': 18.9, 'stock': 12, 'brand': 'Pilão'},
+        {'name': 'Leite "Integral"', 'price': 4.5, 'stock': 0, 'brand': 'Italac', 'min_stock': 3},
+        {'name': 'Açúcar', 'price': 5.0, 'stock': 40},
+    ])
+    return [tuple(getattr(p, field) for field in FIELDS) for p in products.get_all_page(limit=10).rows]
+
+
+@pytest.mark.parametrize('file_format, reader', [('csv', read_csv), ('jsonl', read_jsonl)])
+def test_export_import_round_trip(db, tmp_path, catalog, file_format, reader):
+    path = tmp_path / f'produtos.{file_format}'
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        assert export_table('products', out, file_format) == 3
+
+    target = Database(str(tmp_path / 'destino.db'))
+    try:
+        imported = ProductModel(target)
+        report = ProductImporter(imported).import_rows(reader(str(path)))
+        assert (report.inserted, report.errors) == (3, [])
+        copied = [tuple(getattr(p, field) for field in FIELDS) for p in imported.get_all_page(limit=10).rows]
+    finally:
+        target.close_all()
+    assert copied == catalog
+
+
+def test_export_history_by_period(db):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 1.0, 'stock': 0})
+    products.adjust_stock(product_id, 5)
+    db.execute("UPDATE stock_history SET created_at = '2024-03-10 12:00:00'")
+    products.adjust_stock(product_id, 2)
+
+    out = io.StringIO()
+    count = export_table(
+        'stock_history', out, 'jsonl', parse_date('2024-03-10'), parse_date('2024-03-10', end=True)
+    )
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert count == 1
+    assert (rows[0]['old_stock'], rows[0]['new_stock']) == (0, 5)
+
+
+def test_export_csv_header_matches_columns(db, catalog):
+    out = io.StringIO()
+    export_table('products', out, 'csv')
+    header = next(csv.reader(io.StringIO(out.getvalue())))
+    assert header == db.columns('products')
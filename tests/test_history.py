@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+
+import archive
+import checkpoints
+from models import StockHistoryModel
+
+MOVES = [
+    ('2024-01-05 10:00:00', 0, 50),
+    ('2024-02-10 10:00:00', 50, 30),
+    ('2024-03-01 10:00:00', 30, 35),
+    ('2025-12-01 10:00:00', 35, 25),
+]
+
+
+@pytest.fixture
+def archived_product(db):
+    """Produto com movimentações antes e depois de um arquivamento em 2025-01-01"""
+    product_id = db.execute(
+        "INSERT INTO products (name, price, stock, created_at) VALUES ('Café', 2.0, 25, '2023-12-01 00:00:00')"
+    ).lastrowid
+    db.executemany(
+        'INSERT INTO stock_history (product_id, old_stock, new_stock, change_type, created_at) '
+        "VALUES (?, ?, ?, 'manual', ?)",
+        [(product_id, old, new, created_at) for created_at, old, new in MOVES]
+    )
+    archive.archive_history(db, before=date(2025, 1, 1), vacuum=False)
+    assert db.fetch_one('SELECT COUNT(*) FROM main.stock_history')[0] == 1
+    return product_id
+
+
+@pytest.mark.parametrize('checkpoint', [None, '2023-12-15 00:00:00'])
+@pytest.mark.parametrize('timestamp, expected', [
+    ('2024-01-01 00:00:00', 0),
+    ('2024-01-06 00:00:00', 50),
+    ('2024-02-15 00:00:00', 30),
+    ('2025-06-01 00:00:00', 35),
+    ('2025-12-02 00:00:00', 25),
+])
+def test_as_of_across_archived_history(db, archived_product, checkpoint, timestamp, expected):
+    if checkpoint:
+        checkpoints.build_checkpoint(db, checkpoint)
+    history = StockHistoryModel(db)
+
+    assert history.as_of(timestamp, archived_product) == expected
+    valuation = history.valuation_as_of(timestamp)
+    assert valuation['total_units'] == expected
+    assert valuation['total_value'] == pytest.approx(expected * 2.0)
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from importer import ProductImporter, validate_row
+from models import ProductModel, StockHistoryModel
+
+
+def rows(*products):
+    return list(enumerate(products, 1))
+
+
+def test_import_counts_real_inserts_and_updates(db):
+    products = ProductModel(db)
+    products.create({'name': 'Café', 'price': 10.0, 'stock': 5})
+    importer = ProductImporter(products, batch_size=2, upsert_key='name')
+
+    report = importer.import_rows(rows(
+        {'name': 'Café', 'stock': 8},
+        {'name': 'Leite', 'stock': 1},
+        {'name': 'Leite', 'stock': 3},
+        {'name': 'Leite', 'price': 4.5},
+        {'name': 'Açúcar', 'stock': -1},
+    ))
+
+    # 'Leite' repete no mesmo lote (mesclado) e no seguinte (atualizado)
+    assert (report.inserted, report.updated, report.merged) == (1, 2, 1)
+    assert [line for line, _ in report.errors] == [5]
+    assert report.total == 5
+    leite = products.search('Leite')[0]
+    assert (leite.stock, leite.price) == (3, 4.5)
+
+
+def test_import_upsert_records_stock_history(db):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 5})
+    importer = ProductImporter(products, upsert_key='id')
+
+    importer.import_rows(rows({'id': product_id, 'stock': 12}, {'id': product_id, 'price': 11.0}))
+    importer.import_rows(rows({'id': product_id, 'stock': 12}))
+
+    history = StockHistoryModel(db).get_by_product(product_id)
+    assert [(row.change_type, row.old_stock, row.new_stock, row.quantity) for row in history] == [
+        ('import', 5, 12, 7)
+    ]
+
+
+@pytest.mark.parametrize('field', ['stock', 'min_stock', 'id'])
+@pytest.mark.parametrize('value', [2.7, True, '2.7'])
+def test_validate_row_rejects_non_integral_numbers(field, value):
+    with pytest.raises(ValueError):
+        validate_row(dict({'name': 'Café'}, **{field: value}), upsert_key='id')
+
+
+def test_validate_row_accepts_integral_floats():
+    assert validate_row(json.loads('{"name": "Café", "stock": 2.0}'))['stock'] == 2
+
+
+def test_import_jsonl_float_stock_is_a_row_error(db, tmp_path):
+    path = tmp_path / 'produtos.jsonl'
+    path.write_text('{"name": "Café", "stock": 2.7}\n{"name": "Leite", "stock": 3}\n', encoding='utf-8')
+
+    report = ProductImporter(ProductModel(db)).import_file(str(path))
+
+    assert (report.inserted, [line for line, _ in report.errors]) == (1, [1])
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+
+import archive
+from models import DEFAULT_LOCATION_ID, InsufficientStockError, LocationModel, ProductModel, StockHistoryModel
+
+
+def test_transfer_records_quantity_per_location(db):
+    products = ProductModel(db)
+    history = StockHistoryModel(db)
+    store = LocationModel(db).create('Loja')
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 0})
+    products.adjust_stock(product_id, 40, 'entrada')
+    products.apply_movement([(product_id, 5)], 'recebimento', location_id=store)
+
+    movement_id = products.transfer_stock([(product_id, 12)], DEFAULT_LOCATION_ID, store, reason='Reposição')
+
+    lines = history.get_by_movement(movement_id)
+    assert [(line.location_id, line.quantity, line.reason) for line in lines] == [
+        (DEFAULT_LOCATION_ID, -12, 'Reposição'),
+        (store, 12, 'Reposição'),
+    ]
+    assert all(line.old_stock == line.new_stock == 45 for line in lines)
+
+    # O estoque de cada local é a soma das quantidades do histórico
+    replayed = dict(db.fetch_all(
+        'SELECT location_id, SUM(quantity) FROM stock_history WHERE product_id = ? GROUP BY location_id',
+        (product_id,)
+    ))
+    current = {row.location_id: row.stock for row in LocationModel(db).product_stock(product_id)}
+    assert replayed == current == {DEFAULT_LOCATION_ID: 28, store: 17}
+
+
+def test_archived_transfer_keeps_quantity(db):
+    products = ProductModel(db)
+    store = LocationModel(db).create('Loja')
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 0})
+    products.adjust_stock(product_id, 30)
+    movement_id = products.transfer_stock([(product_id, 7)], DEFAULT_LOCATION_ID, store)
+
+    archive.archive_history(db, before=date(2999, 1, 1), vacuum=False)
+
+    lines = StockHistoryModel(db).get_by_movement(movement_id)
+    assert [line.quantity for line in lines] == [-7, 7]
+
+
+@pytest.fixture
+def split_stock(db):
+    """Café com 10 unidades: 2 no local padrão e 8 na loja"""
+    products = ProductModel(db)
+    store = LocationModel(db).create('Loja')
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 10})
+    products.transfer_stock([(product_id, 8)], DEFAULT_LOCATION_ID, store)
+    return product_id, store
+
+
+def stock_by_location(db, product_id):
+    return {row.location_id: row.stock for row in LocationModel(db).product_stock(product_id)}
+
+
+def test_adjust_without_location_checks_default_location(db, split_stock):
+    product_id, store = split_stock
+    products = ProductModel(db)
+
+    with pytest.raises(InsufficientStockError) as error:
+        products.adjust_stock(product_id, -5, allow_negative=False)
+    assert (error.value.stock, error.value.delta) == (2, -5)
+    with pytest.raises(InsufficientStockError):
+        products.apply_movement([(product_id, -1), (product_id, -2)], allow_negative=False)
+
+    assert products.adjust_stock(product_id, -2, allow_negative=False) == (10, 8)
+    assert stock_by_location(db, product_id) == {DEFAULT_LOCATION_ID: 0, store: 8}
+
+
+def test_set_total_below_other_locations_is_refused(db, split_stock):
+    product_id, store = split_stock
+    products = ProductModel(db)
+
+    with pytest.raises(InsufficientStockError) as error:
+        products.update_stock(product_id, 5)
+    assert (error.value.stock, error.value.delta) == (2, -5)
+    assert products.get_by_id(product_id).stock == 10
+
+    assert products.update_stock(product_id, 8)
+    assert stock_by_location(db, product_id) == {DEFAULT_LOCATION_ID: 0, store: 8}
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+from metrics import LOGGER_NAME, QueryMetrics, enable_slow_log, normalize_query
+from models import ProductModel
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    """Liga o log de queries lentas em um arquivo temporário; devolve o caminho"""
+    path = tmp_path / 'consultas-lentas.log'
+    logger = logging.getLogger(LOGGER_NAME)
+    handlers = list(logger.handlers)
+    enable_slow_log(str(path))
+    yield path
+    for handler in logger.handlers[len(handlers):]:
+        handler.close()
+    logger.handlers[:] = handlers
+    logger.propagate = True
+
+
+def test_slow_query_is_logged_with_plan(db, slow_log):
+    ProductModel(db).create({'name': 'Café', 'price': 10.0})
+    db.metrics.slow_query_ms = 0
+
+    db.fetch_all('SELECT * FROM products WHERE name = ?', ('Café',))
+
+    log = slow_log.read_text(encoding='utf-8')
+    assert 'Query lenta (' in log
+    assert '1 linhas): SELECT * FROM products WHERE name = ?' in log
+    assert 'USING INDEX idx_products_name' in log
+    slow = db.metrics.snapshot()['slow'][0]
+    assert slow['query'] == 'SELECT * FROM products WHERE name = ?'
+    assert 'idx_products_name' in slow['plan']
+
+
+def test_fast_query_is_not_logged(db, slow_log):
+    db.metrics.slow_query_ms = 60_000
+    db.fetch_all('SELECT * FROM products')
+
+    assert slow_log.read_text(encoding='utf-8') == ''
+    assert db.metrics.snapshot()['slow'] == []
+
+
+def test_threshold_comes_from_environment(monkeypatch):
+    monkeypatch.setenv('ESTOQUE_SLOW_QUERY_MS', '2.5')
+    metrics = QueryMetrics()
+    assert metrics.slow_query_ms == 2.5
+
+    metrics.record('SELECT 1', 0.002, 1)
+    metrics.record('SELECT 2', 0.003, 1)
+    assert [entry['query'] for entry in metrics.snapshot()['slow']] == ['SELECT 2']
+
+
+def test_slow_log_is_silent_until_enabled(capsys):
+    metrics = QueryMetrics(slow_query_ms=0)
+    metrics.record('SELECT 1', 0.5, 1)
+    assert capsys.readouterr().err == ''
+
+
+def test_placeholder_lists_share_statistics():
+    metrics = QueryMetrics()
+    metrics.record('SELECT * FROM products WHERE id IN (?, ?, ?)', 0.001, 3)
+    metrics.record('SELECT *\n  FROM products WHERE id IN (?,?)', 0.001, 2)
+
+    statements = metrics.snapshot()['statements']
+    assert len(statements) == 1
+    assert statements[0]['query'] == normalize_query('SELECT * FROM products WHERE id IN (?, ?)')
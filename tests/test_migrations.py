@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from db import Database
+from models import LocationModel, ProductModel, ReportModel
+
+# Esquema da versão 0 (antes das migrações), como Database.create_tables criava
+BASE_SCHEMA = '''
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        price REAL,
+        stock INTEGER,
+        brand TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE stock_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER,
+        old_stock INTEGER,
+        new_stock INTEGER,
+        change_type TEXT,
+        reason TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def old_database(path, version):
+    """Banco com dados gravados na versão `version` do esquema"""
+    conn = sqlite3.connect(path)
+    conn.executescript(BASE_SCHEMA)
+    conn.executemany(
+        'INSERT INTO products (name, price, stock, brand) VALUES (?, ?, ?, ?)',
+        [('Café Pilão', 18.0, 12, 'Pilão'), ('Leite', 4.5, 0, None), ('Açúcar', 5.0, 3, 'União')]
+    )
+    conn.execute(
+        "INSERT INTO stock_history (product_id, old_stock, new_stock, change_type) VALUES (1, 0, 12, 'manual')"
+    )
+    for number, _, func in migrations.MIGRATIONS:
+        if number <= version:
+            func(conn.cursor())
+    conn.execute(f'PRAGMA user_version = {version}')
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize('version', [0, 4, 8])
+def test_upgrade_from_old_version(tmp_path, version):
+    path = str(tmp_path / 'antigo.db')
+    old_database(path, version)
+
+    db = Database(path)
+    try:
+        assert migrations.current_version(db.conn) == migrations.latest_version()
+        indexes = {row[0] for row in db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'idx_stock_history_product_created', 'idx_products_name', 'idx_products_value'} <= indexes
+
+        products = ProductModel(db)
+        stats = products.get_stats()
+        assert (stats['total_products'], stats['total_units'], stats['out_of_stock']) == (3, 15, 1)
+        assert stats['total_value'] == pytest.approx(12 * 18.0 + 3 * 5.0)
+        assert products.get_by_id(1).min_stock is not None
+        assert [(row.location_id, row.stock) for row in LocationModel(db).product_stock(1)] == [(1, 12)]
+        if db.has_fts:
+            assert [p.name for p in products.search('Pilão')] == ['Café Pilão']
+        brands = {row.brand: row.total_units for row in ReportModel(db).by_brand()}
+        assert brands == {'Pilão': 12, '': 0, 'União': 3}
+    finally:
+        db.close_all()
+
+
+def test_migrations_are_idempotent(tmp_path):
+    path = str(tmp_path / 'estoque.db')
+    Database(path).close_all()
+    conn = sqlite3.connect(path)
+    # Rodar de novo (banco alterado antes do versionamento) não pode falhar nem duplicar
+    for _, _, func in migrations.MIGRATIONS:
+        func(conn.cursor())
+    conn.commit()
+    assert conn.execute('SELECT COUNT(*) FROM locations').fetchone()[0] == 1
+    conn.close()
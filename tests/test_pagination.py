@@ -0,0 +1,54 @@
+from models import ProductModel, StockHistoryModel
+
+
+def walk(fetch_page):
+    """Todas as páginas de uma listagem, como lista de páginas de IDs"""
+    pages, cursor = [], None
+    while True:
+        page = fetch_page(cursor)
+        pages.append([row.id for row in page.rows])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_listing_without_repeats(db):
+    products = ProductModel(db)
+    products.create_many([{'name': f'Produto {i:02d}', 'stock': i % 4} for i in range(23)])
+
+    pages = walk(lambda after: products.get_low_stock_page(2, after, limit=5))
+
+    ids = [product_id for page in pages for product_id in page]
+    assert [len(page) for page in pages] == [5, 5, 5, 3]
+    assert ids == [product.id for product in sorted(
+        products.get_low_stock(2), key=lambda product: (product.stock, product.name, product.id)
+    )]
+
+
+def test_cursor_is_stable_across_inserts(db):
+    products = ProductModel(db)
+    products.create_many([{'name': f'Produto {i:02d}', 'stock': 1} for i in range(10)])
+    first = products.get_low_stock_page(5, limit=4)
+
+    # Produtos novos que ordenam antes do cursor não deslocam a página seguinte
+    products.create_many([{'name': 'AAA', 'stock': 0}, {'name': 'Produto 00a', 'stock': 1}])
+    second = products.get_low_stock_page(5, first.next_cursor, limit=4)
+
+    names = [product.name for product in first.rows + second.rows]
+    assert names == [f'Produto {i:02d}' for i in range(8)]
+
+
+def test_history_cursor_ignores_newer_movements(db):
+    products = ProductModel(db)
+    history = StockHistoryModel(db)
+    product_id = products.create({'name': 'Café', 'stock': 0})
+    for _ in range(6):
+        products.adjust_stock(product_id, 1)
+    first = history.get_by_product_page(product_id, limit=4)
+
+    products.adjust_stock(product_id, 10)
+    second = history.get_by_product_page(product_id, first.next_cursor, limit=4)
+
+    assert [row.new_stock for row in first.rows] == [6, 5, 4, 3]
+    assert [row.new_stock for row in second.rows] == [2, 1]
+    assert second.next_cursor is None
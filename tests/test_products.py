@@ -0,0 +1,20 @@
+from models import ProductModel
+
+
+def test_upsert_by_name_uses_name_index(db, query_plans):
+    products = ProductModel(db)
+    products.create_many([{'name': f'Produto {i}', 'price': 1.0, 'stock': i} for i in range(50)])
+
+    inserted, updated = products.create_many(
+        [{'name': 'Produto 3', 'stock': 99}, {'name': 'Produto 7', 'price': 2.5}, {'name': 'Novo'}],
+        upsert_key='name'
+    )
+
+    assert (inserted, updated) == (1, 2)
+    assert products.get_by_id(4).stock == 99
+    assert products.get_by_id(8).price == 2.5
+    lookups, updates = query_plans('name IN'), query_plans('WHERE name =')
+    assert lookups and len(updates) == 2
+    for plan in lookups + updates:
+        assert 'idx_products_name' in plan
+        assert 'SCAN products' not in plan
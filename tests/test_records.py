@@ -0,0 +1,48 @@
+from models import ProductModel
+from records import Location, Product, StockMovement
+
+
+def test_select_star_maps_columns_in_table_order(db):
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 10.5, 'stock': 3, 'brand': 'Pilão'})
+
+    product = db.fetch_one('SELECT * FROM products WHERE id = ?', (product_id,), Product)
+    assert isinstance(product, Product)
+    assert (product.id, product.name, product.price, product.stock, product.brand) == (
+        product_id, 'Café', 10.5, 3, 'Pilão'
+    )
+    assert product.as_dict()['min_stock'] == product.min_stock
+
+
+def test_extra_columns_after_fields_are_ignored(db):
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 10.0, 'stock': 3})
+
+    product = db.fetch_one('SELECT *, stock * price AS value FROM products WHERE id = ?', (product_id,), Product)
+    assert (product.name, product.stock) == ('Café', 3)
+    assert not hasattr(product, 'value')
+
+
+def test_columns_in_any_order_and_missing_fields(db):
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 10.0, 'stock': 3, 'brand': 'Pilão'})
+
+    product = db.fetch_one('SELECT brand, stock, id, name FROM products WHERE id = ?', (product_id,), Product)
+    assert (product.id, product.name, product.stock, product.brand) == (product_id, 'Café', 3, 'Pilão')
+    assert product.price is None and product.created_at is None
+
+
+def test_factory_depends_on_record_type_and_columns(db):
+    db.execute("INSERT INTO locations (name) VALUES ('Depósito')")
+
+    locations = db.fetch_all('SELECT id, name FROM locations ORDER BY id', (), Location)
+    names = db.fetch_all('SELECT name, id FROM locations ORDER BY id', (), Location)
+    assert [(location.id, location.name) for location in locations] == [
+        (location.id, location.name) for location in names
+    ]
+    movement = db.fetch_one("SELECT 7 AS quantity, 1 AS id", (), StockMovement)
+    assert (movement.id, movement.quantity, movement.product_id) == (1, 7, None)
+
+
+def test_records_compare_and_iterate_by_fields():
+    assert Product(1, 'Café', price=2.0) == Product(1, 'Café', price=2.0)
+    assert Product(1, 'Café') != Product(2, 'Café')
+    assert tuple(Location(1, 'Loja')) == (1, 'Loja', None)
+    assert repr(Location(1, 'Loja')) == "Location(id=1, name='Loja', created_at=None)"
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from models import DEFAULT_LOCATION_ID, LocationModel, ProductModel, ReportModel
+
+BRANDS = ['Pilão', 'União', '', None]
+
+
+def snapshot(db):
+    reports = ReportModel(db)
+    brands = {row.brand: (row.product_count, row.total_units, pytest.approx(row.total_value))
+              for row in reports.by_brand()}
+    bands = [(row.label, row.product_count, row.total_units, pytest.approx(row.total_value))
+             for row in reports.stock_bands()]
+    stats = ProductModel(db).get_stats()
+    # Os valores somados e subtraídos a cada escrita acumulam arredondamento
+    stats['total_value'] = pytest.approx(stats['total_value'])
+    return brands, bands, stats
+
+
+def random_writes(db, seed, steps=300):
+    rng = random.Random(seed)
+    products = ProductModel(db)
+    store = LocationModel(db).create('Loja')
+    ids = []
+    for step in range(steps):
+        action = rng.choice(['create', 'create', 'adjust', 'set', 'edit', 'delete', 'movement', 'import', 'transfer'])
+        if action == 'create' or not ids:
+            ids.append(products.create({
+                'name': f'Produto {step}', 'price': round(rng.uniform(0, 50), 2),
+                'stock': rng.randint(-5, 700), 'brand': rng.choice(BRANDS),
+            }))
+            continue
+        product_id = rng.choice(ids)
+        if action == 'adjust':
+            products.adjust_stock(product_id, rng.randint(-60, 60))
+        elif action == 'set':
+            products.update_stock(product_id, rng.randint(0, 600) + db.fetch_one(
+                'SELECT COALESCE(SUM(stock), 0) FROM product_locations WHERE product_id = ? AND location_id != ?',
+                (product_id, DEFAULT_LOCATION_ID)
+            )[0])
+        elif action == 'edit':
+            products.update(product_id, {'price': round(rng.uniform(0, 50), 2), 'brand': rng.choice(BRANDS)})
+        elif action == 'delete':
+            products.delete(product_id)
+            ids.remove(product_id)
+        elif action == 'movement':
+            products.apply_movement([(rng.choice(ids), rng.randint(-20, 20)) for _ in range(3)])
+        elif action == 'import':
+            with db.transaction():
+                products.create_many([
+                    {'id': product_id, 'stock': rng.randint(0, 900), 'price': round(rng.uniform(0, 50), 2)}
+                ], 'id')
+        elif action == 'transfer':
+            products.transfer_stock([(product_id, rng.randint(1, 5))], DEFAULT_LOCATION_ID, store,
+                                    allow_negative=True)
+    return ids
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_summaries_maintained_by_triggers_match_rebuild(db, seed):
+    ids = random_writes(db, seed)
+    maintained = snapshot(db)
+
+    ReportModel(db).rebuild()
+    assert snapshot(db) == maintained
+
+    brands, bands, stats = maintained
+    assert sum(count for count, _, _ in brands.values()) == len(ids) == stats['total_products']
+    assert sum(band[1] for band in bands) == len(ids)
+    assert None not in brands
+
+
+def test_brand_leaves_summary_when_last_product_goes(db):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 2.0, 'stock': 3, 'brand': 'Pilão'})
+    products.update(product_id, {'brand': 'União'})
+
+    assert [row.brand for row in ReportModel(db).by_brand()] == ['União']
+    products.delete(product_id)
+    assert ReportModel(db).by_brand() == []
+    assert all(band.product_count == 0 for band in ReportModel(db).stock_bands())
@@ -0,0 +1,52 @@
+import pytest
+
+from models import ProductModel
+
+
+@pytest.fixture
+def products(db):
+    if not db.has_fts:
+        pytest.skip("SQLite sem FTS5 com trigramas")
+    products = ProductModel(db)
+    products.create_many([
+        {'name': 'Chocolate ao Leite', 'brand': 'Nestlé', 'description': 'Barra 90g'},
+        {'name': 'Leite Integral', 'brand': 'Italac', 'description': 'Caixa 1L'},
+        {'name': 'Café Torrado', 'brand': 'Pilão', 'description': 'Pacote a vácuo'},
+    ])
+    return products
+
+
+def names(products, term):
+    return [product.name for product in products.search(term)]
+
+
+def test_fts_matches_any_substring_ignoring_case(products):
+    assert names(products, 'ocola') == ['Chocolate ao Leite']
+    assert names(products, 'CHOCO') == ['Chocolate ao Leite']
+    assert sorted(names(products, 'leite')) == ['Chocolate ao Leite', 'Leite Integral']
+
+
+def test_fts_searches_brand_and_description(products):
+    assert names(products, 'Italac') == ['Leite Integral']
+    assert names(products, 'vácuo') == ['Café Torrado']
+
+
+def test_fts_ranks_name_above_description(products, db):
+    products.create({'name': 'Granola', 'description': 'Com pedaços de chocolate'})
+    assert names(products, 'chocolate') == ['Chocolate ao Leite', 'Granola']
+
+
+def test_fts_follows_updates_and_deletes(products):
+    cafe = products.search('Torrado')[0]
+    products.update(cafe.id, {'name': 'Café Extra Forte'})
+    assert names(products, 'Torrado') == []
+    assert names(products, 'Extra Forte') == ['Café Extra Forte']
+
+    products.delete(cafe.id)
+    assert names(products, 'Extra Forte') == []
+
+
+def test_short_terms_and_ids(products):
+    # Menos de 3 caracteres não formam trigrama: busca por LIKE em nome e marca
+    assert names(products, 'Pi') == ['Café Torrado']
+    assert names(products, '2') == ['Leite Integral']
@@ -0,0 +1,89 @@
+import base64
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from models import ProductModel
+
+
+def call(url, data=None, method=None):
+    """Faz a requisição e devolve (status, corpo JSON), inclusive para erros"""
+    body = None if data is None else json.dumps(data).encode()
+    request = urllib.request.Request(url, body, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize('data, field', [
+    ({'name': 'Café', 'price': '10'}, 'price'),
+    ({'name': 'Café', 'price': True}, 'price'),
+    ({'name': 'Café', 'stock': 2.5}, 'stock'),
+    ({'name': 'Café', 'stock': '3'}, 'stock'),
+    ({'name': 'Café', 'min_stock': False}, 'min_stock'),
+])
+def test_create_product_rejects_wrong_types(api, db, data, field):
+    status, body = call(f'{api}/products', data)
+    assert status == 400
+    assert f"'{field}'" in body['error']
+    assert db.fetch_one('SELECT COUNT(*) FROM products')[0] == 0
+
+
+def test_create_product_accepts_valid_numbers(api):
+    status, body = call(f'{api}/products', {'name': 'Café', 'price': 10, 'stock': 3, 'min_stock': 1})
+    assert status == 201
+    assert (body['price'], body['stock'], body['min_stock']) == (10, 3, 1)
+
+
+def test_update_product_rejects_wrong_types(api, db):
+    product_id = ProductModel(db).create({'name': 'Café', 'price': 10.0})
+    status, body = call(f'{api}/products/{product_id}', {'price': 'caro'}, 'PATCH')
+    assert status == 400
+    assert "'price'" in body['error']
+
+
+@pytest.mark.parametrize('path, value', [
+    ('/products', 'abc'),
+    ('/products', cursor({'id': 1})),
+    ('/products', cursor([1])),
+    ('/products', cursor(['2026-01-01', 1, 2])),
+    ('/products', cursor([None, 1])),
+    ('/products', cursor(['2026-01-01', 'x'])),
+    ('/products/low-stock', cursor([1, 'Café'])),
+    ('/locations/1/stock', cursor([[1]])),
+])
+def test_malformed_cursor_is_bad_request(api, path, value):
+    status, body = call(f'{api}{path}?cursor={value}')
+    assert status == 400
+    assert body['error'] == "Cursor inválido"
+
+
+def test_cursor_from_previous_page_is_accepted(api, db):
+    products = ProductModel(db)
+    for name in ('Açúcar', 'Café', 'Leite'):
+        products.create({'name': name, 'price': 1.0, 'stock': 1})
+    for path in ('/products', '/products/low-stock', '/locations/1/stock'):
+        status, body = call(f'{api}{path}?limit=1')
+        assert status == 200 and body['next_cursor'], path
+        status, body = call(f"{api}{path}?limit=1&cursor={body['next_cursor']}")
+        assert status == 200 and len(body['items']) == 1, path
+
+
+@pytest.mark.parametrize('path', ['/products?limit=0', '/products?limit=x', '/stats?threshold=x'])
+def test_bad_query_parameters(api, path):
+    assert call(api + path)[0] == 400
+
+
+def test_bad_body_and_missing_product(api):
+    assert call(f'{api}/products', None, 'POST')[0] == 400
+    assert call(f'{api}/products/999')[0] == 404
+    assert call(f'{api}/products/999/adjust', {'delta': 1})[0] == 404
+    assert call(f'{api}/products/999/adjust', {'delta': '1'})[0] == 400
@@ -0,0 +1,81 @@
+import pytest
+
+from models import ProductModel
+from search_index import edit_distance, get_search_index, tokenize
+
+
+@pytest.fixture
+def catalog(db):
+    products = ProductModel(db)
+    names = [
+        ('Café Torrado', 'Pilão'),
+        ('Chocolate em Pó', 'Nestlé'),
+        ('Achocolatado', 'Toddy'),
+        ('Filtro de Papel 103', 'Melitta'),
+        ('Filtro de Papel 102', 'Melitta'),
+        ('Caixa 103', ''),
+    ]
+    return {name: products.create({'name': name, 'brand': brand, 'price': 1.0}) for name, brand in names}
+
+
+def names(page):
+    return [product.name for product in page.rows]
+
+
+def test_tokenize_removes_accents_and_case():
+    assert tokenize('Café Pilão Extra-Forte') == ['cafe', 'pilao', 'extra', 'forte']
+
+
+def test_edit_distance_stops_at_limit():
+    assert edit_distance('chocolte', 'chocolate', 1) == 1
+    assert edit_distance('xyzzy', 'chocolate', 1) > 1
+    assert edit_distance('choc', 'chocolate', 1, prefix=True) == 0
+
+
+@pytest.mark.parametrize('term, expected', [
+    ('cafe', 'Café Torrado'),
+    ('CAFÉ', 'Café Torrado'),
+    ('pil', 'Café Torrado'),
+    ('torr pila', 'Café Torrado'),
+    ('chocolte', 'Chocolate em Pó'),
+    ('chcolate nestle', 'Chocolate em Pó'),
+    ('tody', 'Achocolatado'),
+])
+def test_typos_and_prefixes(db, catalog, term, expected):
+    assert names(ProductModel(db).suggest_page(term))[0] == expected
+
+
+def test_exact_word_ranks_above_prefix(db, catalog):
+    assert names(ProductModel(db).suggest_page('choco'))[:1] == ['Chocolate em Pó']
+    assert get_search_index(db).search('filtro 102') == [catalog['Filtro de Papel 102']]
+
+
+def test_index_follows_writes(db, catalog):
+    products = ProductModel(db)
+    products.update(catalog['Achocolatado'], {'name': 'Achocolatado Zero'})
+    products.delete(catalog['Café Torrado'])
+
+    assert names(products.suggest_page('zero')) == ['Achocolatado Zero']
+    # Sem resultado no índice, cai na busca de texto completo
+    assert names(products.suggest_page('cafe torrado')) == []
+
+
+def test_numeric_term_only_prefers_existing_id(db, catalog):
+    products = ProductModel(db)
+
+    # Nenhum produto tem o ID 103: a primeira página não perde uma posição
+    page = products.suggest_page('103', limit=2)
+    assert sorted(names(page)) == ['Caixa 103', 'Filtro de Papel 103']
+    assert page.next_cursor is None
+
+    page = products.suggest_page(str(catalog['Chocolate em Pó']), limit=1)
+    assert names(page) == ['Chocolate em Pó']
+
+
+def test_paging_suggestions(db, catalog):
+    products = ProductModel(db)
+    first = products.suggest_page('filtro', limit=1)
+    second = products.suggest_page('filtro', after=first.next_cursor, limit=1)
+
+    assert sorted(names(first) + names(second)) == ['Filtro de Papel 102', 'Filtro de Papel 103']
+    assert second.next_cursor is None
@@ -0,0 +1,44 @@
+import threading
+
+from models import ProductModel
+from writer import Writer
+
+
+def test_cache_is_invalidated_after_group_commit(db):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 10})
+    in_batch = threading.Event()
+    read_done = threading.Event()
+
+    def slow_job():
+        in_batch.set()
+        assert read_done.wait(5)
+
+    with Writer(db, max_delay=0.2) as writer:
+        adjusted = writer.submit(products.adjust_stock, product_id, 5)
+        slow = writer.submit(slow_job)
+        assert in_batch.wait(5)
+        # Outra conexão ainda vê (e guarda no cache) o valor de antes do commit do lote
+        assert products.get_by_id(product_id).stock == 10
+        read_done.set()
+        assert adjusted.result(5) == (10, 15)
+        slow.result(5)
+
+    assert products.get_by_id(product_id).stock == 15
+
+
+def test_cache_is_invalidated_after_rolled_back_job(db):
+    products = ProductModel(db)
+    product_id = products.create({'name': 'Café', 'price': 10.0, 'stock': 10})
+
+    def failing_job():
+        products.adjust_stock(product_id, 5)
+        # Lido dentro do lote, antes do rollback do job
+        assert products.get_by_id(product_id).stock == 15
+        raise ValueError("falha")
+
+    with Writer(db) as writer:
+        failed = writer.submit(failing_job)
+        assert isinstance(failed.exception(5), ValueError)
+
+    assert products.get_by_id(product_id).stock == 10
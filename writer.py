@@ -0,0 +1,236 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from db import get_database
+
+# Máximo de jobs por commit e espera máxima por mais jobs depois do primeiro (s).
+# Sem espera, o lote é o que se acumulou na fila enquanto o anterior gravava:
+# em WAL com synchronous=NORMAL o commit é barato e esperar só soma latência.
+DEFAULT_MAX_BATCH = 200
+DEFAULT_MAX_DELAY = 0.0
+
+# Novas tentativas quando o banco está ocupado (outro processo escrevendo),
+# com espera dobrando a partir de RETRY_BASE_DELAY até RETRY_MAX_DELAY (s)
+DEFAULT_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 2.0
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+# Marca de encerramento colocada na fila por close()
+_STOP = object()
+
+
+def get_writer(db=None):
+    """
+    Retorna o Writer compartilhado do banco (criado no primeiro uso)
+
+    Args:
+        db (Database): Banco; padrão é a instância compartilhada
+
+    Returns:
+        Writer: Escritor único daquele banco neste processo
+    """
+    db = db or get_database()
+    with _writers_lock:
+        writer = _writers.get(db.path)
+        if writer is None or writer.closed:
+            writer = _writers[db.path] = Writer(db)
+        return writer
+
+
+def is_busy_error(error):
+    """Indica se o erro do SQLite é de banco ocupado/travado (vale tentar de novo)"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+class Writer:
+    """
+    Thread única de escrita com commit em grupo
+
+    Qualquer thread envia jobs (funções que escrevem pelos modelos) com
+    submit() e recebe um Future. A thread de escrita junta os jobs que
+    chegarem em até `max_delay` segundos (no máximo `max_batch`) em uma
+    única transação: cada job roda dentro de um SAVEPOINT, então um job com
+    erro é desfeito sozinho e os outros entram no mesmo commit. Os Futures
+    só recebem o resultado depois do commit.
+
+    Se o banco estiver ocupado por outro processo, o lote inteiro é
+    desfeito e refeito com espera crescente, até `max_retries` vezes.
+    """
+
+    def __init__(self, db=None, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        """
+        Args:
+            db (Database): Banco; padrão é a instância compartilhada
+            max_batch (int): Máximo de jobs por commit
+            max_delay (float): Espera máxima por mais jobs depois do primeiro (s)
+            max_retries (int): Novas tentativas de um lote com o banco ocupado
+        """
+        self.db = db or get_database()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.closed = False
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Contadores para diagnóstico (ver stats())
+        self._jobs = 0
+        self._batches = 0
+        self._retries = 0
+        self._largest_batch = 0
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Enfileira um job de escrita
+
+        `func(*args, **kwargs)` roda na thread de escrita, dentro da
+        transação do lote; use os modelos normalmente (as transações deles
+        são incorporadas à do lote).
+
+        Returns:
+            Future: Recebe o retorno de `func`, ou a exceção lançada por ela,
+                depois do commit
+        """
+        if self.closed:
+            raise RuntimeError("Writer encerrado")
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Enfileira um job e espera o resultado (atalho para submit().result())"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self, timeout=None):
+        """Processa os jobs já enfileirados e encerra a thread de escrita"""
+        with self._start_lock:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        """
+        Contadores desde a criação
+
+        Returns:
+            dict: jobs, batches, mean_batch, largest_batch, retries e pending
+        """
+        return {
+            'jobs': self._jobs,
+            'batches': self._batches,
+            'mean_batch': self._jobs / self._batches if self._batches else 0.0,
+            'largest_batch': self._largest_batch,
+            'retries': self._retries,
+            'pending': self._queue.qsize(),
+        }
+
+    def _ensure_started(self):
+        """Inicia a thread de escrita no primeiro job"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None and not self.closed:
+                self._thread = threading.Thread(target=self._loop, name='estoque-writer', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        """Laço da thread de escrita: junta um lote, grava e repete"""
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._write(batch)
+        self.db.close()
+
+    def _collect(self):
+        """
+        Espera o primeiro job e junta os que chegarem até max_delay depois dele
+
+        Returns:
+            tuple: (jobs do lote, True se close() foi chamado)
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _write(self, batch):
+        """Grava um lote em uma transação, refazendo-o se o banco estiver ocupado"""
+        # Um Future cancelado antes de começar não roda
+        batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        attempt = 0
+        while True:
+            try:
+                outcomes = self._run_batch(batch)
+                break
+            except Exception as e:
+                if is_busy_error(e) and attempt < self.max_retries:
+                    self._retries += 1
+                    time.sleep(min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY))
+                    attempt += 1
+                    continue
+                for future, _, _, _ in batch:
+                    future.set_exception(e)
+                return
+
+        self._jobs += len(batch)
+        self._batches += 1
+        self._largest_batch = max(self._largest_batch, len(batch))
+        for (future, _, _, _), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _run_batch(self, batch):
+        """
+        Executa os jobs em uma única transação, cada um em seu SAVEPOINT
+
+        Returns:
+            list: (True, resultado) ou (False, exceção) de cada job
+
+        Raises:
+            sqlite3.OperationalError: Banco ocupado (o lote inteiro foi desfeito)
+        """
+        outcomes = []
+        with self.db.transaction():
+            for future, func, args, kwargs in batch:
+                try:
+                    with self.db.savepoint('job'):
+                        outcomes.append((True, func(*args, **kwargs)))
+                except Exception as e:
+                    # Banco ocupado no meio do lote: desfaz tudo e tenta de novo
+                    if is_busy_error(e):
+                        raise
+                    outcomes.append((False, e))
+        return outcomes